@@ -4,8 +4,12 @@ from dotenv import load_dotenv
 # Завантажуємо змінні середовища з файлу .env
 load_dotenv()
 
+# Кілька ботів (міст) в одному процесі: JSON-файл з налаштуваннями орендарів (див. tenants.py).
+# Без нього працює один бот з API_TOKEN.
+TENANTS_FILE = os.getenv('TENANTS_FILE', '')
+
 API_TOKEN = os.getenv('API_TOKEN')
-if not API_TOKEN:
+if not API_TOKEN and not TENANTS_FILE:
     print("❌ API_TOKEN не заданий. Будь ласка, встановіть змінну середовища API_TOKEN.")
     exit(1)
 
@@ -14,18 +18,114 @@ if not MONGO_DB_URL:
     print("❌ MONGO_DB_URL не заданий. Будь ласка, встановіть змінну середовища MONGO_DB_URL для підключення до MongoDB.")
     exit(1)
 
+# Налаштування пулу з'єднань і тайм-аутів MongoDB (Motor)
+MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', 100))
+MONGO_MIN_POOL_SIZE = int(os.getenv('MONGO_MIN_POOL_SIZE', 0))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv('MONGO_MAX_IDLE_TIME_MS', 60000))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv('MONGO_CONNECT_TIMEOUT_MS', 5000))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv('MONGO_SOCKET_TIMEOUT_MS', 10000))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', 2000))
+
+# Маршрутизація читань: списки оголошень можна читати з вторинних вузлів з обмеженою застарілістю.
+# primary | primaryPreferred | secondary | secondaryPreferred | nearest
+MONGO_LISTING_READ_PREFERENCE = os.getenv('MONGO_LISTING_READ_PREFERENCE', 'secondaryPreferred')
+MONGO_MAX_STALENESS_SECONDS = int(os.getenv('MONGO_MAX_STALENESS_SECONDS', 90)) # MongoDB вимагає щонайменше 90
+# Скільки секунд після запису користувач читає лише з основного вузла (read-your-writes)
+READ_YOUR_WRITES_WINDOW_SECONDS = int(os.getenv('READ_YOUR_WRITES_WINDOW_SECONDS', 120))
+
+# Поведінка при деградації MongoDB: дедлайни читань і записів, кількість невдач
+# поспіль, після якої звернення до бази тимчасово припиняються, і тривалість паузи
+DB_READ_TIMEOUT_SECONDS = float(os.getenv('DB_READ_TIMEOUT_SECONDS', 2.5))
+DB_WRITE_TIMEOUT_SECONDS = float(os.getenv('DB_WRITE_TIMEOUT_SECONDS', 5))
+DB_BREAKER_FAILURES = int(os.getenv('DB_BREAKER_FAILURES', 5))
+DB_BREAKER_RESET_SECONDS = int(os.getenv('DB_BREAKER_RESET_SECONDS', 30))
+# Скільки останніх вдалих сторінок списків зберігати для показу під час інциденту
+STALE_PAGES_MAX = int(os.getenv('STALE_PAGES_MAX', 2000))
+
+# Назва бази даних MongoDB (можна перевизначити, наприклад, для навантажувального тестування)
+MONGO_DB_NAME = os.getenv('MONGO_DB_NAME', 'cropservice_db')
+
 # Налаштування вебхука (для розгортання на серверах)
 WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '[https://your-domain.com](https://your-domain.com)') # Замініть на ваш домен
-WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/webhook') # Шлях вебхука, не включає API_TOKEN
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/webhook') # Шлях вебхука, не включає API_TOKEN (для кількох ботів задається в TENANTS_FILE)
+# Відповідати на callback-запити у відповіді на вебхук (без окремого запиту до Bot API),
+# якщо відповідь — остання дія обробника
+WEBHOOK_REPLY = os.getenv('WEBHOOK_REPLY', 'true').lower() == 'true'
 WEBAPP_HOST = os.getenv('WEBAPP_HOST', '0.0.0.0') # Для прослуховування всіх інтерфейсів
 WEBAPP_PORT = int(os.getenv('WEBAPP_PORT', 8080))
 
+# Логування: рівень, формат (json | text) та частка повідомлень рівня INFO/DEBUG, що записуються
+# для окремих логерів, наприклад LOG_SAMPLE_RATES="utils=0.1,aiohttp.access=0.05"
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+LOG_SAMPLE_RATES = {
+    name.strip(): float(rate)
+    for name, _, rate in (item.partition('=') for item in os.getenv('LOG_SAMPLE_RATES', '').split(','))
+    if name.strip() and rate.strip()
+}
+
+# Трасування оновлень (tail-based sampling): зберігаються лише повільні або невдалі траси
+TRACING_ENABLED = os.getenv('TRACING_ENABLED', 'false').lower() == 'true'
+TRACE_SLOW_MS = float(os.getenv('TRACE_SLOW_MS', 300)) # Поріг "повільного" оновлення
+TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', 0)) # Частка швидких успішних трас, що теж зберігаються
+TRACE_EXPORT_PATH = os.getenv('TRACE_EXPORT_PATH', 'traces.jsonl') # Файл OTLP/JSON (порожньо — не писати)
+TRACE_OTLP_URL = os.getenv('TRACE_OTLP_URL', '') # Наприклад, http://localhost:4318/v1/traces
+
+# Адміністратори бота (Telegram ID через кому) та токен для адмінських HTTP-ендпоінтів
+ADMIN_IDS = {int(x) for x in os.getenv('ADMIN_IDS', '').split(',') if x.strip().isdigit()}
+ADMIN_API_TOKEN = os.getenv('ADMIN_API_TOKEN', '')
+
+# Профілювання на вимогу (/profile, ендпоінт /profile): каталог результатів, максимальна
+# тривалість сеансу, інтервал семплювання стеку та поріг повільного колбека event loop
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+PROFILE_MAX_SECONDS = int(os.getenv('PROFILE_MAX_SECONDS', 300))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv('PROFILE_SAMPLE_INTERVAL_MS', 5))
+PROFILE_SLOW_CALLBACK_MS = float(os.getenv('PROFILE_SLOW_CALLBACK_MS', 100))
+
 # Налаштування пагінації
 MY_POSTS_PER_PAGE = 5
 VIEW_POSTS_PER_PAGE = 5
+SAVED_POSTS_PER_PAGE = 5
+
+# Фільтри перегляду оголошень за свіжістю: (підпис, кількість днів)
+VIEW_AGE_FILTERS = [("24 год", 1), ("7 днів", 7)]
+
+# Скільки секунд живе заздалегідь побудована сусідня сторінка списку
+PREFETCH_TTL_SECONDS = int(os.getenv('PREFETCH_TTL_SECONDS', 30))
+# Скільки секунд кількості оголошень списку (для пагінації та кнопок фільтрів) вважаються свіжими
+VIEW_COUNTS_TTL_SECONDS = int(os.getenv('VIEW_COUNTS_TTL_SECONDS', 15))
+
+# Сесії FSM у пам'яті: скільки секунд неактивності зберігати сесію, максимальна кількість
+# сесій одного бота (найдавніше використані витісняються) та інтервал прибирання
+SESSION_IDLE_TIMEOUT_SECONDS = int(os.getenv('SESSION_IDLE_TIMEOUT_SECONDS', 86400))
+SESSION_MAX = int(os.getenv('SESSION_MAX', 100000))
+SESSION_SWEEP_INTERVAL = int(os.getenv('SESSION_SWEEP_INTERVAL', 300))
+
+# Максимальна кількість збережених оголошень на користувача (старіші витісняються)
+FAVORITES_LIMIT = 50
+
+# Скільки фото можна додати до оголошення (в одному альбомі Telegram — до 10)
+MAX_POST_PHOTOS = 5
+
+# Як часто записувати накопичені лічильники переглядів у MongoDB (секунди) —
+# це ж верхня межа втрати переглядів при аварійному завершенні
+VIEW_COUNTER_FLUSH_INTERVAL = int(os.getenv('VIEW_COUNTER_FLUSH_INTERVAL', 10))
+# Повторні покази оголошення тому самому користувачу рахуються одним переглядом протягом стількох секунд
+VIEW_DEDUP_WINDOW_SECONDS = int(os.getenv('VIEW_DEDUP_WINDOW_SECONDS', 3600))
+# Як часто записувати накопичених активних користувачів дня у статистику (секунди)
+ACTIVITY_FLUSH_INTERVAL = int(os.getenv('ACTIVITY_FLUSH_INTERVAL', 10))
+
+# Налаштування inline-пошуку (@бот запит)
+INLINE_RESULTS_PER_PAGE = 20
+INLINE_CACHE_TIME = 60 # Скільки секунд Telegram кешує результати одного запиту
+INLINE_INDEX_PRUNE_INTERVAL = 3600 # Як часто прибирати прострочені оголошення з індексу (секунди)
 
 # Термін дії оголошень у днях (для TTL індексу MongoDB)
 POST_LIFETIME_DAYS = 30
+# Поновити оголошення (підняття в списках і новий термін дії; дата створення не змінюється)
+# можна не раніше, ніж через стільки годин
+POST_RENEW_MIN_AGE_HOURS = int(os.getenv('POST_RENEW_MIN_AGE_HOURS', 24))
 
 # Категорії оголошень
 CATEGORIES = [
@@ -38,6 +138,17 @@ CATEGORIES = [
     ("🧩 Інше", "Інше"),
 ]
 
+# Райони Кропивницького для необов'язкового фільтра за місцем
+DISTRICTS = [
+    ("📍 Центр", "Центр"),
+    ("📍 Фортеця", "Фортеця"),
+    ("📍 Ковалівка", "Ковалівка"),
+    ("📍 Кущівка", "Кущівка"),
+    ("📍 Балашівка", "Балашівка"),
+    ("📍 Лелеківка", "Лелеківка"),
+    ("📍 Новомиколаївка", "Новомиколаївка"),
+]
+
 # Тематичні емоджі для типу "Робота" та "Послуга"
 TYPE_EMOJIS = {
     "робота": "💼",
@@ -0,0 +1,55 @@
+"""
+Збережені оголошення.
+
+Для кожного користувача зберігається один документ з обмеженим списком ID оголошень
+(найновіші збереження — першими):
+
+    favorites  {_id: user_id, post_ids: [id, ...]}
+
+Сторінка збережених отримується одним запитом `$in` за унікальним індексом `id`,
+порядок відновлюється в пам'яті, а ID оголошень, яких вже немає (видалені або
+прострочені), прибираються зі списку.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+async def add_favorite(db_obj, user_id: int, post_id: int, limit: int):
+    """
+    Додає оголошення на початок списку збережених (без дублікатів),
+    залишаючи не більше `limit` останніх. Одне атомарне оновлення-конвеєр.
+    """
+    others = {'$filter': {'input': {'$ifNull': ['$post_ids', []]}, 'cond': {'$ne': ['$$this', post_id]}}}
+    await db_obj.favorites.update_one(
+        {'_id': user_id},
+        [{'$set': {'post_ids': {'$slice': [{'$concatArrays': [[post_id], others]}, limit]}}}],
+        upsert=True
+    )
+
+async def remove_favorites(db_obj, user_id: int, post_ids: list):
+    """Прибирає оголошення зі списку збережених."""
+    await db_obj.favorites.update_one({'_id': user_id}, {'$pull': {'post_ids': {'$in': post_ids}}})
+
+async def get_favorites_page(db_obj, user_id: int, offset: int, limit: int):
+    """
+    Повертає (оголошення сторінки у порядку збереження, загальна кількість збережених).
+    Оголошення читаються з основного вузла: на репліці з відставанням щойно створене
+    оголошення могло б виглядати видаленим і помилково зникнути зі збережених.
+    """
+    doc = await db_obj.favorites.find_one({'_id': user_id}, projection={'post_ids': 1})
+    post_ids = doc.get('post_ids', []) if doc else []
+    page_ids = post_ids[offset:offset + limit]
+    if not page_ids:
+        return [], len(post_ids)
+
+    found = {}
+    async for post in db_obj.posts.find({'id': {'$in': page_ids}}):
+        found[post['id']] = post
+
+    missing = [pid for pid in page_ids if pid not in found]
+    if missing:
+        logger.info("Removing %s unavailable posts from favorites of user %s", len(missing), user_id)
+        await remove_favorites(db_obj, user_id, missing)
+
+    return [found[pid] for pid in page_ids if pid in found], len(post_ids) - len(missing)
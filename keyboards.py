@@ -1,5 +1,6 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-from config import CATEGORIES, TYPE_EMOJIS # Імпортуємо CATEGORIES та TYPE_EMOJIS з config
+from config import TYPE_EMOJIS, VIEW_AGE_FILTERS # Імпортуємо TYPE_EMOJIS та VIEW_AGE_FILTERS з config
+from tenants import Tenant # Категорії та райони налаштовуються для кожного бота окремо
 
 def main_kb():
     kb = InlineKeyboardMarkup(row_width=2)
@@ -7,6 +8,7 @@ def main_kb():
         InlineKeyboardButton("➕ Додати", callback_data="add_post"),
         InlineKeyboardButton("🔍 Пошук", callback_data="view_posts"),
         InlineKeyboardButton("🗂️ Мої", callback_data="my_posts"),
+        InlineKeyboardButton("⭐ Збережені", callback_data="saved_posts"),
         InlineKeyboardButton("❓ Допомога", callback_data="help"),
     )
     return kb
@@ -33,13 +35,56 @@ def categories_kb(is_post_creation=True):
     :param is_post_creation: Якщо True, callback_data буде 'post_cat_X', інакше 'view_cat_X'.
     """
     kb = InlineKeyboardMarkup(row_width=2)
-    for i, (full_name_with_emoji, _) in enumerate(CATEGORIES):
+    for i, (full_name_with_emoji, _) in enumerate(Tenant.get_current().categories):
         prefix = "post_cat" if is_post_creation else "view_cat"
         kb.add(InlineKeyboardButton(full_name_with_emoji, callback_data=f"{prefix}_{i}"))
     # Кнопка "Назад до головного меню" внизу
     kb.add(InlineKeyboardButton("⬅️ Назад", callback_data="go_back_to_main_menu"))
     return kb
 
+def districts_kb(is_post_creation=True):
+    """
+    Клавіатура для вибору району.
+    :param is_post_creation: Якщо True, callback_data буде 'post_dist_X' (з можливістю пропустити),
+                             інакше 'view_dist_X' (з варіантом "Усі райони").
+    """
+    kb = InlineKeyboardMarkup(row_width=2)
+    prefix = "post_dist" if is_post_creation else "view_dist"
+    kb.add(*[InlineKeyboardButton(name, callback_data=f"{prefix}_{i}") for i, (name, _) in enumerate(Tenant.get_current().districts)])
+    if is_post_creation:
+        kb.add(InlineKeyboardButton("Пропустити", callback_data="post_dist_skip"))
+    else:
+        kb.add(InlineKeyboardButton("🌍 Усі райони", callback_data="view_dist_all"))
+    kb.add(InlineKeyboardButton("⬅️ Назад", callback_data="go_back_to_prev_step"))
+    return kb
+
+# Ключі callback_data для фільтра за типом (як у type_kb)
+VIEW_TYPE_FILTERS = [("work", "робота"), ("service", "послуга")]
+
+def view_filters_kb(view_type: str, since_days: int, type_counts: dict, age_counts: dict):
+    """
+    Рядки фільтрів списку оголошень з кількістю оголошень для кожного варіанта.
+    :param view_type: Обраний тип ('робота' / 'послуга') або None.
+    :param since_days: Обраний фільтр свіжості (днів) або None.
+    :param type_counts: {тип: кількість} з урахуванням фільтра свіжості.
+    :param age_counts: {днів або None: кількість} з урахуванням фільтра типу (None — усі).
+    """
+    def mark(selected, label):
+        return f"✅ {label}" if selected else label
+
+    kb = InlineKeyboardMarkup(row_width=3)
+    type_buttons = [InlineKeyboardButton(mark(view_type is None, f"Усі ({sum(type_counts.values())})"), callback_data="vfilter_type_all")]
+    for key, typ in VIEW_TYPE_FILTERS:
+        label = f"{TYPE_EMOJIS.get(typ, '')} {typ.capitalize()} ({type_counts.get(typ, 0)})"
+        type_buttons.append(InlineKeyboardButton(mark(view_type == typ, label), callback_data=f"vfilter_type_{key}"))
+    kb.row(*type_buttons)
+
+    age_buttons = [InlineKeyboardButton(mark(since_days is None, f"🕒 Будь-коли ({age_counts.get(None, 0)})"), callback_data="vfilter_age_all")]
+    for label, days in VIEW_AGE_FILTERS:
+        age_buttons.append(InlineKeyboardButton(mark(since_days == days, f"{label} ({age_counts.get(days, 0)})"), callback_data=f"vfilter_age_{days}"))
+    kb.row(*age_buttons)
+    return kb
+
 def confirm_add_post_kb():
     kb = InlineKeyboardMarkup(row_width=2)
     kb.add(
@@ -70,7 +115,7 @@ def pagination_kb(total_posts: int, current_offset: int, posts_per_page: int, ac
     :param total_posts: Загальна кількість оголошень.
     :param current_offset: Поточний відступ (offset).
     :param posts_per_page: Кількість оголошень на сторінці.
-    :param action_prefix: Префікс для callback_data ('viewpage' або 'mypage').
+    :param action_prefix: Префікс для callback_data ('viewpage', 'mypage' або 'savedpage').
     :param context_id: ID категорії або ID користувача для збереження контексту (не використовується для пагінації).
     """
     kb = InlineKeyboardMarkup(row_width=3)
@@ -94,7 +139,7 @@ def pagination_kb(total_posts: int, current_offset: int, posts_per_page: int, ac
     if buttons: # Додаємо рядок з кнопками пагінації, тільки якщо вони існують
         kb.row(*buttons)
 
-    if action_prefix == 'mypage': # Для моїх оголошень
+    if action_prefix in ('mypage', 'savedpage'): # Для моїх та збережених оголошень
         kb.add(InlineKeyboardButton("⬅️ Назад до головного меню", callback_data='go_back_to_main_menu'))
     else: # Для перегляду оголошень
         kb.add(InlineKeyboardButton("⬅️ Назад до вибору категорії", callback_data='view_posts'))
@@ -110,6 +155,14 @@ def confirm_delete_kb(post_id: int):
     )
     return kb
 
+def photos_kb(has_photos: bool):
+    kb = InlineKeyboardMarkup(row_width=1)
+    kb.add(InlineKeyboardButton("➡️ Далі" if has_photos else "Пропустити", callback_data="photo_done"))
+    if has_photos:
+        kb.add(InlineKeyboardButton("🗑️ Прибрати фото", callback_data="photo_clear"))
+    kb.add(InlineKeyboardButton("⬅️ Назад", callback_data="go_back_to_prev_step"))
+    return kb
+
 def contact_kb():
     kb = InlineKeyboardMarkup(row_width=1)
     kb.add(InlineKeyboardButton("Пропустити", callback_data="skip_cont"))
@@ -0,0 +1,485 @@
+"""
+Навантажувальний тест усього бота.
+
+Відтворює записані або синтетичні потоки оновлень Telegram (/start, перегляд категорій,
+пагінація, додавання та видалення оголошень) через диспетчер бота проти фейкового
+Bot API-сервера та локальної MongoDB. Оновлення подаються з цільовою частотою від
+багатьох одночасних чатів; наприкінці друкується пропускна здатність та
+p50/p95/p99 затримки для кожного обробника.
+
+Приклади:
+    python loadtest.py --chats 200 --rate 500 --duration 60
+    python loadtest.py --replay updates.jsonl --rate 300 --loop
+"""
+import argparse
+import asyncio
+import contextvars
+import itertools
+import json
+import logging
+import os
+import random
+import time
+from collections import defaultdict
+
+from aiohttp import web
+
+from post_index import page_cursor
+
+logger = logging.getLogger(__name__)
+
+# Фейковий токен у коректному для aiogram форматі: запити ніколи не йдуть до справжнього Telegram
+LOADTEST_TOKEN = '123456789:LOADTEST'
+LOADTEST_DB_NAME = 'cropservice_loadtest'
+
+# Сюди проміжний шар записує назву обробника, який фактично обробив оновлення
+_handled_by = contextvars.ContextVar('loadtest_handled_by', default=None)
+
+
+# ======== Фейковий Telegram Bot API ========
+class FakeTelegramServer:
+    """Мінімальна імітація Bot API: відповідає на методи, які викликає бот, правдоподібними об'єктами."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000
+        self.calls = defaultdict(int)
+        self._message_ids = itertools.count(1_000_000)
+        self._runner = None
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        app = web.Application()
+        app.router.add_post('/bot{token}/{method}', self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        real_port = site._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{real_port}"
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+    def _message(self, params, message_id=None) -> dict:
+        return {
+            'message_id': message_id or next(self._message_ids),
+            'date': int(time.time()),
+            'chat': {'id': int(params.get('chat_id', 0)), 'type': 'private'},
+            'from': {'id': 123456789, 'is_bot': True, 'first_name': 'KropServiceBot'},
+            'text': params.get('text', ''),
+        }
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info['method'].lower()
+        params = dict(await request.post())
+        self.calls[method] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if method == 'sendmessage':
+            result = self._message(params)
+        elif method == 'editmessagetext':
+            result = self._message(params, int(params.get('message_id', 0)) or None)
+        elif method == 'sendmediagroup':
+            result = [self._message(params)]
+        elif method == 'getme':
+            result = {'id': 123456789, 'is_bot': True, 'first_name': 'KropServiceBot', 'username': 'kropservice_bot'}
+        else:
+            # answerCallbackQuery, deleteMessage, answerInlineQuery тощо
+            result = True
+        return web.json_response({'ok': True, 'result': result})
+
+
+# ======== Синтетичні сесії користувачів ========
+_update_ids = itertools.count(1)
+
+
+class ChatSession:
+    """Один синтетичний користувач у приватному чаті з ботом."""
+
+    def __init__(self, chat_id: int):
+        self.chat_id = chat_id
+        self.user = {'id': chat_id, 'is_bot': False, 'first_name': 'Load', 'username': f"load_{chat_id}"}
+        self.chat = {'id': chat_id, 'type': 'private', 'first_name': 'Load'}
+        self._message_ids = itertools.count(1)
+
+    def message(self, text: str) -> dict:
+        msg = {
+            'message_id': next(self._message_ids),
+            'date': int(time.time()),
+            'chat': self.chat,
+            'from': self.user,
+            'text': text,
+        }
+        if text.startswith('/'):
+            msg['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}]
+        return {'update_id': next(_update_ids), 'message': msg}
+
+    def photo(self, file_id: str) -> dict:
+        """Повідомлення з фото, вже завантаженим у Telegram (бот отримує лише file_id)."""
+        msg = {
+            'message_id': next(self._message_ids),
+            'date': int(time.time()),
+            'chat': self.chat,
+            'from': self.user,
+            'photo': [
+                {'file_id': f"{file_id}_s", 'file_unique_id': f"{file_id}_s", 'width': 90, 'height': 60},
+                {'file_id': f"{file_id}_x", 'file_unique_id': f"{file_id}_x", 'width': 1280, 'height': 853},
+            ],
+        }
+        return {'update_id': next(_update_ids), 'message': msg}
+
+    def callback(self, data: str) -> dict:
+        update_id = next(_update_ids)
+        return {
+            'update_id': update_id,
+            'callback_query': {
+                'id': str(update_id),
+                'from': self.user,
+                'chat_instance': str(self.chat_id),
+                'data': data,
+                'message': {
+                    'message_id': 1,
+                    'date': int(time.time()),
+                    'chat': self.chat,
+                    'from': {'id': 123456789, 'is_bot': True, 'first_name': 'KropServiceBot'},
+                    'text': '...',
+                },
+            },
+        }
+
+
+    def inline_query(self, query: str, offset: str = '') -> dict:
+        update_id = next(_update_ids)
+        return {
+            'update_id': update_id,
+            'inline_query': {'id': str(update_id), 'from': self.user, 'query': query, 'offset': offset},
+        }
+
+
+def _random_category() -> int:
+    from config import CATEGORIES
+    return random.randrange(len(CATEGORIES))
+
+
+def _random_district() -> int:
+    from config import DISTRICTS
+    return random.randrange(len(DISTRICTS))
+
+
+async def flow_start(session: ChatSession, db):
+    yield session.message('/start')
+
+
+async def flow_browse(session: ChatSession, db):
+    yield session.callback('view_posts')
+    yield session.callback(f"view_cat_{_random_category()}")
+    yield session.callback('viewpage_5')
+    yield session.callback(random.choice(['vfilter_type_work', 'vfilter_type_service', 'vfilter_type_all']))
+    yield session.callback(random.choice(['vfilter_age_1', 'vfilter_age_7', 'vfilter_age_all']))
+    yield session.callback('view_district')
+    yield session.callback(random.choice(['view_dist_all', f"view_dist_{_random_district()}"]))
+    yield session.callback('viewpage_0')
+    yield session.callback('go_back_to_prev_step')
+
+
+async def flow_add_post(session: ChatSession, db):
+    yield session.callback('add_post')
+    yield session.callback(random.choice(['type_work', 'type_service']))
+    yield session.callback(f"post_cat_{_random_category()}")
+    yield session.callback(random.choice(['post_dist_skip', f"post_dist_{_random_district()}"]))
+    yield session.message(f"Навантажувальний тест {random.randint(1, 10**6)}: сантехнік, електрик, доставка")
+    for _ in range(random.randint(0, 2)):
+        yield session.photo(f"loadtest-photo-{random.randint(1, 10**6)}")
+    yield session.callback('photo_done')
+    yield session.callback('skip_cont')
+    yield session.callback('confirm_add_post')
+
+
+async def flow_inline_search(session: ChatSession, db):
+    query = random.choice(['', 'са', 'сантех', 'доставка', 'робота репетитор'])
+    yield session.inline_query(query)
+    # Друга сторінка: курсор — 20-те найновіше оголошення (для порожнього запиту — точно, для інших — приблизно)
+    posts = await db.posts.find({}, projection={'id': 1, 'created_at': 1, 'bumped_at': 1}).sort([('bumped_at', -1), ('id', -1)]).skip(19).limit(1).to_list(length=1)
+    if posts:
+        yield session.inline_query(query, offset=page_cursor(posts[0]))
+
+
+async def flow_my_posts(session: ChatSession, db):
+    yield session.callback('my_posts')
+    yield session.callback('mypage_0')
+
+
+async def flow_saved(session: ChatSession, db):
+    # Зберігаємо одне з найновіших оголошень і відкриваємо збережені
+    post = await db.posts.find_one({}, sort=[('bumped_at', -1)], projection={'id': 1, 'photos': 1})
+    if post:
+        yield session.callback(f"fav_{post['id']}")
+        if post.get('photos'):
+            yield session.callback(f"photos_{post['id']}")
+    yield session.callback('saved_posts')
+    yield session.callback('savedpage_0')
+
+
+async def flow_delete(session: ChatSession, db):
+    yield session.callback('my_posts')
+    # Пошук ID оголошення не входить у виміряну затримку
+    posts = await db.posts.find({'user_id': session.chat_id}, projection={'id': 1}).sort('bumped_at', -1).limit(2).to_list(length=2)
+    if len(posts) > 1 and random.random() < 0.5:
+        # Масове видалення через режим вибору
+        yield session.callback('sel_mode')
+        for post in posts:
+            yield session.callback(f"sel_{post['id']}")
+        yield session.callback('sel_delete')
+    elif posts:
+        yield session.callback(f"delete_{posts[0]['id']}")
+
+
+# Відносні ваги сценаріїв у синтетичному потоці
+FLOWS = [
+    (flow_start, 1),
+    (flow_browse, 6),
+    (flow_add_post, 2),
+    (flow_inline_search, 2),
+    (flow_my_posts, 2),
+    (flow_saved, 2),
+    (flow_delete, 1),
+]
+
+
+# ======== Вимірювання ========
+class Pacer:
+    """Рівномірно розподіляє оновлення в часі, щоб загальна частота не перевищувала цільову."""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate > 0 else 0
+        self._next = 0.0
+
+    async def wait(self):
+        if not self.interval:
+            return
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        slot = max(self._next, now)
+        self._next = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def add(self, name: str, seconds: float, failed: bool):
+        self.latencies[name].append(seconds)
+        if failed:
+            self.errors[name] += 1
+
+    @staticmethod
+    def _percentile(sorted_values, pct: float) -> float:
+        if not sorted_values:
+            return 0.0
+        idx = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+        return sorted_values[idx]
+
+    def summary(self, wall_seconds: float) -> dict:
+        handlers = {}
+        total = 0
+        for name, values in self.latencies.items():
+            values = sorted(values)
+            total += len(values)
+            handlers[name] = {
+                'count': len(values),
+                'errors': self.errors.get(name, 0),
+                'p50_ms': self._percentile(values, 50) * 1000,
+                'p95_ms': self._percentile(values, 95) * 1000,
+                'p99_ms': self._percentile(values, 99) * 1000,
+                'max_ms': values[-1] * 1000,
+            }
+        return {
+            'updates': total,
+            'wall_seconds': wall_seconds,
+            'throughput_ups': total / wall_seconds if wall_seconds else 0.0,
+            'handlers': handlers,
+        }
+
+
+def make_tracking_middleware():
+    """Проміжний шар, що запам'ятовує назву обробника та факт помилки для поточного оновлення."""
+    from aiogram.dispatcher.handler import current_handler
+    from aiogram.dispatcher.middlewares import BaseMiddleware
+
+    class HandlerTrackingMiddleware(BaseMiddleware):
+        @staticmethod
+        def _remember_handler():
+            box = _handled_by.get()
+            if box is not None:
+                box['handler'] = getattr(current_handler.get(None), '__name__', 'unknown')
+
+        async def on_process_message(self, message, data):
+            self._remember_handler()
+
+        async def on_process_callback_query(self, call, data):
+            self._remember_handler()
+
+        async def on_process_inline_query(self, query, data):
+            self._remember_handler()
+
+        async def on_pre_process_error(self, update, exception, data):
+            box = _handled_by.get()
+            if box is not None:
+                box['error'] = True
+
+    return HandlerTrackingMiddleware()
+
+
+async def process_one(dp, raw_update: dict, recorder: Recorder):
+    from aiogram import types
+
+    box = {'handler': 'unhandled', 'error': False}
+    token = _handled_by.set(box)
+    started = time.perf_counter()
+    try:
+        await dp.process_updates([types.Update(**raw_update)])
+    except Exception as e:
+        box['error'] = True
+        logger.debug("Update %s raised: %s", raw_update.get('update_id'), e)
+    finally:
+        _handled_by.reset(token)
+    recorder.add(box['handler'], time.perf_counter() - started, box['error'])
+
+
+async def run_synthetic_chat(dp, db, chat_id: int, pacer: Pacer, recorder: Recorder, deadline: float):
+    session = ChatSession(chat_id)
+    flows, weights = zip(*FLOWS)
+    loop = asyncio.get_running_loop()
+
+    async for update in flow_start(session, db):
+        await pacer.wait()
+        await process_one(dp, update, recorder)
+
+    while loop.time() < deadline:
+        flow = random.choices(flows, weights=weights)[0]
+        async for update in flow(session, db):
+            if loop.time() >= deadline:
+                return
+            await pacer.wait()
+            await process_one(dp, update, recorder)
+
+
+def load_replay(path: str) -> dict:
+    """Групує записані оновлення за чатом, зберігаючи порядок усередині кожного чату."""
+    by_chat = defaultdict(list)
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            update = json.loads(line)
+            event = update.get('message') or update.get('callback_query') or update.get('inline_query') or {}
+            chat = (event.get('message') or event).get('chat') or event.get('from') or {}
+            by_chat[chat.get('id', 0)].append(update)
+    return by_chat
+
+
+async def run_replay_chat(dp, updates: list, pacer: Pacer, recorder: Recorder, deadline: float, loop_forever: bool):
+    loop = asyncio.get_running_loop()
+    while True:
+        for update in updates:
+            if loop.time() >= deadline:
+                return
+            await pacer.wait()
+            # Кожне повторне відтворення отримує свіжий update_id
+            await process_one(dp, dict(update, update_id=next(_update_ids)), recorder)
+        if not loop_forever:
+            return
+
+
+def print_report(summary: dict, api_calls: dict):
+    print(f"\nОновлень: {summary['updates']} за {summary['wall_seconds']:.1f} с "
+          f"→ {summary['throughput_ups']:.1f} оновлень/с")
+    print(f"{'Обробник':<28}{'к-сть':>8}{'помилки':>9}{'p50, мс':>10}{'p95, мс':>10}{'p99, мс':>10}{'max, мс':>10}")
+    for name, h in sorted(summary['handlers'].items(), key=lambda kv: -kv[1]['count']):
+        print(f"{name:<28}{h['count']:>8}{h['errors']:>9}{h['p50_ms']:>10.1f}{h['p95_ms']:>10.1f}"
+              f"{h['p99_ms']:>10.1f}{h['max_ms']:>10.1f}")
+    print("\nВиклики Bot API: " + ", ".join(f"{m}={n}" for m, n in sorted(api_calls.items())))
+
+
+async def run(args):
+    # Конфігурацію потрібно підмінити до імпорту модулів бота
+    os.environ['API_TOKEN'] = LOADTEST_TOKEN
+    os.environ['MONGO_DB_URL'] = args.mongo_url
+    os.environ['MONGO_DB_NAME'] = args.db_name
+    os.environ['TENANTS_FILE'] = ''  # Тестуємо одного бота
+
+    import main as bot_main
+    from aiogram import Bot, Dispatcher
+    from aiogram.bot.api import TelegramAPIServer
+
+    logging.getLogger().setLevel(args.log_level)
+
+    fake_api = FakeTelegramServer(latency_ms=args.api_latency_ms)
+    base_url = await fake_api.start()
+    bot_main.bot.server = TelegramAPIServer.from_base(base_url)
+
+    dp = bot_main.dp
+    Bot.set_current(dp.bot)
+    Dispatcher.set_current(dp)
+    dp.middleware.setup(make_tracking_middleware())
+
+    await bot_main.init_db_connection()
+    db = bot_main.tenants[0].db
+
+    pacer = Pacer(args.rate)
+    recorder = Recorder()
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    deadline = started + args.duration
+
+    if args.replay:
+        by_chat = load_replay(args.replay)
+        workers = [run_replay_chat(dp, updates, pacer, recorder, deadline, args.loop) for updates in by_chat.values()]
+    else:
+        workers = [
+            run_synthetic_chat(dp, db, args.first_chat_id + i, pacer, recorder, deadline)
+            for i in range(args.chats)
+        ]
+
+    try:
+        await asyncio.gather(*workers)
+    finally:
+        wall = loop.time() - started
+        summary = recorder.summary(wall)
+        print_report(summary, fake_api.calls)
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump(summary, f, ensure_ascii=False, indent=2)
+
+        if args.drop_db:
+            await bot_main.db_client.drop_database(args.db_name)
+        bot_main.db_client.close()
+        session = await dp.bot.get_session()
+        await session.close()
+        await fake_api.stop()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Навантажувальний тест KropServiceBot через фейковий Bot API.")
+    parser.add_argument('--chats', type=int, default=100, help="кількість одночасних синтетичних чатів")
+    parser.add_argument('--rate', type=float, default=200, help="цільова частота оновлень/с (0 — без обмеження)")
+    parser.add_argument('--duration', type=float, default=30, help="тривалість тесту в секундах")
+    parser.add_argument('--replay', help="JSONL-файл записаних оновлень Telegram замість синтетичного потоку")
+    parser.add_argument('--loop', action='store_true', help="повторювати записаний потік до кінця тесту")
+    parser.add_argument('--api-latency-ms', type=float, default=0, help="штучна затримка відповіді фейкового Bot API")
+    parser.add_argument('--mongo-url', default='mongodb://localhost:27017')
+    parser.add_argument('--db-name', default=LOADTEST_DB_NAME)
+    parser.add_argument('--drop-db', action='store_true', help="видалити тестову базу після завершення")
+    parser.add_argument('--first-chat-id', type=int, default=10_000_000)
+    parser.add_argument('--json', help="зберегти підсумок у JSON-файл")
+    parser.add_argument('--log-level', default='WARNING')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    asyncio.run(run(parse_args()))
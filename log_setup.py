@@ -0,0 +1,147 @@
+"""
+Асинхронне структуроване логування.
+
+Обробники бота лише кладуть LogRecord у чергу (без форматування), а форматування у JSON
+та запис у потік виконує окремий потік QueueListener, тож event loop не блокується на I/O.
+Кожен запис доповнюється полями update_id / chat_id / handler / tenant поточного оновлення,
+а для шумних логерів можна задати частку INFO/DEBUG-повідомлень, що записуються.
+"""
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+
+from aiogram.dispatcher.handler import current_handler
+from aiogram.dispatcher.middlewares import BaseMiddleware
+
+from tenants import Tenant
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+update_id_var = ContextVar('log_update_id', default=None)
+chat_id_var = ContextVar('log_chat_id', default=None)
+
+
+class UpdateContextFilter(logging.Filter):
+    """Додає до запису ідентифікатори поточного оновлення (виконується в потоці event loop)."""
+
+    def filter(self, record):
+        record.update_id = update_id_var.get()
+        record.chat_id = chat_id_var.get()
+        record.handler = getattr(current_handler.get(None), '__name__', None)
+        record.tenant = getattr(Tenant.get_current(), 'name', None)
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Пропускає лише частку повідомлень рівня INFO і нижче для заданих логерів.
+    Частка береться за найдовшим збігом імені (`utils` діє і на `utils.sub`);
+    попередження та помилки ніколи не відкидаються.
+    """
+
+    def __init__(self, rates: dict):
+        super().__init__()
+        self.rates = rates
+        self._cache = {}
+
+    def _rate_for(self, name: str) -> float:
+        rate = self._cache.get(name)
+        if rate is None:
+            rate = 1.0
+            candidate = name
+            while candidate:
+                if candidate in self.rates:
+                    rate = self.rates[candidate]
+                    break
+                candidate = candidate.rpartition('.')[0]
+            self._cache[name] = rate
+        return rate
+
+    def filter(self, record):
+        if record.levelno > logging.INFO or not self.rates:
+            return True
+        rate = self._rate_for(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class JsonFormatter(logging.Formatter):
+    """Один JSON-об'єкт на рядок."""
+
+    def format(self, record):
+        entry = {
+            'ts': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key in ('update_id', 'chat_id', 'handler', 'tenant'):
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler, що не форматує запис перед постановкою в чергу:
+    стандартний prepare() викликає format() у потоці, який логує, тобто в event loop.
+    Черга живе в тому ж процесі, тож запис не потрібно серіалізувати.
+    Лише текст повідомлення підставляється одразу: аргументи можуть бути змінюваними
+    об'єктами, які зміняться, поки запис чекає в черзі.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def setup_logging(level: str = 'INFO', fmt: str = 'json', sample_rates: dict = None) -> QueueListener:
+    """Замінює обробники кореневого логера на чергу з фоновим записом у stderr."""
+    log_queue = queue.SimpleQueue()
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(JsonFormatter() if fmt == 'json' else logging.Formatter(TEXT_FORMAT))
+
+    listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    queue_handler = DeferredQueueHandler(log_queue)
+    # Спочатку вибірка, щоб для відкинутих записів не збирати контекст
+    queue_handler.addFilter(SamplingFilter(sample_rates or {}))
+    queue_handler.addFilter(UpdateContextFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+    return listener
+
+
+class LoggingContextMiddleware(BaseMiddleware):
+    """Запам'ятовує update_id та chat_id оновлення, що обробляється, для всіх подальших записів логу."""
+
+    async def on_pre_process_update(self, update, data):
+        update_id_var.set(update.update_id)
+
+        chat_id = None
+        if update.message:
+            chat_id = update.message.chat.id
+        elif update.callback_query:
+            if update.callback_query.message:
+                chat_id = update.callback_query.message.chat.id
+            else:
+                chat_id = update.callback_query.from_user.id
+        elif update.inline_query:
+            chat_id = update.inline_query.from_user.id
+        chat_id_var.set(chat_id)
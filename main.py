@@ -1,84 +1,300 @@
 import os
 import asyncio
+import contextvars
+import hmac
 import logging
 import re
+import time
 from datetime import datetime, timedelta
 from aiohttp import web  # додай цей імпорт
 
 from aiogram import Bot, Dispatcher, types
-from aiogram.contrib.fsm_storage.memory import MemoryStorage
 from aiogram.dispatcher import FSMContext
 from aiogram.types import CallbackQuery, Message, InlineKeyboardMarkup, InlineKeyboardButton
-from aiogram.utils.executor import start_webhook
 from aiogram.utils.exceptions import BadRequest, TelegramAPIError, MessageNotModified, MessageToDeleteNotFound
 
 import motor.motor_asyncio
 from motor.core import AgnosticClient, AgnosticDatabase
 from pymongo import DESCENDING, ASCENDING, ReturnDocument
+from pymongo.read_preferences import Primary, PrimaryPreferred, Secondary, SecondaryPreferred, Nearest
 
 # Імпорт модулів бота
-from config import API_TOKEN, MONGO_DB_URL, WEBHOOK_HOST, WEBHOOK_PATH, WEBAPP_HOST, WEBAPP_PORT, POST_LIFETIME_DAYS, MY_POSTS_PER_PAGE, VIEW_POSTS_PER_PAGE, CATEGORIES, TYPE_EMOJIS
+from config import (
+    MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE, MONGO_MAX_IDLE_TIME_MS, MONGO_CONNECT_TIMEOUT_MS,
+    MONGO_SERVER_SELECTION_TIMEOUT_MS, MONGO_SOCKET_TIMEOUT_MS, MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    MONGO_LISTING_READ_PREFERENCE, MONGO_MAX_STALENESS_SECONDS, READ_YOUR_WRITES_WINDOW_SECONDS,
+    DB_READ_TIMEOUT_SECONDS, DB_WRITE_TIMEOUT_SECONDS, DB_BREAKER_FAILURES, DB_BREAKER_RESET_SECONDS, STALE_PAGES_MAX,
+)
+from config import MONGO_DB_URL, TENANTS_FILE, WEBHOOK_HOST, WEBHOOK_REPLY, WEBAPP_HOST, WEBAPP_PORT, POST_LIFETIME_DAYS, POST_RENEW_MIN_AGE_HOURS, MY_POSTS_PER_PAGE, VIEW_POSTS_PER_PAGE, SAVED_POSTS_PER_PAGE, FAVORITES_LIMIT, MAX_POST_PHOTOS, VIEW_COUNTER_FLUSH_INTERVAL, ACTIVITY_FLUSH_INTERVAL, SESSION_SWEEP_INTERVAL, VIEW_AGE_FILTERS, TYPE_EMOJIS, INLINE_RESULTS_PER_PAGE, INLINE_CACHE_TIME, INLINE_INDEX_PRUNE_INTERVAL, ADMIN_IDS, ADMIN_API_TOKEN, PROFILE_DIR, PROFILE_MAX_SECONDS, PROFILE_SAMPLE_INTERVAL_MS, PROFILE_SLOW_CALLBACK_MS, LOG_LEVEL, LOG_FORMAT, LOG_SAMPLE_RATES, TRACING_ENABLED, TRACE_SLOW_MS, TRACE_SAMPLE_RATE, TRACE_EXPORT_PATH, TRACE_OTLP_URL
 from states import AppStates
-from keyboards import main_kb, categories_kb, confirm_add_post_kb, post_actions_kb, edit_post_kb, pagination_kb, confirm_delete_kb, back_kb, type_kb, contact_kb
-
+from keyboards import main_kb, categories_kb, districts_kb, view_filters_kb, VIEW_TYPE_FILTERS, confirm_add_post_kb, post_actions_kb, edit_post_kb, pagination_kb, confirm_delete_kb, back_kb, type_kb, contact_kb, photos_kb
+
+from log_setup import LoggingContextMiddleware, setup_logging
+from tenants import Tenant, TenantAttribute, TenantMiddleware, bind_tenant, RecordingDispatcher, TenantWebhookHandler, TENANT_BY_PATH_KEY, load_tenants
+from tracing import TracingMiddleware, TailSamplingExporter, MongoCommandTracer, TracedBot, TracedStorage
+from resilience import CircuitBreaker, CircuitOpenError, StalePageCache, DB_FAILURES
+from profiling import Profiler, ProfilerBusyError, PROFILE_MODES
+from webhook_reply import ReplyingWebhookHandler, answer_callback
+from favorites import add_favorite, remove_favorites, get_favorites_page
+from stats import StatsMiddleware, ensure_stats_indexes, record_post_created, record_post_deleted, record_posts_deleted, record_posts_renewed, run_expiry_sweep, read_report, backfill_rollups
 # Імпортуємо update_or_send_interface_message, can_edit, get_next_sequence_value з utils
-from utils import escape_markdown_v2, update_or_send_interface_message, can_edit, get_next_sequence_value
-
-async def run_healthcheck_server():
-    async def handle_root(request):
-        return web.json_response({"status": "OK", "service": "CropServiceBot"})
-
-    app = web.Application()
-    app.router.add_get("/", handle_root)
-    runner = web.AppRunner(app)
-    await runner.setup()
-    site = web.TCPSite(runner, WEBAPP_HOST, WEBAPP_PORT)
-    await site.start()
-    logging.info("✅ Healthcheck endpoint доступний на '/'")
+from utils import escape_markdown_v2, format_post_card, update_or_send_interface_message, can_edit, get_next_sequence_value, photo_record, photo_caption
+
+# Логування: форматування та запис відбуваються у фоновому потоці, а не в event loop.
+# Ім'я логера фіксоване, бо при запуску як скрипту __name__ == '__main__'.
+setup_logging(LOG_LEVEL, LOG_FORMAT, LOG_SAMPLE_RATES)
+logger = logging.getLogger('main')
+
+def is_admin_request(request) -> bool:
+    """Перевіряє токен адміністратора в заголовку X-Admin-Token."""
+    token = request.headers.get('X-Admin-Token', '')
+    return bool(ADMIN_API_TOKEN) and hmac.compare_digest(token, ADMIN_API_TOKEN)
+
+def tenant_from_request(request) -> Tenant:
+    """Орендар з параметра `?tenant=` (за замовчуванням — перший)."""
+    name = request.query.get('tenant')
+    if not name:
+        return tenants[0]
+    for tenant in tenants:
+        if tenant.name == name:
+            return tenant
+    raise web.HTTPNotFound(text=f"Unknown tenant: {name}")
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-logging.getLogger().addHandler(logging.StreamHandler())
-
-bot = Bot(token=API_TOKEN)
-dp = Dispatcher(bot, storage=MemoryStorage())
-
-# Глобальні змінні для бази даних
+async def handle_root(request):
+    return web.json_response({"status": "OK", "service": "CropServiceBot", "tenants": [t.name for t in tenants]})
+
+async def handle_stats(request):
+    if not is_admin_request(request):
+        raise web.HTTPForbidden()
+    tenant = tenant_from_request(request)
+    days = request.query.get('days', '7')
+    days = int(days) if days.isdigit() and int(days) > 0 else 7
+    try:
+        report = await db_breaker.call(lambda: read_report(tenant.db, days, POST_LIFETIME_DAYS), DB_READ_TIMEOUT_SECONDS)
+    except (CircuitOpenError, *DB_FAILURES) as e:
+        raise web.HTTPServiceUnavailable(text=f"Database unavailable: {e!r}")
+    return web.json_response(report)
+
+async def handle_metrics(request):
+    if not is_admin_request(request):
+        raise web.HTTPForbidden()
+    return web.json_response({
+        'tenants': {
+            tenant.name: {
+                'prefetch': tenant.page_prefetcher.stats(),
+                'view_counts': tenant.view_counts.stats(),
+                'inline_index_posts': len(tenant.post_index),
+                'view_counters_flushed': tenant.view_counter.flushed,
+                'sessions': tenant.sessions.stats(),
+            }
+            for tenant in tenants
+        },
+        'db_breaker': db_breaker.stats(),
+        'stale_pages': stale_pages.stats(),
+    })
+
+def profile_seconds(value: str) -> int:
+    """Тривалість сеансу профілювання з параметра (за замовчуванням 30 с, не більше PROFILE_MAX_SECONDS)."""
+    seconds = int(value) if value and value.isdigit() and int(value) > 0 else 30
+    return min(seconds, PROFILE_MAX_SECONDS)
+
+async def handle_profile(request):
+    """
+    GET — стан профілювання; POST — запуск сеансу
+    (?seconds=30&mode=wall|cpu&handlers=show_view_posts_page,...&slow_ms=100); DELETE — дострокове завершення.
+    """
+    if not is_admin_request(request):
+        raise web.HTTPForbidden()
+    if request.method == 'GET':
+        return web.json_response(profiler.status())
+    if request.method == 'DELETE':
+        return web.json_response(await profiler.stop())
+
+    handlers = request.query.get('handlers')
+    slow_ms = request.query.get('slow_ms', '')
+    try:
+        status = profiler.start(
+            profile_seconds(request.query.get('seconds')),
+            request.query.get('mode', 'wall'),
+            handlers.split(',') if handlers is not None else None,
+            float(slow_ms) if slow_ms else PROFILE_SLOW_CALLBACK_MS,
+        )
+    except ProfilerBusyError as e:
+        raise web.HTTPConflict(text=str(e))
+    except ValueError as e:
+        raise web.HTTPBadRequest(text=str(e))
+    return web.json_response(status, status=202)
+
+# Трасування вмикається обгортками навколо Bot, FSM-сховища та Motor, тож вимкнене нічого не коштує
+trace_exporter = TailSamplingExporter(TRACE_EXPORT_PATH, TRACE_OTLP_URL, TRACE_SLOW_MS, TRACE_SAMPLE_RATE)
+
+# Боти (міста), які обслуговує цей процес; без TENANTS_FILE — один бот з API_TOKEN
+tenants = load_tenants(TENANTS_FILE)
+
+def create_bot(token: str) -> Bot:
+    return TracedBot(token=token) if TRACING_ENABLED else Bot(token=token)
+
+def create_storage(tenant: Tenant):
+    return TracedStorage(tenant.sessions) if TRACING_ENABLED else tenant.sessions
+
+def setup_middlewares(dp_obj: Dispatcher, tenant: Tenant):
+    # Орендар має стати поточним раніше, ніж його використають інші middleware
+    dp_obj.middleware.setup(TenantMiddleware(tenant))
+    if TRACING_ENABLED:
+        dp_obj.middleware.setup(TracingMiddleware(trace_exporter))
+    dp_obj.middleware.setup(LoggingContextMiddleware())
+    dp_obj.middleware.setup(StatsMiddleware(tenant.activity))
+
+# Обробники нижче реєструються на диспетчері першого бота і відтворюються для решти (setup_tenant_dispatchers)
+bot = create_bot(tenants[0].token)
+dp = RecordingDispatcher(bot, storage=create_storage(tenants[0]))
+tenants[0].bot, tenants[0].dp = bot, dp
+setup_middlewares(dp, tenants[0])
+
+# Спільний клієнт MongoDB для всіх ботів
 db_client: AgnosticClient = None
-db: AgnosticDatabase = None
+
+# Запобіжник звернень до MongoDB: при інциденті екрани не чекають тайм-аутів драйвера
+db_breaker = CircuitBreaker('mongo', DB_BREAKER_FAILURES, DB_BREAKER_RESET_SECONDS)
+# Останні вдалі сторінки списків (усіх ботів) для показу, поки база недоступна
+stale_pages = StalePageCache(STALE_PAGES_MAX)
+
+# Профілювання на вимогу — спільне для всього процесу
+profiler = Profiler(PROFILE_DIR, PROFILE_SAMPLE_INTERVAL_MS / 1000)
+
+# Стан поточного бота (встановлюється TenantMiddleware для кожного оновлення)
+db: AgnosticDatabase = TenantAttribute('db')
+# Індекс живих оголошень у пам'яті для inline-пошуку
+post_index = TenantAttribute('post_index')
+# Перегляди оголошень накопичуються в пам'яті і записуються пачками
+view_counter = TenantAttribute('view_counter')
+# Сусідні сторінки списків, побудовані заздалегідь
+page_prefetcher = TenantAttribute('page_prefetcher')
+# Кількості оголошень списків перегляду
+view_counts = TenantAttribute('view_counts')
 
 # ======== Функції бази даних (перенесені з main.py для чистоти) ========
+READ_PREFERENCES = {
+    'primaryPreferred': PrimaryPreferred,
+    'secondary': Secondary,
+    'secondaryPreferred': SecondaryPreferred,
+    'nearest': Nearest,
+}
+
+def listing_read_preference():
+    """Read preference для списків оголошень з обмеженою застарілістю вторинних вузлів."""
+    mode = READ_PREFERENCES.get(MONGO_LISTING_READ_PREFERENCE)
+    if mode is None:
+        return Primary()
+    return mode(max_staleness=MONGO_MAX_STALENESS_SECONDS)
+
+def mark_user_write(user_id: int):
+    """
+    Запам'ятовує запис користувача, щоб його наступні читання йшли на основний вузол,
+    і скидає заздалегідь побудовані для нього сторінки (вони вже застаріли).
+    """
+    page_prefetcher.invalidate(user_id)
+    recent_writes = Tenant.get_current().recent_writes
+    now = time.monotonic()
+    recent_writes[user_id] = now
+    if len(recent_writes) > 10000:
+        for uid, written_at in list(recent_writes.items()):
+            if now - written_at >= READ_YOUR_WRITES_WINDOW_SECONDS:
+                del recent_writes[uid]
+
+def posts_for_read(user_id: int):
+    """
+    Колекція для читання списків оголошень: вторинні вузли, але основний вузол,
+    якщо користувач щойно щось записав (щоб він одразу бачив свої зміни).
+    """
+    tenant = Tenant.get_current()
+    written_at = tenant.recent_writes.get(user_id)
+    if written_at is not None:
+        if time.monotonic() - written_at < READ_YOUR_WRITES_WINDOW_SECONDS:
+            return tenant.db.posts
+        del tenant.recent_writes[user_id]
+    return tenant.posts_listing
+
 async def init_db_connection():
-    """Ініціалізує підключення до MongoDB та створює необхідні індекси."""
-    global db_client, db
+    """Ініціалізує спільне підключення до MongoDB та бази даних усіх ботів."""
+    global db_client
     try:
-        logging.info("Підключення до MongoDB...")
-        db_client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_DB_URL)
-        db = db_client.cropservice_db # Назва вашої бази даних
-        logging.info("Підключення до MongoDB успішно встановлено.")
+        logger.info("Підключення до MongoDB...")
+        db_client = motor.motor_asyncio.AsyncIOMotorClient(
+            MONGO_DB_URL,
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=MONGO_MIN_POOL_SIZE,
+            maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+            connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+            serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+            waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            event_listeners=[MongoCommandTracer()] if TRACING_ENABLED else [],
+        )
+        logger.info("Підключення до MongoDB успішно встановлено.")
+    except Exception as e:
+        logger.critical("Помилка підключення до MongoDB: %s", e, exc_info=True)
+        exit(1)
 
+    for tenant in tenants:
+        await init_tenant_db(tenant)
+
+# Індекси за created_at, які замінили індекси за bumped_at
+OBSOLETE_POST_INDEXES = ('created_at_1', 'category_1_created_at_-1', 'category_1_district_1_created_at_-1', 'user_id_1_created_at_-1')
+
+async def migrate_bumped_at(db_obj):
+    """
+    Переводить оголошення, створені до появи поля bumped_at: воно дорівнює created_at.
+    Після цього прибирає TTL-індекс на created_at (він видаляв би поновлені оголошення)
+    і складені індекси за created_at, замінені індексами за bumped_at.
+    """
+    result = await db_obj.posts.update_many({'bumped_at': {'$exists': False}}, [{'$set': {'bumped_at': '$created_at'}}])
+    if result.modified_count:
+        logger.info("Додано 'bumped_at' до %s оголошень.", result.modified_count)
+    existing = await db_obj.posts.index_information()
+    for name in OBSOLETE_POST_INDEXES:
+        if name in existing:
+            await db_obj.posts.drop_index(name)
+            logger.info("Видалено застарілий індекс '%s' колекції 'posts'.", name)
+
+async def init_tenant_db(tenant: Tenant):
+    """Відкриває базу даних бота на спільному клієнті та створює необхідні індекси."""
+    tenant.db = db = db_client[tenant.db_name]
+    tenant.posts_listing = db.posts.with_options(read_preference=listing_read_preference())
+    logger.info("Бот '%s' використовує базу даних '%s'.", tenant.name, tenant.db_name)
+    try:
         # Створення індексів
-        # TTL індекс для автоматичного видалення старих оголошень
-        await db.posts.create_index("created_at", expireAfterSeconds=int(POST_LIFETIME_DAYS * 24 * 60 * 60))
-        logging.info(f"Створено TTL індекс на 'created_at' для колекції 'posts' з терміном дії {POST_LIFETIME_DAYS} днів.")
+        # TTL індекс для автоматичного видалення старих оголошень (термін дії рахується від останнього поновлення)
+        await db.posts.create_index("bumped_at", expireAfterSeconds=int(POST_LIFETIME_DAYS * 24 * 60 * 60))
+        logger.info("Створено TTL індекс на 'bumped_at' для колекції 'posts' з терміном дії %s днів.", POST_LIFETIME_DAYS)
+        await migrate_bumped_at(db)
 
         # Складений індекс для перегляду публічних оголошень
-        await db.posts.create_index([("category", 1), ("created_at", DESCENDING)])
-        logging.info("Створено складений індекс на '(category, created_at)' для колекції 'posts'.")
+        await db.posts.create_index([("category", 1), ("bumped_at", DESCENDING)])
+        logger.info("Створено складений індекс на '(category, bumped_at)' для колекції 'posts'.")
+
+        # Складений індекс для перегляду оголошень з фільтром за районом
+        await db.posts.create_index([("category", 1), ("district", 1), ("bumped_at", DESCENDING)])
+        logger.info("Створено складений індекс на '(category, district, bumped_at)' для колекції 'posts'.")
 
         # Складений індекс для перегляду 'Моїх оголошень'
-        await db.posts.create_index([("user_id", 1), ("created_at", DESCENDING)])
-        logging.info("Створено складений індекс на '(user_id, created_at)' для колекції 'posts'.")
+        await db.posts.create_index([("user_id", 1), ("bumped_at", DESCENDING)])
+        logger.info("Створено складений індекс на '(user_id, bumped_at)' для колекції 'posts'.")
 
         # Унікальний індекс для користувацького ID оголошення
         await db.posts.create_index("id", unique=True)
-        logging.info("Створено унікальний індекс на 'id' для колекції 'posts'.")
+        logger.info("Створено унікальний індекс на 'id' для колекції 'posts'.")
 
         # Індекс для колекції лічильників (автоматично _id)
         await db.counters.create_index("_id")
-        logging.info("Створено унікальний індекс на '_id' для колекції 'counters'.")
+        logger.info("Створено унікальний індекс на '_id' для колекції 'counters'.")
+
+        # Індекси для колекцій статистики
+        await ensure_stats_indexes(db)
+        logger.info("Створено індекси для колекцій статистики.")
 
     except Exception as e:
-        logging.critical(f"Помилка підключення до MongoDB або створення індексів: {e}", exc_info=True)
+        logger.critical("Помилка створення індексів у базі '%s': %s", tenant.db_name, e, exc_info=True)
         exit(1)
 
 # ======== Допоміжні функції для переходу між станами ========
@@ -95,186 +311,556 @@ WELCOME_MESSAGE = (
 
 async def go_to_main_menu(bot_obj: Bot, chat_id: int, state: FSMContext):
     """Повертає до головного меню, оновлюючи існуюче повідомлення."""
-    logging.info(f"User {chat_id} going to main menu.")
+    logger.info("User %s going to main menu.", chat_id)
+    # Користувач пішов зі списків — їхні сусідні сторінки вже не знадобляться
+    page_prefetcher.cancel(chat_id)
+    await delete_post_album(bot_obj, chat_id, state)
     await update_or_send_interface_message(bot_obj, chat_id, state, WELCOME_MESSAGE, main_kb(), parse_mode='MarkdownV2')
     await state.set_state(AppStates.MAIN_MENU)
 
-async def show_view_posts_page(bot_obj: Bot, chat_id: int, state: FSMContext, offset: int = 0):
-    logging.info(f"Showing view posts page for user {chat_id}, offset {offset}")
+async def delete_post_album(bot_obj: Bot, chat_id: int, state: FSMContext):
+    """Видаляє раніше показаний альбом фото оголошення, щоб фото не накопичувались у чаті."""
+    data = await state.get_data()
+    album_ids = data.get('album_message_ids')
+    if not album_ids:
+        return
+    await state.update_data(album_message_ids=[])
+    for message_id in album_ids:
+        try:
+            await bot_obj.delete_message(chat_id, message_id)
+        except (MessageToDeleteNotFound, BadRequest):
+            pass
+
+def photo_buttons_row(posts: list) -> list:
+    """Кнопки "📷" для оголошень сторінки, що мають фото."""
+    return [InlineKeyboardButton(f"📷 ID {p['id']}", callback_data=f"photos_{p['id']}") for p in posts if p.get('photos')]
+
+def district_filter_button(district: str = None):
+    """Кнопка фільтра за районом у списку оголошень."""
+    label = f"📍 Район: {district}" if district else "📍 Район: усі"
+    return InlineKeyboardButton(label, callback_data="view_district")
+
+# Поля оголошення, потрібні картці списку та кнопкам сторінки
+VIEW_CARD_PROJECTION = {
+    '_id': 0, 'id': 1, 'user_id': 1, 'username': 1, 'type': 1, 'category': 1, 'district': 1,
+    'description': 1, 'contacts': 1, 'photos': 1, 'views': 1, 'created_at': 1, 'bumped_at': 1,
+}
+
+async def fetch_view_page(posts, cat: str, district: str, view_type: str, since_days: int, offset: int):
+    """
+    Отримує сторінку оголошень, їх загальну кількість та кількості для кожного варіанта
+    фільтрів одним агрегаційним запитом ($facet) замість окремих count + find.
+    Початковий $match/$sort за (category[, district], bumped_at) обслуговується індексами,
+    а фільтри типу й свіжості застосовуються всередині гілок $facet: кількості для фільтра
+    типу рахуються без урахування обраного типу (і так само для свіжості), щоб кнопки
+    показували, скільки оголошень буде після перемикання.
+    $facet проходить усю категорію, тому перед ним документи звужуються до полів картки.
+    Повертає (оголошення сторінки, загальна кількість, {тип: к-сть}, {днів або None: к-сть}).
+    """
+    now = datetime.utcnow()
+    base_match = {'category': cat}
+    if district:
+        base_match['district'] = district
+
+    type_match = [{'$match': {'type': view_type}}] if view_type else []
+    age_match = [{'$match': {'bumped_at': {'$gte': now - timedelta(days=since_days)}}}] if since_days else []
+
+    age_group = {'_id': None, 'all': {'$sum': 1}}
+    for _, days in VIEW_AGE_FILTERS:
+        age_group[f"d{days}"] = {'$sum': {'$cond': [{'$gte': ['$bumped_at', now - timedelta(days=days)]}, 1, 0]}}
+
+    pipeline = [
+        {'$match': base_match},
+        {'$sort': {'bumped_at': DESCENDING}},
+        {'$project': VIEW_CARD_PROJECTION},
+        {'$facet': {
+            'page': type_match + age_match + [{'$skip': offset}, {'$limit': VIEW_POSTS_PER_PAGE}],
+            'total': type_match + age_match + [{'$count': 'n'}],
+            'by_type': age_match + [{'$group': {'_id': '$type', 'n': {'$sum': 1}}}],
+            'by_age': type_match + [{'$group': age_group}],
+        }},
+    ]
+    result = (await posts.aggregate(pipeline).to_list(length=1))[0]
+
+    total = result['total'][0]['n'] if result['total'] else 0
+    type_counts = {row['_id']: row['n'] for row in result['by_type']}
+    age_row = result['by_age'][0] if result['by_age'] else {}
+    age_counts = {None: age_row.get('all', 0)}
+    for _, days in VIEW_AGE_FILTERS:
+        age_counts[days] = age_row.get(f"d{days}", 0)
+    return result['page'], total, type_counts, age_counts
+
+async def fetch_view_page_posts(posts, cat: str, district: str, view_type: str, since_days: int, offset: int) -> list:
+    """Лише оголошення сторінки — індексованим find зі skip/limit, без підрахунку категорії."""
+    query = {'category': cat}
+    if district:
+        query['district'] = district
+    if view_type:
+        query['type'] = view_type
+    if since_days:
+        query['bumped_at'] = {'$gte': datetime.utcnow() - timedelta(days=since_days)}
+    cursor = posts.find(query, VIEW_CARD_PROJECTION).sort('bumped_at', DESCENDING).skip(offset)
+    return await cursor.to_list(length=VIEW_POSTS_PER_PAGE)
+
+async def build_view_page(chat_id: int, cat: str, district: str, view_type: str, since_days: int, offset: int) -> dict:
+    """
+    Будує сторінку списку оголошень (текст і клавіатуру) без надсилання,
+    щоб її можна було побудувати заздалегідь у фоні.
+    """
+    posts = posts_for_read(chat_id)
+    counts_key = (cat, district, view_type, since_days)
+    # Після власного запису користувач має одразу бачити точні кількості (posts_for_read вже прибрав застарілі записи)
+    fresh_read = chat_id in Tenant.get_current().recent_writes
+    cached_counts = None if fresh_read else view_counts.get(counts_key)
+
+    page_posts = None
+    if cached_counts is not None:
+        total_posts, type_counts, age_counts = cached_counts
+        page_posts = await fetch_view_page_posts(posts, cat, district, view_type, since_days, offset)
+        # Сторінка не збігається з кількостями (оголошення видалили) — рахуємо заново
+        if len(page_posts) != min(VIEW_POSTS_PER_PAGE, max(total_posts - offset, 0)):
+            page_posts = None
+    if page_posts is None:
+        # Сторінка, загальна кількість та кількості для фільтрів — за один запит
+        page_posts, total_posts, type_counts, age_counts = await fetch_view_page(
+            posts, cat, district, view_type, since_days, offset
+        )
+        view_counts.put(counts_key, (total_posts, type_counts, age_counts))
+
+    filters_keyboard = view_filters_kb(view_type, since_days, type_counts, age_counts)
+
+    if not page_posts: 
+        logger.info("No posts found for category '%s' (district %s, type %s, days %s) for user %s", cat, district, view_type, since_days, chat_id)
+        kb = InlineKeyboardMarkup(row_width=1)
+        # Якщо оголошення є, але не під обрані фільтри, залишаємо можливість їх змінити
+        if type_counts or view_type or since_days:
+            for row in filters_keyboard.inline_keyboard:
+                kb.row(*row)
+        kb.add(
+            district_filter_button(district),
+            InlineKeyboardButton("⬅️ Назад до категорій", callback_data="go_back_to_prev_step"),
+            InlineKeyboardButton("🏠 Головне меню", callback_data="go_back_to_main_menu")
+        )
+        where = f" у районі «{escape_markdown_v2(district)}»" if district else ""
+        if view_type or since_days:
+            text_to_send = f"У категорії «{escape_markdown_v2(cat)}»{where} немає оголошень за обраними фільтрами\\."
+        else:
+            text_to_send = f"У категорії «{escape_markdown_v2(cat)}»{where} поки що немає оголошень\\."
+        return {'text': text_to_send, 'kb': kb, 'posts': [], 'total': total_posts}
+
+    total_pages = (total_posts + VIEW_POSTS_PER_PAGE - 1) // VIEW_POSTS_PER_PAGE
+    current_page = offset // VIEW_POSTS_PER_PAGE + 1
+    
+    district_title = f" · 📍 {escape_markdown_v2(district)}" if district else ""
+    full_text = (f"📋 **{escape_markdown_v2(cat)}**{district_title} \\(Сторінка {escape_markdown_v2(current_page)}/{escape_markdown_v2(total_pages)}\\)\n\n")
+    
+    combined_keyboard = InlineKeyboardMarkup(row_width=1)
+    # Кнопки збереження оголошень сторінки (ID відповідає картці)
+    combined_keyboard.row(*[InlineKeyboardButton(f"⭐ ID {p['id']}", callback_data=f"fav_{p['id']}") for p in page_posts])
+    photo_row = photo_buttons_row(page_posts)
+    if photo_row:
+        combined_keyboard.row(*photo_row)
+    for row in filters_keyboard.inline_keyboard:
+        combined_keyboard.row(*row)
+    combined_keyboard.add(district_filter_button(district))
+
+    # Використовуємо pagination_kb для створення кнопок пагінації
+    nav_keyboard = pagination_kb(total_posts, offset, VIEW_POSTS_PER_PAGE, 'viewpage', cat)
+    for row in nav_keyboard.inline_keyboard:
+        combined_keyboard.row(*row)
+
+    for i, p in enumerate(page_posts):
+        full_text += format_post_card(p)
+        
+        if i < len(page_posts) - 1:
+            full_text += "\n—\n\n" 
+
+    return {'text': full_text, 'kb': combined_keyboard, 'posts': page_posts, 'total': total_posts}
+
+def prefetch_next_page(chat_id: int, page_key: tuple, offset: int, per_page: int, page: dict, build):
+    """
+    Кладе показану сторінку в кеш (для повернення до неї) і запускає фонову побудову наступної.
+    :param page_key: Ключ списку (тип списку і фільтри), до якого додається offset.
+    :param build: Функція offset -> корутина побудови сторінки.
+    """
+    page_prefetcher.put(chat_id, page_key + (offset,), page)
+    # Фонова задача запускається в порожньому контексті, тож орендаря треба встановити явно
+    build = bind_tenant(build)
+    builders = {}
+    if offset + per_page < page['total']:
+        builders[page_key + (offset + per_page,)] = lambda: build(offset + per_page)
+    page_prefetcher.schedule(chat_id, builders)
+
+DB_UNAVAILABLE_TEXT = "⏳ База даних тимчасово недоступна\\. Спробуйте, будь ласка, за хвилину\\."
+
+def db_read(coro_factory):
+    """Читання з MongoDB через запобіжник з дедлайном DB_READ_TIMEOUT_SECONDS."""
+    return db_breaker.call(coro_factory, DB_READ_TIMEOUT_SECONDS)
+
+def db_write(coro_factory):
+    """
+    Запис у MongoDB через запобіжник з дедлайном DB_WRITE_TIMEOUT_SECONDS.
+    Після тайм-ауту запис міг усе ж виконатися на сервері.
+    """
+    return db_breaker.call(coro_factory, DB_WRITE_TIMEOUT_SECONDS)
+
+async def record_stats(coro_factory):
+    """Оновлення статистики: під час збою бази пропускається, не скасовуючи вже виконану дію користувача."""
+    try:
+        await db_write(coro_factory)
+    except (CircuitOpenError, *DB_FAILURES) as e:
+        logger.warning("Stats update skipped, database unavailable: %r", e)
+
+async def show_db_unavailable(bot_obj: Bot, chat_id: int, state: FSMContext):
+    """Повідомляє, що база недоступна, і повертає користувача в головне меню."""
+    await update_or_send_interface_message(bot_obj, chat_id, state, DB_UNAVAILABLE_TEXT, main_kb(), parse_mode='MarkdownV2')
+    await state.set_state(AppStates.MAIN_MENU)
+
+def mark_stale(page: dict, built_at: float) -> dict:
+    """Копія сторінки з позначкою, що дані можуть бути застарілими."""
+    built = datetime.fromtimestamp(built_at).strftime('%H:%M')
+    notice = f"⚠️ _Можливо, неактуальні дані \\(станом на {escape_markdown_v2(built)}\\)_\n\n"
+    return dict(page, text=notice + page['text'])
+
+@profiler.profiled
+async def show_view_posts_page(bot_obj: Bot, chat_id: int, state: FSMContext, offset: int = 0, use_prefetched: bool = False):
+    logger.info("Showing view posts page for user %s, offset %s", chat_id, offset)
     try:
         data = await state.get_data()
         cat = data.get('current_view_category')
+        district = data.get('current_view_district')
 
         if not cat:
-            logging.error(f"Category not found in state for user {chat_id}")
+            logger.error("Category not found in state for user %s", chat_id)
             return await go_to_main_menu(bot_obj, chat_id, state)
 
-        # Отримуємо загальну кількість оголошень для пагінації
-        total_posts = await db.posts.count_documents({'category': cat})
-        
-        # Отримуємо оголошення з MongoDB з сортуванням та пагінацією
-        posts_cursor = db.posts.find(
-            {'category': cat}
-        ).sort([('created_at', DESCENDING)]).skip(offset).limit(VIEW_POSTS_PER_PAGE)
-        
-        page_posts = await posts_cursor.to_list(length=VIEW_POSTS_PER_PAGE)
+        view_type = data.get('view_type')
+        since_days = data.get('view_since_days')
+        page_key = ('view', cat, district, view_type, since_days)
+        # Сторінка списку однакова для всіх користувачів, тож резервна копія спільна
+        stale_key = (Tenant.get_current().name,) + page_key + (offset,)
 
-        if not page_posts: 
-            logging.info(f"No posts found for category '{cat}' for user {chat_id}")
-            kb = InlineKeyboardMarkup(row_width=1).add(
-                InlineKeyboardButton("⬅️ Назад до категорій", callback_data="go_back_to_prev_step"),
-                InlineKeyboardButton("🏠 Головне меню", callback_data="go_back_to_main_menu")
-            )
-            text_to_send = f"У категорії «{escape_markdown_v2(cat)}» поки що немає оголошень\\."
-            return await update_or_send_interface_message(
-                bot_obj, chat_id, state,
-                text_to_send,
-                kb, parse_mode='MarkdownV2'
-            )
+        def load_page(n: int):
+            return db_read(lambda: build_view_page(chat_id, cat, district, view_type, since_days, n))
 
-        await state.update_data(offset=offset)
+        is_stale = False
+        page = page_prefetcher.get(chat_id, page_key + (offset,)) if use_prefetched else None
+        if page is None:
+            try:
+                page = await load_page(offset)
+            except (CircuitOpenError, *DB_FAILURES) as e:
+                cached = stale_pages.get(stale_key)
+                if cached is None:
+                    raise
+                logger.warning("Serving stale listing page %s to user %s: %r", stale_key, chat_id, e)
+                page, is_stale = mark_stale(cached[1], cached[0]), True
+                stale_pages.refresh_in_background(stale_key, bind_tenant(lambda: load_page(offset)))
+        if not is_stale:
+            stale_pages.put(stale_key, page)
+
+        if page['posts']:
+            await state.update_data(offset=offset)
+        await update_or_send_interface_message(bot_obj, chat_id, state, page['text'], page['kb'], parse_mode='MarkdownV2', disable_web_page_preview=True)
+        if not is_stale:
+            # Резервна копія могла містити вже видалені оголошення
+            view_counter.record(page['posts'], chat_id)
+
+        if not is_stale:
+            prefetch_next_page(chat_id, page_key, offset, VIEW_POSTS_PER_PAGE, page, load_page)
+
+    except (CircuitOpenError, *DB_FAILURES) as e:
+        logger.warning("Database unavailable in show_view_posts_page for user %s: %r", chat_id, e)
+        await show_db_unavailable(bot_obj, chat_id, state)
+    except Exception as e:
+        logger.error("Error in show_view_posts_page for user %s: %s", chat_id, e, exc_info=True)
+        await update_or_send_interface_message(bot_obj, chat_id, state, "Вибачте, сталася неочікувана помилка при перегляді оголошень\\. Спробуйте ще раз\\.", main_kb(), parse_mode='MarkdownV2')
+        await state.set_state(AppStates.MAIN_MENU)
+
+async def build_my_posts_page(chat_id: int, offset: int, selected: set = None) -> dict:
+    """
+    Будує сторінку 'Моїх оголошень' (текст і клавіатуру) без надсилання.
+    :param selected: ID вибраних оголошень у режимі вибору (None — звичайний режим).
+    """
+    # Одразу після запису користувача читаємо з основного вузла (read-your-writes)
+    posts = posts_for_read(chat_id)
+
+    # Отримуємо загальну кількість оголошень користувача
+    total_posts = await posts.count_documents({'user_id': chat_id})
+
+    if total_posts == 0:
+        logger.info("No posts found for user %s", chat_id)
+        kb_no_posts = InlineKeyboardMarkup(row_width=1).add(
+            InlineKeyboardButton("➕ Додати оголошення", callback_data="add_post"), 
+            InlineKeyboardButton("🏠 Головне меню", callback_data="go_back_to_main_menu")
+        )
+        return {'text': "🧐 У вас немає оголошень\\.", 'kb': kb_no_posts, 'posts': [], 'total': 0}
+
+    # Отримуємо оголошення користувача з MongoDB, сортуємо за датою та пагінуємо
+    user_posts_cursor = posts.find(
+        {'user_id': chat_id}
+    ).sort([('bumped_at', DESCENDING)]).skip(offset).limit(MY_POSTS_PER_PAGE)
+    
+    page_posts = await user_posts_cursor.to_list(length=MY_POSTS_PER_PAGE)
+
+    total_pages = (total_posts + MY_POSTS_PER_PAGE - 1) // MY_POSTS_PER_PAGE
+    current_page = offset // MY_POSTS_PER_PAGE + 1
+    
+    full_text = f"🗂️ **Мої оголошення** \\(Сторінка {escape_markdown_v2(current_page)}/{escape_markdown_v2(total_pages)}\\)\n\n"
+    
+    combined_keyboard = InlineKeyboardMarkup(row_width=2) 
+
+    for i, p in enumerate(page_posts):
+        local_post_num = offset + i + 1
         
-        total_pages = (total_posts + VIEW_POSTS_PER_PAGE - 1) // VIEW_POSTS_PER_PAGE
-        current_page = offset // VIEW_POSTS_PER_PAGE + 1
+        mark = ("✅ " if p['id'] in selected else "☑️ ") if selected is not None else ""
+        full_text += f"{mark}№ {escape_markdown_v2(local_post_num)}\n" + format_post_card(p)
+        # Записані перегляди плюс ті, що ще чекають на скидання
+        views = p.get('views', 0) + view_counter.pending(p['id'])
+        full_text += f"👁 Переглядів: {escape_markdown_v2(views)}\n"
         
-        full_text = (f"📋 **{escape_markdown_v2(cat)}** \\(Сторінка {escape_markdown_v2(current_page)}/{escape_markdown_v2(total_pages)}\\)\n\n")
+        post_kb_row = []
+        if selected is not None:
+            mark = "✅" if p['id'] in selected else "☑️"
+            post_kb_row.append(InlineKeyboardButton(f"{mark} № {local_post_num}", callback_data=f"sel_{p['id']}"))
+        else:
+            if can_edit(p):
+                post_kb_row.append(InlineKeyboardButton(f"✏️ Редагувати № {local_post_num}", callback_data=f"edit_{p['id']}")) 
+            post_kb_row.append(InlineKeyboardButton(f"🗑️ Видалити № {local_post_num}", callback_data=f"delete_{p['id']}")) 
         
-        # Використовуємо pagination_kb для створення кнопок пагінації
-        combined_keyboard = pagination_kb(total_posts, offset, VIEW_POSTS_PER_PAGE, 'viewpage', cat)
+        combined_keyboard.row(*post_kb_row)
 
-        for i, p in enumerate(page_posts):
-            type_emoji = TYPE_EMOJIS.get(p['type'], '') 
-            
-            post_block = (f"ID: {escape_markdown_v2(p['id'])}\n"
-                         f"{escape_markdown_v2(type_emoji)} **{escape_markdown_v2(p['type'].capitalize())}**\n"
-                         f"🔹 {escape_markdown_v2(p['description'])}\n") 
-            
-            if p['username']:
-                if p['username'].isdigit():
-                    post_block += f"👤 Автор: \\_Приватний користувач\\_\n"
-                else:
-                    post_block += f"👤 Автор: \\@{escape_markdown_v2(p['username'])}\n"
-            
-            contact_info = p.get('contacts', '')
-            if contact_info:
-                post_block += f"📞 Контакт: {escape_markdown_v2(contact_info)}\n"
-            
-            full_text += post_block
-            
-            if i < len(page_posts) - 1:
-                full_text += "\n—\n\n" 
-        
-        await update_or_send_interface_message(bot_obj, chat_id, state, full_text, combined_keyboard, parse_mode='MarkdownV2', disable_web_page_preview=True)
+        if i < len(page_posts) - 1:
+            full_text += "\n—\n\n"
 
+    photo_row = photo_buttons_row(page_posts)
+    if photo_row:
+        combined_keyboard.row(*photo_row)
+
+    if selected is None:
+        if total_posts > 1:
+            combined_keyboard.row(InlineKeyboardButton("☑️ Вибрати кілька", callback_data="sel_mode"))
+    else:
+        # Вибір зберігається між сторінками, дії застосовуються до всіх вибраних оголошень
+        if selected:
+            combined_keyboard.row(
+                InlineKeyboardButton(f"🗑️ Видалити ({len(selected)})", callback_data="sel_delete"),
+                InlineKeyboardButton(f"🔄 Поновити ({len(selected)})", callback_data="sel_renew"),
+            )
+        combined_keyboard.row(InlineKeyboardButton("✖️ Скасувати вибір", callback_data="sel_cancel"))
+
+    # Використовуємо pagination_kb для створення кнопок пагінації
+    nav_keyboard = pagination_kb(total_posts, offset, MY_POSTS_PER_PAGE, 'mypage', str(chat_id))
+    
+    # Додаємо кнопки навігації до основної клавіатури
+    for row in nav_keyboard.inline_keyboard:
+        combined_keyboard.add(*row)
+
+    return {'text': full_text, 'kb': combined_keyboard, 'posts': page_posts, 'total': total_posts}
+
+@profiler.profiled
+async def show_my_posts_page(bot_obj: Bot, chat_id: int, state: FSMContext, offset: int = 0, use_prefetched: bool = False):
+    logger.info("Showing my posts page for user %s, offset %s", chat_id, offset)
+    try:
+        selected = (await state.get_data()).get('selected_posts')
+        if selected is not None:
+            selected = set(selected)
+
+        def load_page(n: int):
+            return db_read(lambda: build_my_posts_page(chat_id, n, selected))
+
+        # Заздалегідь побудовані сторінки не мають позначок вибору
+        page = page_prefetcher.get(chat_id, ('my', offset)) if use_prefetched and selected is None else None
+        if page is None:
+            page = await load_page(offset)
+        if not page['posts'] and page['total'] > 0:
+            # Після видалення сторінка спорожніла — показуємо останню наявну сторінку
+            offset = (page['total'] - 1) // MY_POSTS_PER_PAGE * MY_POSTS_PER_PAGE
+            page = await load_page(offset)
+
+        if page['total']:
+            await state.update_data(offset=offset)
+        await update_or_send_interface_message(bot_obj, chat_id, state, page['text'], page['kb'], parse_mode='MarkdownV2', disable_web_page_preview=True)
+
+        if selected is None:
+            prefetch_next_page(chat_id, ('my',), offset, MY_POSTS_PER_PAGE, page, load_page)
+
+    except (CircuitOpenError, *DB_FAILURES) as e:
+        logger.warning("Database unavailable in show_my_posts_page for user %s: %r", chat_id, e)
+        await show_db_unavailable(bot_obj, chat_id, state)
     except Exception as e:
-        logging.error(f"Error in show_view_posts_page for user {chat_id}: {e}", exc_info=True)
-        await update_or_send_interface_message(bot_obj, chat_id, state, "Вибачте, сталася неочікувана помилка при перегляді оголошень\\. Спробуйте ще раз\\.", main_kb(), parse_mode='MarkdownV2')
+        logger.error("Error in show_my_posts_page for user %s: %s", chat_id, e, exc_info=True)
+        await update_or_send_interface_message(bot_obj, chat_id, state, "Вибачте, сталася неочікувана помилка при завантаженні ваших оголошень\\. Спробуйте ще раз\\.", main_kb(), parse_mode='MarkdownV2')
         await state.set_state(AppStates.MAIN_MENU)
 
-async def show_my_posts_page(bot_obj: Bot, chat_id: int, state: FSMContext, offset: int = 0):
-    logging.info(f"Showing my posts page for user {chat_id}, offset {offset}")
+@profiler.profiled
+async def show_saved_posts_page(bot_obj: Bot, chat_id: int, state: FSMContext, offset: int = 0):
+    logger.info("Showing saved posts page for user %s, offset %s", chat_id, offset)
     try:
-        # Отримуємо загальну кількість оголошень користувача
-        total_posts = await db.posts.count_documents({'user_id': chat_id})
+        def load_page(n: int):
+            return db_read(lambda: get_favorites_page(db, chat_id, n, SAVED_POSTS_PER_PAGE))
 
-        if total_posts == 0:
-            logging.info(f"No posts found for user {chat_id}")
+        page_posts, total_posts = await load_page(offset)
+        if not page_posts and total_posts > 0:
+            # Усі оголошення сторінки зникли — показуємо останню наявну сторінку
+            offset = min(offset, (total_posts - 1) // SAVED_POSTS_PER_PAGE * SAVED_POSTS_PER_PAGE)
+            page_posts, total_posts = await load_page(offset)
+
+        if not page_posts:
+            logger.info("No saved posts for user %s", chat_id)
             kb_no_posts = InlineKeyboardMarkup(row_width=1).add(
-                InlineKeyboardButton("➕ Додати оголошення", callback_data="add_post"), 
+                InlineKeyboardButton("🔍 Пошук", callback_data="view_posts"),
                 InlineKeyboardButton("🏠 Головне меню", callback_data="go_back_to_main_menu")
             )
-            return await update_or_send_interface_message(bot_obj, chat_id, state, "🧐 У вас немає оголошень\\.", kb_no_posts, parse_mode='MarkdownV2')
+            return await update_or_send_interface_message(bot_obj, chat_id, state, "⭐ У вас немає збережених оголошень\\. Зберігайте їх кнопкою ⭐ під списком оголошень\\.", kb_no_posts, parse_mode='MarkdownV2')
 
-        # Отримуємо оголошення користувача з MongoDB, сортуємо за датою та пагінуємо
-        user_posts_cursor = db.posts.find(
-            {'user_id': chat_id}
-        ).sort([('created_at', DESCENDING)]).skip(offset).limit(MY_POSTS_PER_PAGE)
-        
-        page_posts = await user_posts_cursor.to_list(length=MY_POSTS_PER_PAGE)
-        
         await state.update_data(offset=offset)
 
-        total_pages = (total_posts + MY_POSTS_PER_PAGE - 1) // MY_POSTS_PER_PAGE
-        current_page = offset // MY_POSTS_PER_PAGE + 1
-        
-        full_text = f"🗂️ **Мої оголошення** \\(Сторінка {escape_markdown_v2(current_page)}/{escape_markdown_v2(total_pages)}\\)\n\n"
-        
-        combined_keyboard = InlineKeyboardMarkup(row_width=2) 
+        total_pages = (total_posts + SAVED_POSTS_PER_PAGE - 1) // SAVED_POSTS_PER_PAGE
+        current_page = offset // SAVED_POSTS_PER_PAGE + 1
+
+        full_text = f"⭐ **Збережені оголошення** \\(Сторінка {escape_markdown_v2(current_page)}/{escape_markdown_v2(total_pages)}\\)\n\n"
+
+        combined_keyboard = InlineKeyboardMarkup(row_width=3)
+        combined_keyboard.add(*[InlineKeyboardButton(f"❌ ID {p['id']}", callback_data=f"unfav_{p['id']}") for p in page_posts])
+        photo_row = photo_buttons_row(page_posts)
+        if photo_row:
+            combined_keyboard.row(*photo_row)
 
         for i, p in enumerate(page_posts):
-            type_emoji = TYPE_EMOJIS.get(p['type'], '') 
-            
-            local_post_num = offset + i + 1
-            
-            post_block = (f"№ {escape_markdown_v2(local_post_num)}\n" 
-                         f"ID: {escape_markdown_v2(p['id'])}\n"
-                         f"{escape_markdown_v2(type_emoji)} **{escape_markdown_v2(p['type'].capitalize())}**\n"
-                         f"🔹 {escape_markdown_v2(p['description'])}\n")
-            
-            if p['username']:
-                if p['username'].isdigit():
-                    post_block += f"👤 Автор: \\_Приватний користувач\\_\n"
-                else:
-                    post_block += f"👤 Автор: \\@{escape_markdown_v2(p['username'])}\n"
-            
-            if p.get('contacts'):
-                 post_block += f"📞 Контакт: {escape_markdown_v2(p['contacts'])}\n"
-            
-            full_text += post_block
-            
-            post_kb_row = []
-            if can_edit(p):
-                post_kb_row.append(InlineKeyboardButton(f"✏️ Редагувати № {local_post_num}", callback_data=f"edit_{p['id']}")) 
-            post_kb_row.append(InlineKeyboardButton(f"🗑️ Видалити № {local_post_num}", callback_data=f"delete_{p['id']}")) 
-            
-            combined_keyboard.row(*post_kb_row)
+            full_text += format_post_card(p)
 
             if i < len(page_posts) - 1:
                 full_text += "\n—\n\n"
 
-        # Використовуємо pagination_kb для створення кнопок пагінації
-        nav_keyboard = pagination_kb(total_posts, offset, MY_POSTS_PER_PAGE, 'mypage', str(chat_id))
-        
-        # Додаємо кнопки навігації до основної клавіатури
+        nav_keyboard = pagination_kb(total_posts, offset, SAVED_POSTS_PER_PAGE, 'savedpage', str(chat_id))
         for row in nav_keyboard.inline_keyboard:
-            combined_keyboard.add(*row)
-            
-        await update_or_send_interface_message(bot_obj, chat_id, state, full_text, combined_keyboard, parse_mode='MarkdownV2', disable_web_page_preview=True)
+            combined_keyboard.row(*row)
 
+        await update_or_send_interface_message(bot_obj, chat_id, state, full_text, combined_keyboard, parse_mode='MarkdownV2', disable_web_page_preview=True)
+        view_counter.record(page_posts, chat_id)
 
+    except (CircuitOpenError, *DB_FAILURES) as e:
+        logger.warning("Database unavailable in show_saved_posts_page for user %s: %r", chat_id, e)
+        await show_db_unavailable(bot_obj, chat_id, state)
     except Exception as e:
-        logging.error(f"Error in show_my_posts_page for user {chat_id}: {e}", exc_info=True)
-        await update_or_send_interface_message(bot_obj, chat_id, state, "Вибачте, сталася неочікувана помилка при завантаженні ваших оголошень\\. Спробуйте ще раз\\.", main_kb(), parse_mode='MarkdownV2')
+        logger.error("Error in show_saved_posts_page for user %s: %s", chat_id, e, exc_info=True)
+        await update_or_send_interface_message(bot_obj, chat_id, state, "Вибачте, сталася неочікувана помилка при завантаженні збережених оголошень\\. Спробуйте ще раз\\.", main_kb(), parse_mode='MarkdownV2')
         await state.set_state(AppStates.MAIN_MENU)
 
 # ======== Обробники команд ========
 @dp.message_handler(commands=['start'], state="*")
 async def on_start(msg: types.Message, state: FSMContext):
-    logging.info(f"User {msg.from_user.id} started bot.")
-    logging.info(f"DEBUG: on_start handler triggered for user {msg.from_user.id}")
+    logger.info("User %s started bot.", msg.from_user.id)
+    logger.debug("on_start handler triggered for user %s", msg.from_user.id)
     
     try:
         await msg.delete() 
     except MessageToDeleteNotFound:
         pass
     except Exception as e:
-        logging.warning(f"Failed to delete /start command: {e}")
+        logger.warning("Failed to delete /start command: %s", e)
     
     await state.update_data(last_bot_message_id=None)
     await go_to_main_menu(msg.bot, msg.chat.id, state)
 
 
+# ======== Статистика (лише для адміністраторів) ========
+def format_stats_report(report: dict) -> str:
+    """Формує звіт статистики для Telegram (MarkdownV2)."""
+    lines = [
+        f"📊 *Статистика за {escape_markdown_v2(report['days'])} дн\\.* \\(з {escape_markdown_v2(report['since'])}\\)",
+        "",
+        f"Активних оголошень: {escape_markdown_v2(report['live_posts'])}",
+        f"Створено: {escape_markdown_v2(report['created'])}, видалено: {escape_markdown_v2(report['deleted'])}, "
+        f"поновлено: {escape_markdown_v2(report['renewed'])}",
+        "",
+        "*За типом:*",
+    ]
+    for typ, n in report['created_per_type'].items():
+        lines.append(f"{escape_markdown_v2(TYPE_EMOJIS.get(typ, ''))} {escape_markdown_v2(typ.capitalize())}: {escape_markdown_v2(n)}")
+    lines += ["", "*За категорією:*"]
+    for cat, n in report['created_per_category'].items():
+        lines.append(f"🔹 {escape_markdown_v2(cat)}: {escape_markdown_v2(n)}")
+    lines += ["", "*За днями \\(створено / активних користувачів\\):*"]
+    days = sorted(set(report['created_per_day']) | set(report['active_users_per_day']))
+    for day in days:
+        lines.append(f"{escape_markdown_v2(day)}: {escape_markdown_v2(report['created_per_day'].get(day, 0))} / "
+                     f"{escape_markdown_v2(report['active_users_per_day'].get(day, 0))}")
+    return "\n".join(lines)
+
+@dp.message_handler(lambda m: m.from_user.id in ADMIN_IDS, commands=['stats'], state="*")
+async def admin_stats(msg: types.Message, state: FSMContext):
+    logger.info("Admin %s requested stats.", msg.from_user.id)
+    args = msg.get_args()
+    days = int(args) if args.isdigit() and int(args) > 0 else 7
+    try:
+        report = await db_read(lambda: read_report(db, days, POST_LIFETIME_DAYS))
+    except (CircuitOpenError, *DB_FAILURES) as e:
+        logger.warning("Database unavailable in admin_stats: %r", e)
+        return await show_db_unavailable(msg.bot, msg.chat.id, state)
+    kb = InlineKeyboardMarkup().add(InlineKeyboardButton("🏠 Головне меню", callback_data="go_back_to_main_menu"))
+    await update_or_send_interface_message(msg.bot, msg.chat.id, state, format_stats_report(report), kb, parse_mode='MarkdownV2')
+
+# Незавершені заповнення статистики за назвою бота (посилання не дає задачі зникнути до завершення)
+backfill_tasks = {}
+
+@dp.message_handler(lambda m: m.from_user.id in ADMIN_IDS, commands=['stats_backfill'], state="*")
+async def admin_stats_backfill(msg: types.Message, state: FSMContext):
+    """Заповнення проходить усю колекцію `posts`, тож виконується у фоні, а результат надсилається окремо."""
+    tenant = Tenant.get_current()
+    if tenant.name in backfill_tasks:
+        return await msg.answer("⏳ Заповнення статистики вже триває.")
+    logger.info("Admin %s started stats backfill.", msg.from_user.id)
+
+    async def backfill(bot_obj: Bot, chat_id: int):
+        try:
+            processed = await backfill_rollups(tenant.db)
+        except Exception as e:
+            logger.error("Stats backfill of '%s' failed: %s", tenant.name, e, exc_info=True)
+            await bot_obj.send_message(chat_id, "❌ Не вдалося заповнити статистику. Подробиці в логах.")
+        else:
+            await bot_obj.send_message(chat_id, f"✅ Статистику заповнено з {processed} оголошень.")
+        finally:
+            backfill_tasks.pop(tenant.name, None)
+    # Порожній контекст: задача триває довше за це оновлення
+    backfill_tasks[tenant.name] = contextvars.Context().run(asyncio.get_event_loop().create_task, backfill(msg.bot, msg.chat.id))
+    await msg.answer("⏳ Заповнення статистики запущено, результат надішлю окремим повідомленням.")
+
+
+@dp.message_handler(lambda m: m.from_user.id in ADMIN_IDS, commands=['profile'], state="*")
+async def admin_profile(msg: types.Message, state: FSMContext):
+    """`/profile [секунд] [wall|cpu]` — сеанс профілювання; після завершення надсилає підсумок."""
+    args = msg.get_args().split()
+    mode = next((a for a in args if a in PROFILE_MODES), 'wall')
+    seconds = profile_seconds(next((a for a in args if a.isdigit()), ''))
+    logger.info("Admin %s started profiling (%s, %ss).", msg.from_user.id, mode, seconds)
+    try:
+        profiler.start(seconds, mode, slow_ms=PROFILE_SLOW_CALLBACK_MS)
+    except (ProfilerBusyError, ValueError) as e:
+        return await msg.answer(f"❌ {e}")
+    await msg.answer(f"⏱ Профілювання ({mode}) запущено на {seconds} с.")
+
+    async def report(bot_obj: Bot, chat_id: int):
+        result = await profiler.wait()
+        await bot_obj.send_message(chat_id, (
+            f"✅ Профілювання завершено: {result['samples']} семплів, "
+            f"повільних колбеків: {result['slow_callbacks']}.\n" + "\n".join(result['files'])
+        ))
+    # Порожній контекст: звіт надсилається вже після завершення цього оновлення
+    contextvars.Context().run(asyncio.get_event_loop().create_task, report(msg.bot, msg.chat.id))
+
+
 @dp.callback_query_handler(lambda c: c.data == 'go_back_to_main_menu', state='*')
 async def on_back_to_main(call: CallbackQuery, state: FSMContext):
-    logging.info(f"User {call.from_user.id} pressed 'Go Back to Main Menu'.")
-    await call.answer()
+    logger.info("User %s pressed 'Go Back to Main Menu'.", call.from_user.id)
+    await answer_callback(call)
     await go_to_main_menu(call.message.bot, call.message.chat.id, state)
 
 
 @dp.callback_query_handler(lambda c: c.data == 'go_back_to_prev_step', state='*')
 async def on_back_to_prev_step(call: CallbackQuery, state: FSMContext):
-    logging.info(f"User {call.from_user.id} pressed 'Go Back to Previous Step'.")
-    await call.answer()
+    logger.info("User %s pressed 'Go Back to Previous Step'.", call.from_user.id)
+    await answer_callback(call)
     current_state = await state.get_state()
     chat_id = call.message.chat.id
     bot_obj = call.message.bot
@@ -284,22 +870,35 @@ async def on_back_to_prev_step(call: CallbackQuery, state: FSMContext):
     elif current_state == AppStates.ADD_CAT.state:
         await update_or_send_interface_message(bot_obj, chat_id, state, "🔹 Виберіть тип оголошення:", type_kb())
         await state.set_state(AppStates.ADD_TYPE)
-    elif current_state == AppStates.ADD_DESC.state:
+    elif current_state == AppStates.ADD_DISTRICT.state:
         await update_or_send_interface_message(bot_obj, chat_id, state, "🗂️ Виберіть категорію:", categories_kb(is_post_creation=True))
         await state.set_state(AppStates.ADD_CAT)
-    elif current_state == AppStates.ADD_CONT.state:
+    elif current_state == AppStates.ADD_DESC.state:
+        await update_or_send_interface_message(bot_obj, chat_id, state, "📍 Виберіть район (необов’язково):", districts_kb(is_post_creation=True))
+        await state.set_state(AppStates.ADD_DISTRICT)
+    elif current_state == AppStates.ADD_PHOTO.state:
         await update_or_send_interface_message(bot_obj, chat_id, state, "✏️ Введіть опис (до 500 символів):", back_kb())
         await state.set_state(AppStates.ADD_DESC)
+    elif current_state == AppStates.ADD_CONT.state:
+        data = await state.get_data()
+        await show_photo_step(bot_obj, chat_id, state, len(data.get('photos', [])))
+        await state.set_state(AppStates.ADD_PHOTO)
     elif current_state == AppStates.ADD_CONFIRM.state:
         await update_or_send_interface_message(bot_obj, chat_id, state, "📞 Введіть контакт (необов’язково):", contact_kb())
         await state.set_state(AppStates.ADD_CONT)
     elif current_state == AppStates.VIEW_CAT.state:
         await go_to_main_menu(bot_obj, chat_id, state)
+    elif current_state == AppStates.VIEW_DISTRICT.state:
+        data = await state.get_data()
+        await show_view_posts_page(bot_obj, chat_id, state, data.get('offset', 0))
+        await state.set_state(AppStates.VIEW_LISTING)
     elif current_state == AppStates.VIEW_LISTING.state:
         await update_or_send_interface_message(bot_obj, chat_id, state, "🔎 Оберіть категорію:", categories_kb(is_post_creation=False))
         await state.set_state(AppStates.VIEW_CAT)
     elif current_state == AppStates.MY_POSTS_VIEW.state:
         await go_to_main_menu(bot_obj, chat_id, state) 
+    elif current_state == AppStates.SAVED_VIEW.state:
+        await go_to_main_menu(bot_obj, chat_id, state)
     elif current_state == AppStates.EDIT_DESC.state:
         data = await state.get_data()
         await show_my_posts_page(bot_obj, chat_id, state, data.get('offset', 0))
@@ -310,15 +909,16 @@ async def on_back_to_prev_step(call: CallbackQuery, state: FSMContext):
 # ======== Додавання оголошень ========
 @dp.callback_query_handler(lambda c: c.data == 'add_post', state="*")
 async def add_start(call: CallbackQuery, state: FSMContext):
-    logging.info(f"User {call.from_user.id} initiated 'Add Post'.")
-    await call.answer()
+    logger.info("User %s initiated 'Add Post'.", call.from_user.id)
+    await answer_callback(call)
+    await state.update_data(photos=[])
     await update_or_send_interface_message(call.message.bot, call.message.chat.id, state, "🔹 Виберіть тип оголошення:", type_kb())
     await state.set_state(AppStates.ADD_TYPE)
 
 @dp.callback_query_handler(lambda c: c.data.startswith('type_'), state=AppStates.ADD_TYPE)
 async def add_type(call: CallbackQuery, state: FSMContext):
-    logging.info(f"User {call.from_user.id} selected post type: {call.data}.")
-    await call.answer()
+    logger.info("User %s selected post type: %s.", call.from_user.id, call.data)
+    await answer_callback(call)
     typ = 'робота' if call.data == 'type_work' else 'послуга'
     await state.update_data(type=typ)
     await update_or_send_interface_message(call.message.bot, call.message.chat.id, state, "🗂️ Виберіть категорію:", categories_kb(is_post_creation=True))
@@ -327,16 +927,26 @@ async def add_type(call: CallbackQuery, state: FSMContext):
 @dp.callback_query_handler(lambda c: c.data.startswith('post_cat_'), state=AppStates.ADD_CAT)
 async def add_cat(call: CallbackQuery, state: FSMContext):
     idx = int(call.data.split('_')[2])
-    _, cat = CATEGORIES[idx]
-    logging.info(f"User {call.from_user.id} selected category: {cat}.")
-    await call.answer()
+    _, cat = Tenant.get_current().categories[idx]
+    logger.info("User %s selected category: %s.", call.from_user.id, cat)
+    await answer_callback(call)
     await state.update_data(category=cat)
+    await update_or_send_interface_message(call.message.bot, call.message.chat.id, state, "📍 Виберіть район (необов’язково):", districts_kb(is_post_creation=True))
+    await state.set_state(AppStates.ADD_DISTRICT)
+
+@dp.callback_query_handler(lambda c: c.data.startswith('post_dist_'), state=AppStates.ADD_DISTRICT)
+async def add_district(call: CallbackQuery, state: FSMContext):
+    choice = call.data.split('_')[2]
+    district = None if choice == 'skip' else Tenant.get_current().districts[int(choice)][1]
+    logger.info("User %s selected district: %s.", call.from_user.id, district)
+    await answer_callback(call)
+    await state.update_data(district=district)
     await update_or_send_interface_message(call.message.bot, call.message.chat.id, state, "✏️ Введіть опис (до 500 символів):", back_kb())
     await state.set_state(AppStates.ADD_DESC)
 
 @dp.message_handler(state=AppStates.ADD_DESC)
 async def add_desc(msg: types.Message, state: FSMContext):
-    logging.info(f"User {msg.from_user.id} entered description.")
+    logger.info("User %s entered description.", msg.from_user.id)
     text = msg.text.strip()
     
     try:
@@ -350,22 +960,93 @@ async def add_desc(msg: types.Message, state: FSMContext):
         return await update_or_send_interface_message(msg.bot, msg.chat.id, state, f"❌ Занадто довгий \\({len(text)}/500\\)\\.", back_kb(), parse_mode='MarkdownV2')
     
     await state.update_data(desc=text)
-    await update_or_send_interface_message(msg.bot, msg.chat.id, state, "📞 Введіть контакт (необов’язково):", contact_kb())
+    data = await state.get_data()
+    await show_photo_step(msg.bot, msg.chat.id, state, len(data.get('photos', [])))
+    await state.set_state(AppStates.ADD_PHOTO)
+
+async def show_photo_step(bot_obj: Bot, chat_id: int, state: FSMContext, count: int, notice: str = None):
+    """:param notice: Рядок (MarkdownV2) над підказкою кроку — чому останнє повідомлення не прийнято."""
+    if count >= MAX_POST_PHOTOS:
+        text = f"📷 Додано фото: {count}/{MAX_POST_PHOTOS}\\. Більше додати не можна — натисніть «Далі»\\."
+    elif count:
+        text = f"📷 Додано фото: {count}/{MAX_POST_PHOTOS}\\. Надішліть ще або натисніть «Далі»\\."
+    else:
+        text = f"📷 Надішліть до {MAX_POST_PHOTOS} фото \\(необов’язково\\):"
+    if notice:
+        text = f"{notice}\n{text}"
+    await update_or_send_interface_message(bot_obj, chat_id, state, text, photos_kb(count > 0), parse_mode='MarkdownV2')
+
+@dp.message_handler(content_types=types.ContentType.PHOTO, state=AppStates.ADD_PHOTO)
+async def add_photo(msg: types.Message, state: FSMContext):
+    """
+    Зберігає лише file_id фото, яке користувач уже завантажив у Telegram.
+    Фото з альбому приходять окремими повідомленнями, тож кожне обробляється тут.
+    """
+    logger.info("User %s attached a photo.", msg.from_user.id)
+    photo = photo_record(msg.photo)
+
+    try:
+        await msg.delete()
+    except MessageToDeleteNotFound:
+        pass
+
+    async with state.proxy() as data:
+        photos = data.get('photos', [])
+        if len(photos) >= MAX_POST_PHOTOS:
+            notice = f"❌ Фото не додано: можна не більше {MAX_POST_PHOTOS}\\."
+        elif any(p['unique_id'] == photo['unique_id'] for p in photos):
+            notice = "❌ Це фото вже додано\\."
+        else:
+            notice = None
+            photos.append(photo)
+            data['photos'] = photos
+        count = len(photos)
+    await show_photo_step(msg.bot, msg.chat.id, state, count, notice)
+
+@dp.message_handler(content_types=types.ContentType.ANY, state=AppStates.ADD_PHOTO)
+async def add_photo_other(msg: types.Message, state: FSMContext):
+    """Текст чи інше повідомлення на кроці фото — нагадуємо, що тут очікуються фото."""
+    logger.info("User %s sent a non-photo message at the photo step.", msg.from_user.id)
+    try:
+        await msg.delete()
+    except MessageToDeleteNotFound:
+        pass
+    count = len((await state.get_data()).get('photos', []))
+    button = "«Далі»" if count else "«Пропустити»"
+    notice = f"ℹ️ Тут можна лише надіслати фото \\(як фото, не файлом\\) або натиснути {button}\\."
+    await show_photo_step(msg.bot, msg.chat.id, state, count, notice)
+
+@dp.callback_query_handler(lambda c: c.data == 'photo_clear', state=AppStates.ADD_PHOTO)
+async def clear_photos(call: CallbackQuery, state: FSMContext):
+    logger.info("User %s removed attached photos.", call.from_user.id)
+    await answer_callback(call)
+    await state.update_data(photos=[])
+    await show_photo_step(call.message.bot, call.message.chat.id, state, 0)
+
+@dp.callback_query_handler(lambda c: c.data == 'photo_done', state=AppStates.ADD_PHOTO)
+async def photos_done(call: CallbackQuery, state: FSMContext):
+    logger.info("User %s finished attaching photos.", call.from_user.id)
+    await answer_callback(call)
+    await update_or_send_interface_message(call.message.bot, call.message.chat.id, state, "📞 Введіть контакт (необов’язково):", contact_kb())
     await state.set_state(AppStates.ADD_CONT)
 
 @dp.callback_query_handler(lambda c: c.data == 'skip_cont', state=AppStates.ADD_CONT)
 async def skip_cont(call: CallbackQuery, state: FSMContext):
-    logging.info(f"User {call.from_user.id} skipped contact info.")
-    await call.answer()
+    logger.info("User %s skipped contact info.", call.from_user.id)
+    await answer_callback(call)
     await state.update_data(cont="")
     data = await state.get_data()
     
     type_emoji = TYPE_EMOJIS.get(data['type'], '')
+    district_line = f"📍 {escape_markdown_v2(data['district'])}\n" if data.get('district') else ""
+    photos_line = f"📷 Фото: {len(data['photos'])}\n" if data.get('photos') else ""
     
     summary = (
         f"🔎 \\*Перевірте:\\*\n"
         f"{escape_markdown_v2(type_emoji)} **{escape_markdown_v2(data['type'].capitalize())}** \\| **{escape_markdown_v2(data['category'])}**\n"
         f"🔹 {escape_markdown_v2(data['desc'])}\n"
+        f"{district_line}"
+        f"{photos_line}"
         f"📞 \\_немає\\_"
     )
     kb = InlineKeyboardMarkup(row_width=2).add(
@@ -377,7 +1058,7 @@ async def skip_cont(call: CallbackQuery, state: FSMContext):
 
 @dp.message_handler(state=AppStates.ADD_CONT)
 async def add_cont(msg: types.Message, state: FSMContext):
-    logging.info(f"User {msg.from_user.id} entered contact info.")
+    logger.info("User %s entered contact info.", msg.from_user.id)
     text = msg.text.strip()
     
     try:
@@ -391,7 +1072,7 @@ async def add_cont(msg: types.Message, state: FSMContext):
     phone_pattern_regex = r'^(?:0\d{9}|\+380\d{9}|@[a-zA-Z0-9_]{5,32})$'
 
     if not re.fullmatch(phone_pattern_regex, text):
-        logging.warning(f"User {msg.from_user.id} entered invalid contact format: '{text}'")
+        logger.warning("User %s entered invalid contact format: '%s'", msg.from_user.id, text)
         return await update_or_send_interface_message(
             msg.bot, msg.chat.id, state,
             "❌ Невірний формат\\. Будь ласка, введіть номер телефону у форматі \\+380XXXXXXXXX або 0XXXXXXXXX, або username Telegram \\(@username\\)\\.",
@@ -402,11 +1083,15 @@ async def add_cont(msg: types.Message, state: FSMContext):
     data = await state.get_data()
     
     type_emoji = TYPE_EMOJIS.get(data['type'], '')
+    district_line = f"📍 {escape_markdown_v2(data['district'])}\n" if data.get('district') else ""
+    photos_line = f"📷 Фото: {len(data['photos'])}\n" if data.get('photos') else ""
 
     summary = (
         f"🔎 \\*Перевірте:\\*\n"
         f"{escape_markdown_v2(type_emoji)} **{escape_markdown_v2(data['type'].capitalize())}** \\| **{escape_markdown_v2(data['category'])}**\n"
         f"🔹 {escape_markdown_v2(data['desc'])}\n"
+        f"{district_line}"
+        f"{photos_line}"
         f"📞 {escape_markdown_v2(data['cont'])}"
     )
     kb = InlineKeyboardMarkup(row_width=2).add(
@@ -418,15 +1103,15 @@ async def add_cont(msg: types.Message, state: FSMContext):
 
 @dp.callback_query_handler(lambda c: c.data == 'confirm_add_post', state=AppStates.ADD_CONFIRM)
 async def add_confirm(call: CallbackQuery, state: FSMContext):
-    logging.info(f"User {call.from_user.id} confirmed post creation.")
-    await call.answer()
+    logger.info("User %s confirmed post creation.", call.from_user.id)
+    await answer_callback(call)
     d = await state.get_data()
     
     contact_info = d.get('cont', "")
     if contact_info:
         phone_pattern_regex = r'^(?:0\d{9}|\+380\d{9}|@[a-zA-Z0-9_]{5,32})$'
         if not re.fullmatch(phone_pattern_regex, contact_info):
-            logging.error(f"Invalid contact format somehow slipped through for user {call.from_user.id}: {contact_info}")
+            logger.error("Invalid contact format somehow slipped through for user %s: %s", call.from_user.id, contact_info)
             await update_or_send_interface_message(
                 call.message.bot, call.message.chat.id, state,
                 "❌ Помилка: Невірний формат контакту\\. Будь ласка, спробуйте ще раз\\.",
@@ -435,27 +1120,36 @@ async def add_confirm(call: CallbackQuery, state: FSMContext):
             await state.set_state(AppStates.MAIN_MENU)
             return
 
-    post_id = await get_next_sequence_value(db, 'postid')
-
+    now = datetime.utcnow()
     post_data = {
-        'id': post_id,
         'user_id': call.from_user.id,
         'username': call.from_user.username or str(call.from_user.id),
         'type': d['type'],
         'category': d['category'],
+        'district': d.get('district'),
         'description': d['desc'],
         'contacts': contact_info,
-        'created_at': datetime.utcnow()
+        'photos': d.get('photos', []),
+        'created_at': now,
+        # Оновлюється при поновленні: від нього рахуються черговість у списках і термін дії
+        'bumped_at': now,
     }
     
     try:
-        await db.posts.insert_one(post_data)
-        logging.info(f"Added post {post_id} to MongoDB for user {call.from_user.id}")
+        post_data['id'] = await db_write(lambda: get_next_sequence_value(db, 'postid'))
+        await db_write(lambda: db.posts.insert_one(post_data))
+    except (CircuitOpenError, *DB_FAILURES) as e:
+        logger.warning("Database unavailable in add_confirm for user %s: %r", call.from_user.id, e)
+        return await show_db_unavailable(call.message.bot, call.message.chat.id, state)
     except Exception as e:
-        logging.error(f"Failed to save post to MongoDB: {e}", exc_info=True)
+        logger.error("Failed to save post to MongoDB: %s", e, exc_info=True)
         await update_or_send_interface_message(call.message.bot, call.message.chat.id, state, "❌ Вибачте, сталася помилка при збереженні оголошення\\. Спробуйте ще раз\\.", main_kb(), parse_mode='MarkdownV2')
         await state.set_state(AppStates.MAIN_MENU)
         return
+    mark_user_write(call.from_user.id)
+    post_index.add(post_data)
+    await record_stats(lambda: record_post_created(db, post_data))
+    logger.info("Added post %s to MongoDB for user %s", post_data['id'], call.from_user.id)
 
     await update_or_send_interface_message(call.message.bot, call.message.chat.id, state, "✅ Оголошення успішно додано\\!", parse_mode='MarkdownV2') 
     await show_my_posts_page(call.message.bot, call.message.chat.id, state, 0)
@@ -465,17 +1159,17 @@ async def add_confirm(call: CallbackQuery, state: FSMContext):
 # ======== Перегляд оголошень (Повернення до пагінації) ========
 @dp.callback_query_handler(lambda c: c.data == 'view_posts', state="*")
 async def view_start(call: CallbackQuery, state: FSMContext):
-    logging.info(f"User {call.from_user.id} initiated 'View Posts'.")
-    await call.answer()
+    logger.info("User %s initiated 'View Posts'.", call.from_user.id)
+    await answer_callback(call)
     await update_or_send_interface_message(call.message.bot, call.message.chat.id, state, "🔎 Оберіть категорію:", categories_kb(is_post_creation=False))
     await state.set_state(AppStates.VIEW_CAT)
 
 @dp.callback_query_handler(lambda c: c.data.startswith('view_cat_'), state=AppStates.VIEW_CAT)
 async def view_cat(call: CallbackQuery, state: FSMContext):
     idx = int(call.data.split('_')[2])
-    cat_name = CATEGORIES[idx][1]
-    logging.info(f"User {call.from_user.id} selected view category: {cat_name}.")
-    await call.answer()
+    cat_name = Tenant.get_current().categories[idx][1]
+    logger.info("User %s selected view category: %s.", call.from_user.id, cat_name)
+    await answer_callback(call)
     
     await state.update_data(current_view_category=cat_name, current_category_idx=idx)
     await show_view_posts_page(call.message.bot, call.message.chat.id, state, 0)
@@ -483,42 +1177,78 @@ async def view_cat(call: CallbackQuery, state: FSMContext):
     
 @dp.callback_query_handler(lambda c: c.data.startswith('viewpage_'), state=AppStates.VIEW_LISTING)
 async def view_paginate(call: CallbackQuery, state: FSMContext):
-    logging.info(f"User {call.from_user.id} paginating view posts to offset {call.data.split('_')[1]}.")
-    await call.answer()
+    logger.info("User %s paginating view posts to offset %s.", call.from_user.id, call.data.split('_')[1])
+    await answer_callback(call)
     offset = int(call.data.split('_')[1])
-    await show_view_posts_page(call.message.bot, call.message.chat.id, state, offset)
+    await show_view_posts_page(call.message.bot, call.message.chat.id, state, offset, use_prefetched=True)
+
+
+@dp.callback_query_handler(lambda c: c.data.startswith('vfilter_'), state=AppStates.VIEW_LISTING)
+async def view_filter(call: CallbackQuery, state: FSMContext):
+    _, facet, value = call.data.split('_', 2)
+    logger.info("User %s changed view filter %s to %s.", call.from_user.id, facet, value)
+    await answer_callback(call)
+    if facet == 'type':
+        await state.update_data(view_type=dict(VIEW_TYPE_FILTERS).get(value))
+    else:
+        await state.update_data(view_since_days=None if value == 'all' else int(value))
+    # Після зміни фільтра починаємо з першої сторінки
+    await show_view_posts_page(call.message.bot, call.message.chat.id, state, 0)
+
+@dp.callback_query_handler(lambda c: c.data == 'view_district', state=AppStates.VIEW_LISTING)
+async def view_district_menu(call: CallbackQuery, state: FSMContext):
+    logger.info("User %s opened district filter.", call.from_user.id)
+    await answer_callback(call)
+    await update_or_send_interface_message(call.message.bot, call.message.chat.id, state, "📍 Оберіть район:", districts_kb(is_post_creation=False))
+    await state.set_state(AppStates.VIEW_DISTRICT)
+
+@dp.callback_query_handler(lambda c: c.data.startswith('view_dist_'), state=AppStates.VIEW_DISTRICT)
+async def view_district(call: CallbackQuery, state: FSMContext):
+    choice = call.data.split('_')[2]
+    district = None if choice == 'all' else Tenant.get_current().districts[int(choice)][1]
+    logger.info("User %s selected view district: %s.", call.from_user.id, district)
+    await answer_callback(call)
+    await state.update_data(current_view_district=district)
+    await show_view_posts_page(call.message.bot, call.message.chat.id, state, 0)
+    await state.set_state(AppStates.VIEW_LISTING)
 
 
 # ======== Мої оголошення ========
 @dp.callback_query_handler(lambda c: c.data=='my_posts', state="*")
 async def my_posts_start(call: CallbackQuery, state: FSMContext):
-    logging.info(f"User {call.from_user.id} pressed 'My Posts'.")
-    await call.answer()
+    logger.info("User %s pressed 'My Posts'.", call.from_user.id)
+    await answer_callback(call)
+    await state.update_data(selected_posts=None)
     await show_my_posts_page(call.message.bot, call.message.chat.id, state, 0)
     await state.set_state(AppStates.MY_POSTS_VIEW)
 
 @dp.callback_query_handler(lambda c: c.data.startswith('mypage_'), state=AppStates.MY_POSTS_VIEW)
 async def my_posts_paginate(call: CallbackQuery, state: FSMContext):
-    logging.info(f"User {call.from_user.id} paginating my posts to offset {call.data.split('_')[1]}.")
-    await call.answer()
+    logger.info("User %s paginating my posts to offset %s.", call.from_user.id, call.data.split('_')[1])
+    await answer_callback(call)
     offset = int(call.data.split('_')[1])
-    await show_my_posts_page(call.message.bot, call.message.chat.id, state, offset)
+    await show_my_posts_page(call.message.bot, call.message.chat.id, state, offset, use_prefetched=True)
 
 
 # ======== Редагування ========
 @dp.callback_query_handler(lambda c: c.data.startswith('edit_'), state=AppStates.MY_POSTS_VIEW)
 async def edit_start(call: CallbackQuery, state: FSMContext):
-    logging.info(f"User {call.from_user.id} initiated edit for post {call.data.split('_')[1]}.")
-    await call.answer()
+    logger.info("User %s initiated edit for post %s.", call.from_user.id, call.data.split('_')[1])
     pid = int(call.data.split('_')[1])
     
-    post = await db.posts.find_one({'id': pid, 'user_id': call.from_user.id})
+    # Відповідь залежить від того, чи можна редагувати, тож відповідаємо лише після перевірки
+    try:
+        post = await db_read(lambda: db.posts.find_one({'id': pid, 'user_id': call.from_user.id}))
+    except (CircuitOpenError, *DB_FAILURES) as e:
+        logger.warning("Database unavailable in edit_start for user %s: %r", call.from_user.id, e)
+        await answer_callback(call)
+        return await show_db_unavailable(call.message.bot, call.message.chat.id, state)
     
     if not post or not can_edit(post):
-        logging.warning(f"User {call.from_user.id} tried to edit expired or non-existent/unauthorized post {pid}.")
-        await call.answer("⏰ Час редагування (15 хв) вичерпано, або оголошення не знайдено/належить іншому користувачу.\\.", show_alert=True) 
-        return
+        logger.warning("User %s tried to edit expired or non-existent/unauthorized post %s.", call.from_user.id, pid)
+        return await answer_callback(call, "⏰ Час редагування (15 хв) вичерпано, або оголошення не знайдено/належить іншому користувачу.", show_alert=True, final=True)
         
+    await answer_callback(call)
     await state.update_data(edit_pid=pid)
     
     await update_or_send_interface_message(call.message.bot, call.message.chat.id, state, "✏️ Введіть новий опис (до 500 символів):", back_kb())
@@ -526,7 +1256,7 @@ async def edit_start(call: CallbackQuery, state: FSMContext):
 
 @dp.message_handler(state=AppStates.EDIT_DESC)
 async def process_edit(msg: types.Message, state: FSMContext):
-    logging.info(f"User {msg.from_user.id} submitting new description for edit.")
+    logger.info("User %s submitting new description for edit.", msg.from_user.id)
     text = msg.text.strip()
     
     try:
@@ -541,18 +1271,23 @@ async def process_edit(msg: types.Message, state: FSMContext):
     pid = data['edit_pid']
     
     try:
-        result = await db.posts.update_one(
+        result = await db_write(lambda: db.posts.update_one(
             {'id': pid, 'user_id': msg.from_user.id}, 
             {'$set': {'description': text}}
-        )
+        ))
         if result.matched_count == 0:
-            logging.warning(f"No post found to update for user {msg.from_user.id}, post {pid}")
+            logger.warning("No post found to update for user %s, post %s", msg.from_user.id, pid)
             await update_or_send_interface_message(msg.bot, msg.chat.id, state, "❌ Оголошення не знайдено або ви не маєте прав на його редагування\\.", main_kb(), parse_mode='MarkdownV2')
             await state.set_state(AppStates.MAIN_MENU)
             return
-        logging.info(f"Edited post {pid} in MongoDB for user {msg.from_user.id}")
+        mark_user_write(msg.from_user.id)
+        post_index.update_description(pid, text)
+        logger.info("Edited post %s in MongoDB for user %s", pid, msg.from_user.id)
+    except (CircuitOpenError, *DB_FAILURES) as e:
+        logger.warning("Database unavailable in process_edit for user %s: %r", msg.from_user.id, e)
+        return await show_db_unavailable(msg.bot, msg.chat.id, state)
     except Exception as e:
-        logging.error(f"Failed to update post in MongoDB: {e}", exc_info=True)
+        logger.error("Failed to update post in MongoDB: %s", e, exc_info=True)
         await update_or_send_interface_message(msg.bot, msg.chat.id, state, "❌ Вибачте, сталася помилка при оновленні опису оголошення\\. Спробуйте ще раз\\.", main_kb(), parse_mode='MarkdownV2')
         await state.set_state(AppStates.MAIN_MENU)
         return
@@ -565,47 +1300,277 @@ async def process_edit(msg: types.Message, state: FSMContext):
 # ======== Видалення ========
 @dp.callback_query_handler(lambda c: c.data.startswith('delete_'), state=AppStates.MY_POSTS_VIEW)
 async def delete_post(call: CallbackQuery, state: FSMContext):
-    logging.info(f"User {call.from_user.id} initiating delete for post {call.data.split('_')[1]}.")
+    logger.info("User %s initiating delete for post %s.", call.from_user.id, call.data.split('_')[1])
     
     pid = int(call.data.split('_')[1])
     
     try:
-        result = await db.posts.delete_one({'id': pid, 'user_id': call.from_user.id})
-        
-        if result.deleted_count == 0:
-            logging.warning(f"User {call.from_user.id} tried to delete non-existent or unauthorized post {pid}.")
-            await call.answer("❌ Оголошення не знайдено або ви не маєте прав на його видалення.", show_alert=True)
-            await show_my_posts_page(call.message.bot, call.message.chat.id, state, (await state.get_data()).get('offset', 0))
-            return
-
-        logging.info(f"Deleted post {pid} from MongoDB for user {call.from_user.id}")
-        await call.answer("✅ Оголошення успішно видалено.", show_alert=True)
+        # find_one_and_delete повертає поля, потрібні для оновлення статистики
+        deleted_post = await db_write(lambda: db.posts.find_one_and_delete(
+            {'id': pid, 'user_id': call.from_user.id},
+            projection={'_id': 0, 'category': 1, 'type': 1, 'created_at': 1, 'bumped_at': 1}
+        ))
+    except (CircuitOpenError, *DB_FAILURES) as e:
+        logger.warning("Database unavailable in delete_post for user %s: %r", call.from_user.id, e)
+        await answer_callback(call)
+        return await show_db_unavailable(call.message.bot, call.message.chat.id, state)
     except Exception as e:
-        logging.error(f"Failed to delete post from MongoDB: {e}", exc_info=True)
-        await call.answer("❌ Вибачте, сталася помилка при видаленні оголошення.", show_alert=True)
+        logger.error("Failed to delete post from MongoDB: %s", e, exc_info=True)
+        await answer_callback(call, "❌ Вибачте, сталася помилка при видаленні оголошення.", show_alert=True)
         await show_my_posts_page(call.message.bot, call.message.chat.id, state, (await state.get_data()).get('offset', 0))
         return
+
+    if deleted_post is None:
+        logger.warning("User %s tried to delete non-existent or unauthorized post %s.", call.from_user.id, pid)
+        await answer_callback(call, "❌ Оголошення не знайдено або ви не маєте прав на його видалення.", show_alert=True)
+        await show_my_posts_page(call.message.bot, call.message.chat.id, state, (await state.get_data()).get('offset', 0))
+        return
+
+    mark_user_write(call.from_user.id)
+    post_index.remove(pid)
+    logger.info("Deleted post %s from MongoDB for user %s", pid, call.from_user.id)
+    await answer_callback(call, "✅ Оголошення успішно видалено.", show_alert=True)
+    await record_stats(lambda: record_post_deleted(db, deleted_post))
     
+    # Якщо сторінка спорожніла, show_my_posts_page сам перейде на останню наявну
     data = await state.get_data()
-    current_offset = data.get('offset', 0)
-    
-    total_user_posts_after_delete = await db.posts.count_documents({'user_id': call.from_user.id})
-    
-    new_offset = current_offset
-    
-    if new_offset >= total_user_posts_after_delete and new_offset > 0:
-        new_offset = max(0, new_offset - MY_POSTS_PER_PAGE)
-    
-    await update_or_send_interface_message(call.message.bot, call.message.chat.id, state, "🗑️ Оголошення успішно видалено\\!", parse_mode='MarkdownV2')
-    await show_my_posts_page(call.message.bot, call.message.chat.id, state, new_offset)
+    await show_my_posts_page(call.message.bot, call.message.chat.id, state, data.get('offset', 0))
     await state.set_state(AppStates.MY_POSTS_VIEW)
 
 
+# ======== Вибір кількох оголошень ========
+@dp.callback_query_handler(lambda c: c.data == 'sel_mode', state=AppStates.MY_POSTS_VIEW)
+async def selection_start(call: CallbackQuery, state: FSMContext):
+    logger.info("User %s entered selection mode.", call.from_user.id)
+    await answer_callback(call)
+    await state.update_data(selected_posts=[])
+    await show_my_posts_page(call.message.bot, call.message.chat.id, state, (await state.get_data()).get('offset', 0))
+
+@dp.callback_query_handler(lambda c: c.data == 'sel_cancel', state=AppStates.MY_POSTS_VIEW)
+async def selection_cancel(call: CallbackQuery, state: FSMContext):
+    logger.info("User %s left selection mode.", call.from_user.id)
+    await answer_callback(call)
+    await state.update_data(selected_posts=None)
+    await show_my_posts_page(call.message.bot, call.message.chat.id, state, (await state.get_data()).get('offset', 0))
+
+@dp.callback_query_handler(lambda c: c.data.startswith('sel_') and c.data[4:].isdigit(), state=AppStates.MY_POSTS_VIEW)
+async def selection_toggle(call: CallbackQuery, state: FSMContext):
+    pid = int(call.data[4:])
+    await answer_callback(call)
+    data = await state.get_data()
+    selected = data.get('selected_posts') or []
+    if pid in selected:
+        selected.remove(pid)
+    else:
+        selected.append(pid)
+    await state.update_data(selected_posts=selected)
+    await show_my_posts_page(call.message.bot, call.message.chat.id, state, data.get('offset', 0))
+
+async def finish_selection_action(call: CallbackQuery, state: FSMContext, alert: str):
+    """Виходить з режиму вибору і один раз перемальовує сторінку після масової дії."""
+    await state.update_data(selected_posts=None)
+    await answer_callback(call, alert, show_alert=True)
+    await show_my_posts_page(call.message.bot, call.message.chat.id, state, (await state.get_data()).get('offset', 0))
+
+async def selection_db_unavailable(call: CallbackQuery, state: FSMContext):
+    """Масова дія не вдалася через недоступність бази: виходимо з режиму вибору в головне меню."""
+    await state.update_data(selected_posts=None)
+    await answer_callback(call)
+    await show_db_unavailable(call.message.bot, call.message.chat.id, state)
+
+@dp.callback_query_handler(lambda c: c.data == 'sel_delete', state=AppStates.MY_POSTS_VIEW)
+async def delete_selected_posts(call: CallbackQuery, state: FSMContext):
+    user_id = call.from_user.id
+    ids = (await state.get_data()).get('selected_posts') or []
+    logger.info("User %s deleting %s selected posts.", user_id, len(ids))
+    if not ids:
+        return await answer_callback(call, "Спершу виберіть оголошення.", final=True)
+
+    try:
+        # Поля для статистики — одним запитом, видалення — одним delete_many
+        posts = await db_read(lambda: db.posts.find(
+            {'id': {'$in': ids}, 'user_id': user_id},
+            projection={'_id': 0, 'id': 1, 'category': 1, 'type': 1, 'created_at': 1, 'bumped_at': 1}
+        ).to_list(length=len(ids)))
+        deleted = 0
+        if posts:
+            result = await db_write(lambda: db.posts.delete_many({'id': {'$in': [p['id'] for p in posts]}, 'user_id': user_id}))
+            deleted = result.deleted_count
+            mark_user_write(user_id)
+            for p in posts:
+                post_index.remove(p['id'])
+            await record_stats(lambda: record_posts_deleted(db, posts))
+    except (CircuitOpenError, *DB_FAILURES) as e:
+        logger.warning("Database unavailable in delete_selected_posts for user %s: %r", user_id, e)
+        return await selection_db_unavailable(call, state)
+    except Exception as e:
+        logger.error("Failed to delete selected posts of user %s: %s", user_id, e, exc_info=True)
+        return await finish_selection_action(call, state, "❌ Вибачте, сталася помилка при видаленні оголошень.")
+
+    logger.info("Deleted %s posts of user %s.", deleted, user_id)
+    await finish_selection_action(call, state, f"✅ Видалено оголошень: {deleted}.")
+
+@dp.callback_query_handler(lambda c: c.data == 'sel_renew', state=AppStates.MY_POSTS_VIEW)
+async def renew_selected_posts(call: CallbackQuery, state: FSMContext):
+    user_id = call.from_user.id
+    ids = (await state.get_data()).get('selected_posts') or []
+    logger.info("User %s renewing %s selected posts.", user_id, len(ids))
+    if not ids:
+        return await answer_callback(call, "Спершу виберіть оголошення.", final=True)
+
+    now = datetime.utcnow()
+    renewable = {'id': {'$in': ids}, 'user_id': user_id, 'bumped_at': {'$lt': now - timedelta(hours=POST_RENEW_MIN_AGE_HOURS)}}
+    try:
+        # Новий bumped_at піднімає оголошення в списках і відновлює термін дії (TTL);
+        # created_at не змінюється, тож вікно редагування не відкривається знову
+        posts = await db_read(lambda: db.posts.find(
+            renewable, projection={'_id': 0, 'id': 1, 'category': 1, 'type': 1, 'created_at': 1, 'bumped_at': 1}
+        ).to_list(length=len(ids)))
+        renewed = 0
+        if posts:
+            renewable['id'] = {'$in': [p['id'] for p in posts]}
+            result = await db_write(lambda: db.posts.update_many(renewable, {'$set': {'bumped_at': now}}))
+            renewed = result.modified_count
+            mark_user_write(user_id)
+            for p in posts:
+                post_index.renew(p['id'], now)
+            await record_stats(lambda: record_posts_renewed(db, posts, now))
+    except (CircuitOpenError, *DB_FAILURES) as e:
+        logger.warning("Database unavailable in renew_selected_posts for user %s: %r", user_id, e)
+        return await selection_db_unavailable(call, state)
+    except Exception as e:
+        logger.error("Failed to renew selected posts of user %s: %s", user_id, e, exc_info=True)
+        return await finish_selection_action(call, state, "❌ Вибачте, сталася помилка при поновленні оголошень.")
+
+    logger.info("Renewed %s posts of user %s.", renewed, user_id)
+    alert = f"🔄 Поновлено оголошень: {renewed}."
+    if renewed < len(ids):
+        alert += f" Інші ще не можна поновити: оголошення поновлюються не частіше, ніж раз на {POST_RENEW_MIN_AGE_HOURS} год."
+    await finish_selection_action(call, state, alert)
+
+
+# ======== Збережені оголошення ========
+@dp.callback_query_handler(lambda c: c.data.startswith('fav_'), state="*")
+async def save_post(call: CallbackQuery, state: FSMContext):
+    pid = int(call.data.split('_')[1])
+    logger.info("User %s saving post %s.", call.from_user.id, pid)
+    try:
+        await db_write(lambda: add_favorite(db, call.from_user.id, pid, FAVORITES_LIMIT))
+    except (CircuitOpenError, *DB_FAILURES) as e:
+        logger.warning("Database unavailable in save_post for user %s: %r", call.from_user.id, e)
+        await answer_callback(call)
+        return await show_db_unavailable(call.message.bot, call.message.chat.id, state)
+    except Exception as e:
+        logger.error("Failed to save post %s for user %s: %s", pid, call.from_user.id, e)
+        return await answer_callback(call, "❌ Не вдалося зберегти оголошення. Спробуйте пізніше.", show_alert=True, final=True)
+    await answer_callback(call, f"⭐ Оголошення ID {pid} збережено", final=True)
+
+@dp.callback_query_handler(lambda c: c.data == 'saved_posts', state="*")
+async def saved_posts_start(call: CallbackQuery, state: FSMContext):
+    logger.info("User %s pressed 'Saved Posts'.", call.from_user.id)
+    await answer_callback(call)
+    await show_saved_posts_page(call.message.bot, call.message.chat.id, state, 0)
+    await state.set_state(AppStates.SAVED_VIEW)
+
+@dp.callback_query_handler(lambda c: c.data.startswith('savedpage_'), state=AppStates.SAVED_VIEW)
+async def saved_posts_paginate(call: CallbackQuery, state: FSMContext):
+    logger.info("User %s paginating saved posts to offset %s.", call.from_user.id, call.data.split('_')[1])
+    await answer_callback(call)
+    offset = int(call.data.split('_')[1])
+    await show_saved_posts_page(call.message.bot, call.message.chat.id, state, offset)
+
+@dp.callback_query_handler(lambda c: c.data.startswith('unfav_'), state=AppStates.SAVED_VIEW)
+async def unsave_post(call: CallbackQuery, state: FSMContext):
+    pid = int(call.data.split('_')[1])
+    logger.info("User %s removing post %s from saved.", call.from_user.id, pid)
+    try:
+        await db_write(lambda: remove_favorites(db, call.from_user.id, [pid]))
+    except (CircuitOpenError, *DB_FAILURES) as e:
+        logger.warning("Database unavailable in unsave_post for user %s: %r", call.from_user.id, e)
+        await answer_callback(call)
+        return await show_db_unavailable(call.message.bot, call.message.chat.id, state)
+    await answer_callback(call, f"Оголошення ID {pid} прибрано зі збережених")
+    data = await state.get_data()
+    await show_saved_posts_page(call.message.bot, call.message.chat.id, state, data.get('offset', 0))
+
+
+# ======== Фото оголошень ========
+@dp.callback_query_handler(lambda c: c.data.startswith('photos_'), state="*")
+async def show_post_photos(call: CallbackQuery, state: FSMContext):
+    """Надсилає фото оголошення альбомом за збереженими file_id (без повторного завантаження)."""
+    post_id = int(call.data.split('_')[1])
+    logger.info("User %s opened photos of post %s.", call.from_user.id, post_id)
+
+    # Живі оголошення є в індексі в пам'яті, тож зазвичай база не потрібна
+    post = post_index.get(post_id)
+    if post is None:
+        try:
+            post = await db_read(lambda: db.posts.find_one({'id': post_id}, projection={'_id': 0}))
+        except (CircuitOpenError, *DB_FAILURES) as e:
+            logger.warning("Database unavailable in show_post_photos for user %s: %r", call.from_user.id, e)
+            await answer_callback(call)
+            return await show_db_unavailable(call.message.bot, call.message.chat.id, state)
+    if not post or not post.get('photos'):
+        return await answer_callback(call, "Фото не знайдено. Можливо, оголошення вже видалено.", show_alert=True, final=True)
+    await answer_callback(call)
+
+    media = types.MediaGroup()
+    for i, photo in enumerate(post['photos']):
+        caption = photo_caption(post) if i == 0 else None
+        media.attach_photo(photo['file_id'], caption=caption, parse_mode='MarkdownV2' if caption else None)
+
+    await delete_post_album(call.message.bot, call.message.chat.id, state)
+    messages = await call.message.bot.send_media_group(call.message.chat.id, media)
+    await state.update_data(album_message_ids=[m.message_id for m in messages])
+
+
+# ======== Inline-пошук ========
+@dp.inline_handler(state="*")
+async def inline_search(query: types.InlineQuery):
+    """
+    Відповідає на `@бот запит` з індексу в пам'яті, без звернень до MongoDB.
+    Telegram кешує відповідь на cache_time секунд і сам догружає наступні сторінки через next_offset.
+    """
+    # offset від Telegram — курсор (останнє оголошення попередньої сторінки)
+    page_posts, next_offset = post_index.search(query.query, query.offset, INLINE_RESULTS_PER_PAGE)
+
+    results = []
+    for p in page_posts:
+        type_emoji = TYPE_EMOJIS.get(p['type'], '')
+        caption = photo_caption(p) if p.get('photos') else None
+        if caption:
+            # Фото вже на серверах Telegram — результат посилається на нього за file_id
+            results.append(types.InlineQueryResultCachedPhoto(
+                id=str(p['id']),
+                photo_file_id=p['photos'][0]['file_id'],
+                title=f"{type_emoji} {p['type'].capitalize()} | {p['category']}",
+                description=p['description'][:100],
+                caption=caption,
+                parse_mode='MarkdownV2',
+            ))
+            continue
+        results.append(types.InlineQueryResultArticle(
+            id=str(p['id']),
+            title=f"{type_emoji} {p['type'].capitalize()} | {p['category']}",
+            description=p['description'][:100],
+            input_message_content=types.InputTextMessageContent(
+                format_post_card(p), parse_mode='MarkdownV2', disable_web_page_preview=True
+            ),
+        ))
+
+    await query.answer(
+        results,
+        cache_time=INLINE_CACHE_TIME,
+        is_personal=False,
+        next_offset=next_offset,
+    )
+
+
 # ======== Допомога ========
 @dp.callback_query_handler(lambda c: c.data=='help', state="*")
 async def help_handler(call: CallbackQuery, state: FSMContext):
-    logging.info(f"User {call.from_user.id} requested help.")
-    await call.answer()
+    logger.info("User %s requested help.", call.from_user.id)
+    await answer_callback(call)
     kb = InlineKeyboardMarkup(row_width=1)
     kb.add(InlineKeyboardButton("Написати @VILARSO18", url="https://t.me/VILARSO18"))
     kb.add(InlineKeyboardButton("⬅️ Назад", callback_data="go_back_to_main_menu"))
@@ -617,14 +1582,14 @@ async def help_handler(call: CallbackQuery, state: FSMContext):
 @dp.callback_query_handler(state="*")
 async def debug_all_callbacks(call: CallbackQuery, state: FSMContext):
     current_state = await state.get_state()
-    logging.info(f"DEBUG: Unhandled callback_data received: {call.data} from user {call.from_user.id} in state {current_state}")
+    logger.debug("Unhandled callback_data received: %s from user %s in state %s", call.data, call.from_user.id, current_state)
 
     # Перевіряємо, чи стан користувача None (сесія скинута)
     if current_state is None:
         # Перевіряємо, чи callback_data схожа на ту, що очікується в певних станах
         sub_menu_callbacks = [
-            'type_', 'post_cat_', 'view_cat_', 'viewpage_', 'mypage_',
-            'edit_', 'delete_', 'skip_cont', 'confirm_add_post', 'cancel_add_post', 'confirm_delete_', 'cancel_delete_'
+            'type_', 'post_cat_', 'post_dist_', 'photo_', 'view_cat_', 'view_dist', 'vfilter_', 'viewpage_', 'mypage_', 'savedpage_', 'unfav_',
+            'edit_', 'delete_', 'sel_', 'skip_cont', 'confirm_add_post', 'cancel_add_post', 'confirm_delete_', 'cancel_delete_'
         ]
         
         is_sub_menu_callback = any(call.data.startswith(prefix) for prefix in sub_menu_callbacks)
@@ -633,22 +1598,24 @@ async def debug_all_callbacks(call: CallbackQuery, state: FSMContext):
             # Видаляємо попереднє повідомлення перед тим, як надіслати нове головне меню
             try:
                 await call.message.delete()
-                logging.info(f"Deleted old message {call.message.message_id} for user {call.from_user.id} due to session reset.")
+                logger.info("Deleted old message %s for user %s due to session reset.", call.message.message_id, call.from_user.id)
             except MessageToDeleteNotFound:
-                logging.warning(f"Message {call.message.message_id} not found to delete for user {call.from_user.id}.")
+                logger.warning("Message %s not found to delete for user %s.", call.message.message_id, call.from_user.id)
             except Exception as e:
-                logging.error(f"Error deleting message {call.message.message_id} for user {call.from_user.id}: {e}", exc_info=True)
+                logger.error("Error deleting message %s for user %s: %s", call.message.message_id, call.from_user.id, e, exc_info=True)
 
-            await call.answer("Ваша сесія була скинута. Будь ласка, почніть з головного меню.", show_alert=True)
+            await answer_callback(call, "Ваша сесія була скинута. Будь ласка, почніть з головного меню.", show_alert=True)
             await go_to_main_menu(call.message.bot, call.message.chat.id, state)
             return # Важливо повернутися після обробки
 
-    await call.answer() # Завжди відповідаємо на callback_query, щоб уникнути "крутячогося годинника"
+    await answer_callback(call, final=True) # Завжди відповідаємо на callback_query, щоб уникнути "крутячогося годинника"
 
 # ======== Глобальний хендлер помилок ========
 @dp.errors_handler()
 async def err_handler(update: types.Update, exception):
-    logging.error(f"Update: {update} caused error: {exception}", exc_info=True)
+    logger.error("Update %s caused error: %s", update.update_id, exception, exc_info=True)
+    # Стан користувача в сховищі бота, що отримав оновлення
+    state = Tenant.get_current().dp.current_state()
     
     chat_id = None
     bot_obj = None
@@ -662,117 +1629,128 @@ async def err_handler(update: types.Update, exception):
     if chat_id and bot_obj:
         if isinstance(exception, (BadRequest, TelegramAPIError)):
             if "Can't parse entities" in str(exception):
-                logging.error("Markdown parse error detected. Ensure all user-supplied text is escaped.")
-                await update_or_send_interface_message(bot_obj, chat_id, dp.current_state(), "Вибачте, сталася помилка з відображенням тексту\\. Можливо, в описі є некоректні символи\\.", main_kb(), parse_mode='MarkdownV2')
-                await dp.current_state().set_state(AppStates.MAIN_MENU)
+                logger.error("Markdown parse error detected. Ensure all user-supplied text is escaped.")
+                await update_or_send_interface_message(bot_obj, chat_id, state, "Вибачте, сталася помилка з відображенням тексту\\. Можливо, в описі є некоректні символи\\.", main_kb(), parse_mode='MarkdownV2')
+                await state.set_state(AppStates.MAIN_MENU)
                 return True
             elif "Text must be non-empty" in str(exception):
-                logging.error("Message text is empty error detected.")
-                await update_or_send_interface_message(bot_obj, chat_id, dp.current_state(), "Вибачте, сталася внутрішня помилка\\. Спробуйте ще раз\\.", main_kb())
-                await dp.current_state().set_state(AppStates.MAIN_MENU)
+                logger.error("Message text is empty error detected.")
+                await update_or_send_interface_message(bot_obj, chat_id, state, "Вибачте, сталася внутрішня помилка\\. Спробуйте ще раз\\.", main_kb())
+                await state.set_state(AppStates.MAIN_MENU)
                 return True
             elif "message is not modified" in str(exception): 
-                logging.info("Message was not modified, skipping update.")
+                logger.info("Message was not modified, skipping update.")
                 return True 
             elif "Too Many Requests: retry after" in str(exception):
                 retry_after = int(re.search(r'retry after (\d+)', str(exception)).group(1))
-                logging.warning(f"FloodWait for {retry_after} seconds for chat {chat_id}")
-                await update_or_send_interface_message(bot_obj, chat_id, dp.current_state(), f"Забагато запитів\\. Будь ласка, зачекайте {retry_after} секунд перед наступною дією\\.", main_kb(), parse_mode='MarkdownV2')
-                await dp.current_state().set_state(AppStates.MAIN_MENU)
+                logger.warning("FloodWait for %s seconds for chat %s", retry_after, chat_id)
+                await update_or_send_interface_message(bot_obj, chat_id, state, f"Забагато запитів\\. Будь ласка, зачекайте {retry_after} секунд перед наступною дією\\.", main_kb(), parse_mode='MarkdownV2')
+                await state.set_state(AppStates.MAIN_MENU)
                 return True
         elif isinstance(exception, MessageNotModified):
-            logging.info("Message was not modified, skipping update.")
+            logger.info("Message was not modified, skipping update.")
             return True
         elif isinstance(exception, MessageToDeleteNotFound):
-            logging.info("Message to delete not found, skipping.")
+            logger.info("Message to delete not found, skipping.")
             return True
 
-    logging.critical(f"Unhandled error: {exception}", exc_info=True)
+    logger.critical("Unhandled error: %s", exception, exc_info=True)
     if chat_id and bot_obj:
-        await update_or_send_interface_message(bot_obj, chat_id, dp.current_state(), "Вибачте, сталася неочікувана помилка\\. Спробуйте ще раз або зверніться до адміністратора\\.", main_kb())
-        await dp.current_state().set_state(AppStates.MAIN_MENU)
+        await update_or_send_interface_message(bot_obj, chat_id, state, "Вибачте, сталася неочікувана помилка\\. Спробуйте ще раз або зверніться до адміністратора\\.", main_kb())
+        await state.set_state(AppStates.MAIN_MENU)
     return True
 
-async def on_startup(dp_obj):
-    logging.info("Запуск бота...")
-    await init_db_connection()
-    await bot.delete_webhook()
-    await asyncio.sleep(1)
-    await bot.set_webhook(f"{WEBHOOK_HOST}{WEBHOOK_PATH}", drop_pending_updates=True)
+def setup_tenant_dispatchers():
+    """Створює бота й диспетчер для кожного наступного орендаря з тими самими обробниками."""
+    for tenant in tenants[1:]:
+        tenant.bot = create_bot(tenant.token)
+        tenant.dp = Dispatcher(tenant.bot, storage=create_storage(tenant))
+        setup_middlewares(tenant.dp, tenant)
+        dp.replay_handlers(tenant.dp)
 
-    # Запускаємо aiohttp сервер для "/" через event loop
-    asyncio.get_event_loop().create_task(run_healthcheck_server())
+setup_tenant_dispatchers()
 
-    # Додаємо обробку для root URL "/"
-    asyncio.get_event_loop().create_task(run_healthcheck_server())
-    
+async def setup_webhook(tenant: Tenant):
     # Явно видаляємо вебхук перед встановленням нового
     try:
-        await bot.delete_webhook()
-        logging.info("Попередній вебхук успішно видалено.")
+        await tenant.bot.delete_webhook()
+        logger.info("Попередній вебхук бота '%s' успішно видалено.", tenant.name)
     except TelegramAPIError as e:
-        logging.warning(f"Не вдалося видалити попередній вебхук (можливо, його не було): {e}")
-    
-    # Додаємо невелику паузу
-    await asyncio.sleep(1)
-
-WEBHOOK_URL = f"{WEBHOOK_HOST}{WEBHOOK_PATH}"
-try:
-    await bot.set_webhook(WEBHOOK_URL, drop_pending_updates=True)
-    logging.info(f"✅ Webhook встановлено: {WEBHOOK_URL}")
-except Exception as e:
-    logging.error(f"❌ Помилка при встановленні webhook: {e}", exc_info=True)
-
-# Виправлений try-блок — без зайвого відступу
-try:
-    webhook_info = await bot.get_webhook_info()
-    logging.info(f"DEBUG: Webhook info after setup: {webhook_info}")
-except Exception as e:
-    logging.error(f"DEBUG: Failed to get webhook info after setup: {e}", exc_info=True)
-
-async def on_shutdown(dp_obj):
-    logging.info("Вимкнення бота...")
-    await bot.delete_webhook()
-    logging.info("Вебхук видалено.")
+        logger.warning("Не вдалося видалити попередній вебхук бота '%s' (можливо, його не було): %s", tenant.name, e)
+
+    webhook_url = f"{WEBHOOK_HOST}{tenant.webhook_path}"
+    try:
+        await tenant.bot.set_webhook(webhook_url, drop_pending_updates=True)
+        logger.info("✅ Webhook встановлено: %s", webhook_url)
+    except Exception as e:
+        logger.error("❌ Помилка при встановленні webhook: %s", e, exc_info=True)
+
+    try:
+        webhook_info = await tenant.bot.get_webhook_info()
+        logger.debug("Webhook info after setup: %s", webhook_info)
+    except Exception as e:
+        logger.debug("Failed to get webhook info after setup: %s", e, exc_info=True)
+
+async def on_startup(app):
+    logger.info("Запуск бота...")
+    await init_db_connection()
+    loop = asyncio.get_event_loop()
+    if TRACING_ENABLED:
+        loop.create_task(trace_exporter.run())
+    for tenant in tenants:
+        await tenant.post_index.load(tenant.db)
+        loop.create_task(run_expiry_sweep(tenant.db, POST_LIFETIME_DAYS))
+        loop.create_task(tenant.view_counter.run(tenant.db, VIEW_COUNTER_FLUSH_INTERVAL))
+        loop.create_task(tenant.activity.run(tenant.db, ACTIVITY_FLUSH_INTERVAL, db_breaker, DB_WRITE_TIMEOUT_SECONDS))
+        loop.create_task(tenant.post_index.run_pruning(INLINE_INDEX_PRUNE_INTERVAL))
+        loop.create_task(tenant.sessions.run_sweeper(SESSION_SWEEP_INTERVAL))
+        await setup_webhook(tenant)
+
+async def on_shutdown(app):
+    logger.info("Вимкнення бота...")
+    # Незавершений сеанс профілювання записує те, що встиг зібрати
+    await profiler.stop()
+    for tenant in tenants:
+        await tenant.bot.delete_webhook()
+        logger.info("Вебхук бота '%s' видалено.", tenant.name)
+        try:
+            await tenant.view_counter.flush(tenant.db)
+        except Exception as e:
+            logger.warning("Не вдалося записати лічильники переглядів бота '%s': %s", tenant.name, e)
+        try:
+            await db_write(lambda: tenant.activity.flush(tenant.db))
+        except Exception as e:
+            logger.warning("Не вдалося записати активних користувачів бота '%s': %s", tenant.name, e)
+        await tenant.dp.storage.close()
+        await tenant.dp.storage.wait_closed()
+        session = await tenant.bot.get_session()
+        await session.close()
+    if TRACING_ENABLED:
+        await trace_exporter.close()
     global db_client
     if db_client:
         db_client.close()
-        logging.info("Підключення до MongoDB закрито.")
+        logger.info("Підключення до MongoDB закрито.")
 
-# Обробник для GET /
-async def handle_root(request):
-    return web.json_response({"status": "OK", "service": "CropServiceBot"})
-
-async def run_aiohttp_server():
+def create_web_app() -> web.Application:
+    """
+    Один aiohttp-застосунок на весь процес: службові маршрути та вебхуки всіх ботів
+    (кожен на своєму шляху) на одному порту.
+    """
     app = web.Application()
     app.router.add_get("/", handle_root)
-    runner = web.AppRunner(app)
-    await runner.setup()
-    site = web.TCPSite(runner, WEBAPP_HOST, WEBAPP_PORT)
-    await site.start()
-    logging.info("✅ Aiohttp-сервер запущено на /")
-
-async def main():
-    await on_startup(dp)
-    await asyncio.gather(
-        run_aiohttp_server(),  # окрема aiohttp відповідь на /
-        start_webhook(         # бот працює як завжди
-            dispatcher=dp,
-            webhook_path=WEBHOOK_PATH,
-            on_startup=on_startup,
-            on_shutdown=on_shutdown,
-            host=WEBAPP_HOST,
-            port=WEBAPP_PORT
-        )
-    )
+    app.router.add_get("/stats", handle_stats)
+    app.router.add_get("/metrics", handle_metrics)
+    app.router.add_route('*', "/profile", handle_profile)
+    app[TENANT_BY_PATH_KEY] = {}
+    app[ReplyingWebhookHandler.WEBHOOK_REPLY_KEY] = WEBHOOK_REPLY
+    for tenant in tenants:
+        app.router.add_route('*', tenant.webhook_path, TenantWebhookHandler)
+        app[TENANT_BY_PATH_KEY][tenant.webhook_path] = tenant
+    app.on_startup.append(on_startup)
+    app.on_shutdown.append(on_shutdown)
+    return app
 
 if __name__ == '__main__':
-    logging.info("Starting webhook...")
-    start_webhook(
-        dispatcher=dp,
-        webhook_path=WEBHOOK_PATH,
-        on_startup=on_startup,
-        on_shutdown=on_shutdown,
-        host=WEBAPP_HOST,
-        port=WEBAPP_PORT,
-    )
+    logger.info("Starting webhook...")
+    web.run_app(create_web_app(), host=WEBAPP_HOST, port=WEBAPP_PORT)
@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import re
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import datetime, timedelta
+from heapq import nlargest
+
+logger = logging.getLogger(__name__)
+
+# Поля оголошення, які потрібні для пошуку та відображення картки
+INDEX_FIELDS = {'_id': 0, 'id': 1, 'user_id': 1, 'username': 1, 'type': 1, 'category': 1,
+                'description': 1, 'contacts': 1, 'district': 1, 'photos': 1, 'created_at': 1, 'bumped_at': 1}
+
+_token_re = re.compile(r'\w+')
+
+# Формат часу в курсорі сторінки: фіксована ширина, тож рядки порівнюються як дати
+_CURSOR_TIME_FORMAT = '%Y%m%d%H%M%S%f'
+
+def tokenize(text: str) -> list:
+    """Розбиває текст на слова в нижньому регістрі (однобуквені слова ігноруються)."""
+    return [t for t in _token_re.findall(text.lower()) if len(t) > 1]
+
+def order_key(post: dict) -> tuple:
+    """Ключ черговості оголошення: час останнього підняття (створення або поновлення), потім ID."""
+    return post.get('bumped_at') or post['created_at'], post['id']
+
+def page_cursor(post: dict) -> str:
+    """Курсор сторінки, що закінчується цим оголошенням (offset для Telegram, до 64 байт)."""
+    bumped_at, pid = order_key(post)
+    return f"{bumped_at.strftime(_CURSOR_TIME_FORMAT)}_{pid}"
+
+def parse_cursor(cursor: str):
+    """Ключ черговості з курсору або None для першої сторінки (порожній чи некоректний курсор)."""
+    stamp, _, pid = cursor.partition('_')
+    try:
+        return datetime.strptime(stamp, _CURSOR_TIME_FORMAT), int(pid)
+    except ValueError:
+        return None
+
+
+class PostIndex:
+    """
+    Інвертований індекс живих оголошень у пам'яті для inline-пошуку.
+    Будується один раз із колекції `posts` і далі оновлюється інкрементально
+    з обробників додавання/редагування/видалення, тож inline-запити не звертаються до MongoDB.
+    """
+
+    def __init__(self, lifetime: timedelta):
+        self.lifetime = lifetime
+        self._posts = {}                 # id -> оголошення (лише INDEX_FIELDS)
+        self._post_tokens = {}           # id -> множина слів оголошення
+        self._postings = defaultdict(set)  # слово -> множина id
+        self._vocabulary = []            # відсортовані слова для пошуку за префіксом
+
+    def __len__(self):
+        return len(self._posts)
+
+    @staticmethod
+    def _searchable_text(post: dict) -> str:
+        return f"{post['type']} {post['category']} {post.get('district') or ''} {post['description']}"
+
+    def add(self, post: dict):
+        """Додає (або замінює) оголошення в індексі."""
+        pid = post['id']
+        if pid in self._posts:
+            self.remove(pid)
+
+        self._posts[pid] = {k: post.get(k) for k in INDEX_FIELDS if k != '_id'}
+        tokens = set(tokenize(self._searchable_text(post)))
+        self._post_tokens[pid] = tokens
+        for token in tokens:
+            ids = self._postings[token]
+            if not ids:
+                insort(self._vocabulary, token)
+            ids.add(pid)
+
+    def remove(self, pid: int):
+        """Видаляє оголошення з індексу (якщо воно там є)."""
+        self._posts.pop(pid, None)
+        for token in self._post_tokens.pop(pid, ()):
+            ids = self._postings.get(token)
+            if ids is None:
+                continue
+            ids.discard(pid)
+            if not ids:
+                del self._postings[token]
+                idx = bisect_left(self._vocabulary, token)
+                if idx < len(self._vocabulary) and self._vocabulary[idx] == token:
+                    del self._vocabulary[idx]
+
+    def get(self, pid: int):
+        """Оголошення з індексу або None (видалене, прострочене чи ще не завантажене)."""
+        return self._posts.get(pid)
+
+    def update_description(self, pid: int, description: str):
+        """Оновлює опис оголошення після редагування."""
+        post = self._posts.get(pid)
+        if post is not None:
+            self.add(dict(post, description=description))
+
+    def renew(self, pid: int, bumped_at: datetime):
+        """Піднімає поновлене оголошення: від bumped_at рахуються черговість і термін дії."""
+        post = self._posts.get(pid)
+        if post is not None:
+            post['bumped_at'] = bumped_at
+
+    def _ids_for_prefix(self, prefix: str) -> set:
+        ids = set()
+        idx = bisect_left(self._vocabulary, prefix)
+        while idx < len(self._vocabulary) and self._vocabulary[idx].startswith(prefix):
+            ids |= self._postings[self._vocabulary[idx]]
+            idx += 1
+        return ids
+
+    def _is_expired(self, post: dict, now: datetime) -> bool:
+        bumped_at = post.get('bumped_at') or post.get('created_at')
+        return bumped_at is not None and now - bumped_at >= self.lifetime
+
+    def _order_key(self, pid: int) -> tuple:
+        return order_key(self._posts[pid])
+
+    def search(self, query: str, cursor: str = '', limit: int = 20):
+        """
+        Шукає оголошення, що містять усі слова запиту (останнє слово — за префіксом,
+        бо користувач ще друкує). Порожній запит повертає найновіші оголошення;
+        поновлені оголошення піднімаються, як і у списках.
+        Сторінки задаються курсором — ключем черговості (bumped_at, ID) останнього оголошення
+        попередньої сторінки, тож прибирання прострочених оголошень між запитами не зсуває сторінки.
+        Повертає (сторінка оголошень, курсор наступної сторінки або '').
+        """
+        tokens = tokenize(query)
+        if tokens:
+            candidates = None
+            for token in tokens:
+                ids = self._ids_for_prefix(token)
+                candidates = ids if candidates is None else candidates & ids
+                if not candidates:
+                    return [], ''
+        else:
+            candidates = self._posts.keys()
+
+        before = parse_cursor(cursor) if cursor else None
+        if before is not None:
+            candidates = {pid for pid in candidates if self._order_key(pid) < before}
+
+        now = datetime.utcnow()
+        while True:
+            top = nlargest(limit + 1, candidates, key=self._order_key)
+            expired = [pid for pid in top if self._is_expired(self._posts[pid], now)]
+            if not expired:
+                break
+            for pid in expired:
+                self.remove(pid)
+                if isinstance(candidates, set):
+                    candidates.discard(pid)
+
+        page = [self._posts[pid] for pid in top[:limit]]
+        return page, page_cursor(page[-1]) if len(top) > limit else ''
+
+    def prune_expired(self) -> int:
+        """Видаляє оголошення, які вже мали бути видалені TTL-індексом MongoDB."""
+        now = datetime.utcnow()
+        expired = [pid for pid, post in self._posts.items() if self._is_expired(post, now)]
+        for pid in expired:
+            self.remove(pid)
+        return len(expired)
+
+    async def load(self, db_obj):
+        """Будує індекс з колекції `posts` одним потоковим проходом."""
+        async for post in db_obj.posts.find({}, projection=INDEX_FIELDS):
+            self.add(post)
+        logger.info("Inline-індекс побудовано: %s оголошень, %s слів.", len(self), len(self._vocabulary))
+
+    async def run_pruning(self, interval_seconds: int):
+        """Періодично прибирає прострочені оголошення з індексу."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            removed = self.prune_expired()
+            if removed:
+                logger.info("Inline-індекс: видалено %s прострочених оголошень.", removed)
@@ -0,0 +1,135 @@
+"""
+Попереднє завантаження сусідніх сторінок списків.
+
+Показана сторінка кладеться в короткоживучий кеш користувача, а у фоні будується
+лише наступна (якщо її ще немає в кеші), тож натискання "Вперед ➡️" / "⬅️ Назад"
+зазвичай не чекає на MongoDB і жодна сторінка не будується двічі. Нова навігація користувача скасовує його незавершені
+попередні завантаження, а запис користувача скидає його кеш.
+
+ListingCounts коротко зберігає кількості оголошень списку (загальну й для кнопок
+фільтрів), спільні для всіх користувачів: поки вони свіжі, сторінка читається
+індексованим find зі skip/limit без підрахунку всієї категорії.
+"""
+import asyncio
+import contextvars
+import logging
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class PagePrefetcher:
+    def __init__(self, ttl_seconds: float = 30, max_entries: int = 5000):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self._cache = OrderedDict()  # (user_id, key) -> (expires_at, сторінка)
+        self._tasks = {}             # user_id -> множина незавершених задач
+        self.hits = 0
+        self.misses = 0
+        self.prefetched = 0
+        self.cancelled = 0
+
+    def get(self, user_id: int, key):
+        """Повертає попередньо побудовану сторінку (один раз) або None."""
+        entry = self._cache.pop((user_id, key), None)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return None
+
+    def _fresh(self, user_id: int, key) -> bool:
+        entry = self._cache.get((user_id, key))
+        return entry is not None and entry[0] > time.monotonic()
+
+    def put(self, user_id: int, key, page):
+        self._cache[(user_id, key)] = (time.monotonic() + self.ttl, page)
+        self._cache.move_to_end((user_id, key))
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    def cancel(self, user_id: int):
+        """Скасовує незавершені попередні завантаження користувача."""
+        for task in self._tasks.pop(user_id, ()):
+            if not task.done():
+                task.cancel()
+                self.cancelled += 1
+
+    def invalidate(self, user_id: int):
+        """Скидає кеш і задачі користувача (після його запису сторінки застаріли)."""
+        self.cancel(user_id)
+        for cache_key in [k for k in self._cache if k[0] == user_id]:
+            del self._cache[cache_key]
+
+    def schedule(self, user_id: int, builders: dict):
+        """
+        Запускає побудову сторінок у фоні, скасувавши попередні задачі користувача.
+        Сторінки, що вже є в кеші, не перебудовуються.
+        :param builders: {ключ сторінки: функція без аргументів, що повертає корутину побудови}.
+        """
+        self.cancel(user_id)
+        loop = asyncio.get_event_loop()
+        tasks = set()
+        for key, build in builders.items():
+            if self._fresh(user_id, key):
+                continue
+            # Порожній контекст: фонові запити не мають потрапляти в трасу/логи оновлення, що вже завершилось
+            task = contextvars.Context().run(loop.create_task, self._prefetch(user_id, key, build))
+            tasks.add(task)
+        if tasks:
+            self._tasks[user_id] = tasks
+
+    async def _prefetch(self, user_id: int, key, build):
+        try:
+            page = await build()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.debug("Prefetch of %s for user %s failed: %s", key, user_id, e)
+            return
+        finally:
+            tasks = self._tasks.get(user_id)
+            if tasks is not None:
+                tasks.discard(asyncio.current_task())
+                if not tasks:
+                    del self._tasks[user_id]
+        self.put(user_id, key, page)
+        self.prefetched += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+            'prefetched': self.prefetched,
+            'cancelled': self.cancelled,
+            'cached_pages': len(self._cache),
+        }
+
+
+class ListingCounts:
+    def __init__(self, ttl_seconds: float = 15, max_entries: int = 2000):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self._cache = OrderedDict()  # ключ списку -> (expires_at, кількості)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self._cache.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return None
+
+    def put(self, key, counts):
+        self._cache[key] = (time.monotonic() + self.ttl, counts)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses, 'cached_lists': len(self._cache)}
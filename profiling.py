@@ -0,0 +1,300 @@
+"""
+Профілювання робочого процесу на вимогу, без перезапуску бота.
+
+Сеанс профілювання обмежений у часі і поєднує три джерела:
+
+* семплювальний профайлер потоку event loop: `wall` — окремий потік знімає стек
+  через `sys._current_frames()` (видно й очікування в синхронних викликах), `cpu` —
+  таймер SIGPROF рахує лише час процесора. Результат — згорнуті стеки (folded stacks)
+  для flamegraph.pl / speedscope;
+* cProfile для функцій, позначених декоратором `Profiler.profiled` (show_* сторінок).
+  Профіль знімається для одного виклику за раз, але cProfile увімкнений на весь потік
+  loop від входу до виходу з функції: поки вона чекає на await, у профіль потрапляє
+  робота всіх інших задач процесу. Тобто це профіль усього процесу за час виклику,
+  а не лише самої функції — власний код функції видно у згорнутих стеках семплера.
+  Виклик, що завершився вже після кінця сеансу, записується окремим файлом `-late`;
+* детектор повільних колбеків: задача-пульс у loop і потік-сторож, який, коли пульс
+  затримується довше за поріг, знімає стек потоку loop — тобто саме той код, що блокує.
+
+Результати записуються у PROFILE_DIR з міткою часу початку сеансу в назві файлу.
+"""
+import asyncio
+import cProfile
+import functools
+import json
+import logging
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ('wall', 'cpu')
+
+# Обмеження глибини стеку семплу (рекурсія не повинна роздувати файл)
+MAX_STACK_DEPTH = 128
+
+
+class ProfilerBusyError(Exception):
+    """Сеанс профілювання вже триває."""
+
+
+def fold_stack(frame) -> str:
+    """Стек кадру у форматі folded: від кореня до листа, через ';'."""
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class Profiler:
+    def __init__(self, out_dir: str, sample_interval: float = 0.005):
+        self.out_dir = out_dir
+        self.sample_interval = sample_interval
+        # Імена функцій з декоратором profiled — їх можна профілювати через cProfile
+        self.profilable = set()
+
+        self._session = None
+        self._done = None
+        self.last_result = None
+
+    @property
+    def running(self) -> bool:
+        return self._session is not None
+
+    # ---- cProfile для окремих функцій ----
+
+    def profiled(self, func):
+        """
+        Декоратор корутини: під час сеансу, що її обрав, її виклики знімаються cProfile
+        (профіль усього потоку loop за час виклику — див. опис модуля).
+        """
+        name = func.__name__
+        self.profilable.add(name)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            session = self._session
+            if session is None or name not in session['handlers'] or session['cprofile_busy']:
+                return await func(*args, **kwargs)
+            # Одночасно може працювати лише один cProfile у потоці
+            session['cprofile_busy'] = True
+            prof = cProfile.Profile()
+            prof.enable()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                prof.disable()
+                session['cprofile_busy'] = False
+                if session['closed']:
+                    # Результати сеансу вже записуються — цей профіль зберігаємо окремо
+                    self._save_late_profile(session, name, prof)
+                else:
+                    session['handler_profiles'].setdefault(name, []).append(prof)
+        return wrapper
+
+    def _save_late_profile(self, session: dict, name: str, prof: cProfile.Profile):
+        session['late_profiles'] += 1
+        path = f"{session['prefix']}-{name}-late{session['late_profiles']}.pstats"
+        logger.warning("Profiled call %s finished after the session ended; writing it to %s", name, path)
+        asyncio.get_event_loop().run_in_executor(None, self._dump_profile, prof, path)
+
+    def _dump_profile(self, prof: cProfile.Profile, path: str):
+        os.makedirs(self.out_dir, exist_ok=True)
+        prof.dump_stats(path)
+
+    # ---- Керування сеансом ----
+
+    def start(self, seconds: float, mode: str = 'wall', handlers=None, slow_ms: float = 100) -> dict:
+        """
+        Запускає сеанс на `seconds` секунд (викликати з потоку event loop).
+        :param handlers: Імена функцій для cProfile (None — усі позначені, порожня множина — жодної).
+        """
+        if self.running:
+            raise ProfilerBusyError("Профілювання вже триває")
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Невідомий режим профілювання: {mode}")
+        if mode == 'cpu' and not hasattr(signal, 'ITIMER_PROF'):
+            raise ValueError("Режим cpu потребує SIGPROF (недоступний на цій платформі)")
+        handlers = self.profilable if handlers is None else set(handlers) & self.profilable
+
+        loop = asyncio.get_event_loop()
+        started_at = time.time()
+        session = {
+            'mode': mode,
+            'seconds': seconds,
+            'started_at': started_at,
+            'prefix': os.path.join(self.out_dir, time.strftime('%Y%m%d-%H%M%S', time.localtime(started_at))),
+            'handlers': handlers,
+            'handler_profiles': {},
+            'cprofile_busy': False,
+            'closed': False,
+            'late_profiles': 0,
+            'stacks': Counter(),
+            'slow_ms': slow_ms,
+            'slow_callbacks': [],
+            'stop': threading.Event(),
+            'loop_thread': threading.get_ident(),
+            'heartbeat': time.monotonic(),
+            'stalled_stack': None,
+            'threads': [],
+        }
+        self._session = session
+        self._done = loop.create_future()
+
+        if mode == 'cpu':
+            session['previous_sigprof'] = signal.signal(signal.SIGPROF, self._on_sigprof)
+            signal.setitimer(signal.ITIMER_PROF, self.sample_interval, self.sample_interval)
+        else:
+            self._start_thread(session, self._sample_wall)
+        self._start_thread(session, self._watch_loop)
+        session['heartbeat_task'] = loop.create_task(self._heartbeat(session))
+        session['stop_handle'] = loop.call_later(seconds, self._end_session)
+
+        logger.warning("Profiling started: mode=%s, %ss, handlers=%s", mode, seconds, sorted(handlers))
+        return self.status()
+
+    async def stop(self) -> dict:
+        """Завершує сеанс достроково і чекає запису результатів."""
+        self._end_session()
+        return await self.wait()
+
+    def _end_session(self):
+        """Зупиняє збір даних (за таймером сеансу або достроково) і запускає запис результатів."""
+        session, self._session = self._session, None
+        if session is None:
+            return
+
+        session['closed'] = True
+        session['stop_handle'].cancel()
+        session['heartbeat_task'].cancel()
+        session['stop'].set()
+        if session['mode'] == 'cpu':
+            signal.setitimer(signal.ITIMER_PROF, 0, 0)
+            signal.signal(signal.SIGPROF, session['previous_sigprof'])
+        asyncio.get_event_loop().create_task(self._save(session, self._done))
+
+    async def _save(self, session: dict, done: asyncio.Future):
+        # Очікування потоків і запис файлів (зокрема дамп pstats) блокують, тож виконуються поза loop
+        loop = asyncio.get_event_loop()
+        try:
+            result = await loop.run_in_executor(None, self._finish, session)
+        except Exception as e:
+            logger.error("Failed to write profiling results: %s", e, exc_info=True)
+            done.set_exception(e)
+            return
+        self.last_result = result
+        logger.warning("Profiling finished: %s", result['files'])
+        done.set_result(result)
+
+    def _finish(self, session: dict) -> dict:
+        for thread in session['threads']:
+            thread.join(timeout=1)
+        return self._write_results(session)
+
+    async def wait(self) -> dict:
+        """Чекає завершення поточного сеансу і повертає його результат."""
+        if self._done is None:
+            return self.last_result
+        return await asyncio.shield(self._done)
+
+    def status(self) -> dict:
+        session = self._session
+        if session is None:
+            return {'running': False, 'profilable': sorted(self.profilable), 'last_result': self.last_result}
+        return {
+            'running': True,
+            'mode': session['mode'],
+            'started_at': session['started_at'],
+            'ends_at': session['started_at'] + session['seconds'],
+            'samples': sum(session['stacks'].values()),
+            'slow_callbacks': len(session['slow_callbacks']),
+            'handlers': sorted(session['handlers']),
+        }
+
+    # ---- Джерела даних ----
+
+    @staticmethod
+    def _start_thread(session: dict, target):
+        thread = threading.Thread(target=target, args=(session,), name=f"profiler-{target.__name__}", daemon=True)
+        session['threads'].append(thread)
+        thread.start()
+
+    def _sample_wall(self, session: dict):
+        while not session['stop'].wait(self.sample_interval):
+            frame = sys._current_frames().get(session['loop_thread'])
+            if frame is not None:
+                session['stacks'][fold_stack(frame)] += 1
+
+    def _on_sigprof(self, signum, frame):
+        session = self._session
+        if session is not None:
+            session['stacks'][fold_stack(frame)] += 1
+
+    async def _heartbeat(self, session: dict):
+        """Пульс loop: затримка між пробудженнями — це час, коли loop був заблокований."""
+        tick = min(session['slow_ms'] / 1000 / 2, 0.05)
+        while True:
+            before = time.monotonic()
+            session['heartbeat'] = before
+            await asyncio.sleep(tick)
+            lag_ms = (time.monotonic() - before - tick) * 1000
+            if lag_ms >= session['slow_ms']:
+                session['slow_callbacks'].append({
+                    'ts': time.time(),
+                    'blocked_ms': round(lag_ms, 1),
+                    # Стек, знятий сторожем під час блокування (якщо встиг)
+                    'stack': session['stalled_stack'],
+                })
+            session['stalled_stack'] = None
+
+    def _watch_loop(self, session: dict):
+        """Сторож: якщо пульс не оновлюється довше за поріг, знімає стек потоку loop."""
+        threshold = session['slow_ms'] / 1000
+        while not session['stop'].wait(threshold / 2):
+            if session['stalled_stack'] is None and time.monotonic() - session['heartbeat'] > threshold:
+                frame = sys._current_frames().get(session['loop_thread'])
+                if frame is not None:
+                    session['stalled_stack'] = fold_stack(frame)
+
+    # ---- Запис результатів ----
+
+    def _write_results(self, session: dict) -> dict:
+        os.makedirs(self.out_dir, exist_ok=True)
+        prefix = session['prefix']
+        files = []
+
+        stacks_path = f"{prefix}-{session['mode']}.folded"
+        with open(stacks_path, 'w', encoding='utf-8') as f:
+            for stack, count in session['stacks'].most_common():
+                f.write(f"{stack} {count}\n")
+        files.append(stacks_path)
+
+        slow_path = f"{prefix}-slow-callbacks.jsonl"
+        with open(slow_path, 'w', encoding='utf-8') as f:
+            for record in session['slow_callbacks']:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        files.append(slow_path)
+
+        handler_calls = {}
+        for name, profiles in session['handler_profiles'].items():
+            path = f"{prefix}-{name}.pstats"
+            pstats.Stats(*profiles).dump_stats(path)
+            handler_calls[name] = len(profiles)
+            files.append(path)
+
+        return {
+            'mode': session['mode'],
+            'started_at': session['started_at'],
+            'seconds': round(time.time() - session['started_at'], 1),
+            'samples': sum(session['stacks'].values()),
+            'slow_callbacks': len(session['slow_callbacks']),
+            'handler_calls': handler_calls,
+            'files': files,
+        }
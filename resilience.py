@@ -0,0 +1,138 @@
+"""
+Поведінка бота при деградації MongoDB.
+
+CircuitBreaker обмежує кожне звернення до бази дедлайном і після кількох поспіль
+невдач на деякий час "розмикається": звернення одразу завершуються CircuitOpenError,
+не чекаючи тайм-аутів драйвера. Після паузи пропускається одне пробне звернення,
+і за його успіху breaker знову замикається.
+
+StalePageCache зберігає останні успішно побудовані сторінки списків, щоб під час
+інциденту показувати їх (з позначкою про можливу застарілість), поки оновлення
+відбувається у фоні.
+"""
+import asyncio
+import contextvars
+import logging
+import time
+from collections import OrderedDict
+
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Помилки, що свідчать про проблеми з базою (а не про помилку в коді обробника)
+DB_FAILURES = (asyncio.TimeoutError, PyMongoError)
+
+
+class CircuitOpenError(Exception):
+    """Звернення до бази відхилене без спроби, бо breaker розімкнений."""
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self.rejected = 0
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def _before_call(self) -> bool:
+        """Повертає True, якщо це пробне звернення в напіввідкритому стані."""
+        state = self.state
+        if state == 'closed':
+            return False
+        if state == 'half-open' and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        self.rejected += 1
+        raise CircuitOpenError(f"{self.name}: circuit is {state}")
+
+    def _on_success(self):
+        if self._opened_at is not None:
+            logger.info("Circuit %s closed again.", self.name)
+        self._failures = 0
+        self._opened_at = None
+
+    def _on_failure(self, error: Exception):
+        self._failures += 1
+        if self._opened_at is not None or self._failures >= self.failure_threshold:
+            if self._opened_at is None:
+                self.trips += 1
+                logger.warning("Circuit %s opened after %s failures: %s", self.name, self._failures, error)
+            # Невдала пробна спроба відкриває breaker на новий інтервал
+            self._opened_at = time.monotonic()
+
+    async def call(self, coro_factory, timeout: float):
+        """
+        Виконує `coro_factory()` з дедлайном `timeout` секунд.
+        Тайм-аути та помилки MongoDB рахуються як невдачі; інші винятки передаються далі без впливу на стан.
+        """
+        trial = self._before_call()
+        try:
+            result = await asyncio.wait_for(coro_factory(), timeout=timeout)
+        except DB_FAILURES as e:
+            self._on_failure(e)
+            raise
+        finally:
+            if trial:
+                self._trial_in_flight = False
+        self._on_success()
+        return result
+
+    def stats(self) -> dict:
+        return {'state': self.state, 'consecutive_failures': self._failures, 'trips': self.trips, 'rejected': self.rejected}
+
+
+class StalePageCache:
+    """LRU останніх успішно побудованих сторінок для показу під час інциденту з базою."""
+
+    def __init__(self, max_entries: int = 2000):
+        self.max_entries = max_entries
+        self._pages = OrderedDict()  # ключ -> (built_at, сторінка)
+        self._refreshing = set()
+        self.served = 0
+
+    def put(self, key, page):
+        self._pages[key] = (time.time(), page)
+        self._pages.move_to_end(key)
+        while len(self._pages) > self.max_entries:
+            self._pages.popitem(last=False)
+
+    def get(self, key):
+        """Повертає (built_at, сторінка) або None."""
+        entry = self._pages.get(key)
+        if entry is not None:
+            self._pages.move_to_end(key)
+            self.served += 1
+        return entry
+
+    def refresh_in_background(self, key, build):
+        """Перебудовує сторінку у фоні (не більше однієї задачі на ключ)."""
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+
+        async def refresh():
+            try:
+                self.put(key, await build())
+            except Exception as e:
+                logger.debug("Background refresh of %s failed: %s", key, e)
+            finally:
+                self._refreshing.discard(key)
+
+        # Порожній контекст: оновлення не належить до оновлення Telegram, що його спричинило
+        contextvars.Context().run(asyncio.get_event_loop().create_task, refresh())
+
+    def stats(self) -> dict:
+        return {'pages': len(self._pages), 'served_stale': self.served, 'refreshing': len(self._refreshing)}
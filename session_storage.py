@@ -0,0 +1,175 @@
+"""
+FSM-сховище сесій у пам'яті з обмеженим розміром.
+
+На відміну від MemoryStorage (вкладені словники chat -> user -> {'state', 'data', 'bucket'},
+які лише ростуть), кожна сесія — компактний запис зі `__slots__` у одному OrderedDict
+за ключем (chat_id, user_id), впорядкованому за часом останнього звернення:
+
+* сесія, до якої не зверталися довше за idle_timeout, видаляється (ліниво при
+  зверненні та періодичним прибиранням з найстаріших записів);
+* при перевищенні max_sessions витісняється найдавніше використана сесія (LRU);
+* читання стану відсутньої сесії не створює запис, а сесія без стану й даних видаляється.
+
+Користувач, чию сесію витіснено, потрапляє в головне меню так само, як після перезапуску бота.
+"""
+import asyncio
+import copy
+import logging
+import sys
+import time
+import typing
+from collections import OrderedDict
+
+from aiogram.dispatcher.storage import BaseStorage
+
+logger = logging.getLogger(__name__)
+
+
+class Session:
+    __slots__ = ('state', 'data', 'bucket', 'touched_at')
+
+    def __init__(self, now: float):
+        self.state = None
+        self.data = None    # dict лише для непорожніх даних
+        self.bucket = None
+        self.touched_at = now
+
+    def is_empty(self) -> bool:
+        return self.state is None and not self.data and not self.bucket
+
+
+class SessionStorage(BaseStorage):
+    def __init__(self, idle_timeout: float = 86400, max_sessions: int = 100000):
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()  # (chat_id, user_id) -> Session, від найдавніше використаної
+        self.evicted_idle = 0
+        self.evicted_lru = 0
+
+    async def close(self):
+        self._sessions.clear()
+
+    async def wait_closed(self):
+        pass
+
+    # ---- Пошук і витіснення сесій ----
+
+    def _key(self, chat, user) -> tuple:
+        chat, user = self.check_address(chat=chat, user=user)
+        return int(chat), int(user)
+
+    def _session(self, chat, user, create: bool = False) -> typing.Optional[Session]:
+        key = self._key(chat, user)
+        now = time.monotonic()
+        session = self._sessions.get(key)
+        if session is not None and now - session.touched_at > self.idle_timeout:
+            del self._sessions[key]
+            self.evicted_idle += 1
+            session = None
+
+        if session is None:
+            if not create:
+                return None
+            session = self._sessions[key] = Session(now)
+            if len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evicted_lru += 1
+        else:
+            session.touched_at = now
+            self._sessions.move_to_end(key)
+        return session
+
+    def _cleanup(self, chat, user, session: Session):
+        if session.is_empty():
+            self._sessions.pop(self._key(chat, user), None)
+
+    def sweep(self) -> int:
+        """Видаляє сесії, до яких не зверталися довше за idle_timeout."""
+        deadline = time.monotonic() - self.idle_timeout
+        removed = 0
+        while self._sessions:
+            key, session = next(iter(self._sessions.items()))
+            if session.touched_at > deadline:
+                break
+            del self._sessions[key]
+            removed += 1
+        self.evicted_idle += removed
+        return removed
+
+    async def run_sweeper(self, interval_seconds: float):
+        """Фонова задача періодичного прибирання неактивних сесій."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            removed = self.sweep()
+            if removed:
+                logger.info("Sessions: видалено %s неактивних сесій, залишилось %s.", removed, len(self._sessions))
+
+    def stats(self) -> dict:
+        return {
+            'sessions': len(self._sessions),
+            'max_sessions': self.max_sessions,
+            'evicted_idle': self.evicted_idle,
+            'evicted_lru': self.evicted_lru,
+        }
+
+    # ---- Інтерфейс BaseStorage ----
+
+    async def get_state(self, *, chat=None, user=None, default: typing.Optional[str] = None) -> typing.Optional[str]:
+        session = self._session(chat, user)
+        if session is None or session.state is None:
+            return self.resolve_state(default)
+        return session.state
+
+    async def get_data(self, *, chat=None, user=None, default: typing.Optional[dict] = None) -> typing.Dict:
+        session = self._session(chat, user)
+        if session is None or not session.data:
+            return copy.deepcopy(default) if default else {}
+        return copy.deepcopy(session.data)
+
+    async def set_state(self, *, chat=None, user=None, state: typing.AnyStr = None):
+        state = self.resolve_state(state)
+        session = self._session(chat, user, create=state is not None)
+        if session is None:
+            return
+        # Назви станів однакові в тисяч сесій — зберігаємо один екземпляр рядка
+        session.state = sys.intern(state) if state is not None else None
+        self._cleanup(chat, user, session)
+
+    async def set_data(self, *, chat=None, user=None, data: typing.Dict = None):
+        session = self._session(chat, user, create=bool(data))
+        if session is None:
+            return
+        session.data = copy.deepcopy(data) if data else None
+        self._cleanup(chat, user, session)
+
+    async def update_data(self, *, chat=None, user=None, data: typing.Dict = None, **kwargs):
+        if not data and not kwargs:
+            return
+        session = self._session(chat, user, create=True)
+        if session.data is None:
+            session.data = {}
+        session.data.update(data or {}, **kwargs)
+
+    def has_bucket(self):
+        return True
+
+    async def get_bucket(self, *, chat=None, user=None, default: typing.Optional[dict] = None) -> typing.Dict:
+        session = self._session(chat, user)
+        if session is None or not session.bucket:
+            return copy.deepcopy(default) if default else {}
+        return copy.deepcopy(session.bucket)
+
+    async def set_bucket(self, *, chat=None, user=None, bucket: typing.Dict = None):
+        session = self._session(chat, user, create=bool(bucket))
+        if session is None:
+            return
+        session.bucket = copy.deepcopy(bucket) if bucket else None
+        self._cleanup(chat, user, session)
+
+    async def update_bucket(self, *, chat=None, user=None, bucket: typing.Dict = None, **kwargs):
+        if not bucket and not kwargs:
+            return
+        session = self._session(chat, user, create=True)
+        if session.bucket is None:
+            session.bucket = {}
+        session.bucket.update(bucket or {}, **kwargs)
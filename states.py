@@ -5,12 +5,16 @@ class AppStates(StatesGroup):
     MAIN_MENU = State() # Головне меню
     ADD_TYPE = State()
     ADD_CAT = State()
+    ADD_DISTRICT = State()
     ADD_DESC = State()
+    ADD_PHOTO = State() # Необов'язкові фото оголошення
     ADD_CONT = State()
     ADD_CONFIRM = State()
 
     VIEW_CAT = State()
+    VIEW_DISTRICT = State() # Вибір району як фільтра для списку оголошень
     VIEW_LISTING = State() # Цей стан тепер знову для пагінації загальних оголошень
     
     MY_POSTS_VIEW = State()
+    SAVED_VIEW = State() # Перегляд збережених оголошень
     EDIT_DESC = State()
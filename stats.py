@@ -0,0 +1,338 @@
+"""
+Інкрементальні зведення статистики (rollups).
+
+Кожна подія (створення, видалення, закінчення терміну дії оголошення, перша дія
+користувача за день) змінює один невеликий документ-бакет, тож звіт для адміністратора
+читає лише готові бакети і не сканує колекцію `posts`.
+
+    stats_rollups       {_id: "день|категорія|тип", day, category, type, created, deleted, expired,
+                         renewed, renewed_in}
+    stats_daily         {_id: "день", active_users}
+    stats_active_users  {_id: "день|user_id", created_at}  — дедуплікація активних користувачів (TTL)
+
+Оголошення враховане в бакеті дня, від якого рахується його термін дії (`bumped_at`:
+створення або останнє поновлення). Поновлене оголошення переходить з бакета попереднього
+дня (`renewed`) до бакета дня поновлення (`renewed_in`), тож живі оголошення бакета — це
+created + renewed_in - deleted - renewed - expired. `created` завжди рахується за днем
+створення (`created_at` не змінюється при поновленні).
+
+Заповнення бакетів з поточної колекції: python stats.py backfill
+"""
+import asyncio
+import logging
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+from aiogram.dispatcher.middlewares import BaseMiddleware
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_USERS_TTL_SECONDS = 2 * 24 * 60 * 60
+
+def _day(dt: datetime) -> str:
+    return dt.strftime('%Y-%m-%d')
+
+def _live_day(post: dict) -> str:
+    """День бакета, у якому оголошення зараз враховане (від нього рахується термін дії)."""
+    return _day(post.get('bumped_at') or post['created_at'])
+
+def _bucket_id(day: str, category: str, typ: str) -> str:
+    return f"{day}|{category}|{typ}"
+
+async def ensure_stats_indexes(db_obj):
+    """Створює індекси для колекцій статистики."""
+    await db_obj.stats_rollups.create_index("day")
+    await db_obj.stats_active_users.create_index("created_at", expireAfterSeconds=ACTIVE_USERS_TTL_SECONDS)
+
+async def record_post_created(db_obj, post: dict):
+    """Збільшує лічильник створених оголошень у бакеті (день створення, категорія, тип)."""
+    day = _day(post['created_at'])
+    try:
+        await db_obj.stats_rollups.update_one(
+            {'_id': _bucket_id(day, post['category'], post['type'])},
+            {'$inc': {'created': 1}, '$setOnInsert': {'day': day, 'category': post['category'], 'type': post['type']}},
+            upsert=True
+        )
+    except Exception as e:
+        logger.warning("Failed to record created post %s in stats: %s", post.get('id'), e)
+
+async def record_post_deleted(db_obj, post: dict):
+    """Збільшує лічильник видалених оголошень у бакеті, де оголошення зараз враховане."""
+    day = _live_day(post)
+    try:
+        await db_obj.stats_rollups.update_one(
+            {'_id': _bucket_id(day, post['category'], post['type'])},
+            {'$inc': {'deleted': 1}, '$setOnInsert': {'day': day, 'category': post['category'], 'type': post['type']}},
+            upsert=True
+        )
+    except Exception as e:
+        logger.warning("Failed to record deleted post %s in stats: %s", post.get('id'), e)
+
+def _bucket_inc(day: str, category: str, typ: str, field: str, n: int) -> UpdateOne:
+    return UpdateOne(
+        {'_id': _bucket_id(day, category, typ)},
+        {'$inc': {field: n}, '$setOnInsert': {'day': day, 'category': category, 'type': typ}},
+        upsert=True
+    )
+
+async def record_posts_deleted(db_obj, posts: list):
+    """Як record_post_deleted, але для кількох оголошень — одним bulk_write по бакетах."""
+    counts = Counter((_live_day(p), p['category'], p['type']) for p in posts)
+    if not counts:
+        return
+    try:
+        await db_obj.stats_rollups.bulk_write(
+            [_bucket_inc(day, category, typ, 'deleted', n) for (day, category, typ), n in counts.items()],
+            ordered=False
+        )
+    except Exception as e:
+        logger.warning("Failed to record %s deleted posts in stats: %s", len(posts), e)
+
+async def record_posts_renewed(db_obj, posts: list, renewed_at: datetime):
+    """Переносить поновлені оголошення з бакетів попереднього bumped_at до бакетів дня поновлення."""
+    old = Counter((_live_day(p), p['category'], p['type']) for p in posts)
+    new = Counter((_day(renewed_at), p['category'], p['type']) for p in posts)
+    if not old:
+        return
+    requests = [_bucket_inc(day, category, typ, 'renewed', n) for (day, category, typ), n in old.items()]
+    requests += [_bucket_inc(day, category, typ, 'renewed_in', n) for (day, category, typ), n in new.items()]
+    try:
+        await db_obj.stats_rollups.bulk_write(requests, ordered=False)
+    except Exception as e:
+        logger.warning("Failed to record %s renewed posts in stats: %s", len(posts), e)
+
+async def sweep_expired(db_obj, lifetime_days: int) -> int:
+    """
+    Позначає бакети, усі оголошення яких вже видалив TTL-індекс.
+    TTL-видалення не генерує подій, але оголошення дня D гарантовано зникають
+    до D + lifetime + 1 день, тож залишок (created - deleted) стає `expired` одним оновленням.
+    """
+    cutoff = _day(datetime.utcnow() - timedelta(days=lifetime_days + 1))
+    result = await db_obj.stats_rollups.update_many(
+        {'day': {'$lte': cutoff}, 'expired': {'$exists': False}},
+        [{'$set': {'expired': {'$subtract': [
+            {'$add': [{'$ifNull': ['$created', 0]}, {'$ifNull': ['$renewed_in', 0]}]},
+            {'$add': [{'$ifNull': ['$deleted', 0]}, {'$ifNull': ['$renewed', 0]}]},
+        ]}}}]
+    )
+    return result.modified_count
+
+async def run_expiry_sweep(db_obj, lifetime_days: int, interval_seconds: int = 3600):
+    """Періодично переносить прострочені оголошення у лічильник `expired`."""
+    while True:
+        try:
+            swept = await sweep_expired(db_obj, lifetime_days)
+            if swept:
+                logger.info("Stats: позначено %s прострочених бакетів.", swept)
+        except Exception as e:
+            logger.warning("Stats expiry sweep failed: %s", e)
+        await asyncio.sleep(interval_seconds)
+
+
+class ActivityTracker:
+    """
+    Рахує унікальних активних користувачів за день. Перша дія користувача за день лише
+    додається до черги в пам'яті; фонова задача записує чергу пачками (один bulk_write
+    upsert-ів у stats_active_users і один `$inc` на день у stats_daily), тож обробка
+    оновлення ніколи не чекає на MongoDB.
+    """
+
+    def __init__(self, max_pending: int = 10000):
+        self.max_pending = max_pending
+        self._day = None
+        self._seen = set()
+        self._pending = set()          # (день, user_id), ще не записані
+        self._daily_pending = Counter()  # день -> нові активні користувачі, ще не додані до stats_daily
+        self._flush_requested = asyncio.Event()
+
+    def touch(self, user_id: int):
+        now = datetime.utcnow()
+        day = _day(now)
+        if day != self._day:
+            self._day = day
+            self._seen = set()
+        if user_id in self._seen:
+            return
+        self._seen.add(user_id)
+        self._pending.add((day, user_id))
+        if len(self._pending) >= self.max_pending:
+            self._flush_requested.set()
+
+    def _count_new(self, batch: list, indexes):
+        for index in indexes:
+            self._daily_pending[batch[index][0]] += 1
+
+    async def flush(self, db_obj) -> int:
+        """Записує чергу; у разі помилки повертає незаписане до черги. Повертає кількість нових користувачів."""
+        if self._pending:
+            batch, self._pending = list(self._pending), set()
+            now = datetime.utcnow()
+            try:
+                result = await db_obj.stats_active_users.bulk_write(
+                    [UpdateOne({'_id': f"{day}|{user_id}"}, {'$setOnInsert': {'created_at': now}}, upsert=True)
+                     for day, user_id in batch],
+                    ordered=False
+                )
+            except BulkWriteError as e:
+                # Вставлені записи враховуємо одразу; повтор решти безпечний — upsert ідемпотентний
+                self._count_new(batch, [u['index'] for u in e.details.get('upserted', [])])
+                self._pending.update(batch)
+                raise
+            except BaseException:
+                self._pending.update(batch)
+                raise
+            # Інший процес міг уже врахувати користувача сьогодні — рахуємо лише власні вставки
+            self._count_new(batch, result.upserted_ids.keys())
+
+        if not self._daily_pending:
+            return 0
+        daily, self._daily_pending = self._daily_pending, Counter()
+        try:
+            await db_obj.stats_daily.bulk_write(
+                [UpdateOne({'_id': day}, {'$inc': {'active_users': n}}, upsert=True) for day, n in daily.items()],
+                ordered=False
+            )
+        except BaseException:
+            self._daily_pending.update(daily)
+            raise
+        return sum(daily.values())
+
+    async def run(self, db_obj, interval_seconds: float, breaker=None, timeout: float = None):
+        """
+        Фонова задача: записує чергу раз на інтервал або раніше, якщо черга переповнена.
+        З `breaker` запис іде через CircuitBreaker з дедлайном `timeout`: під час збою бази
+        черга лише накопичується (користувачі дня вже в `_seen`, тож не дублюються).
+        """
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), timeout=interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            try:
+                if breaker is None:
+                    await self.flush(db_obj)
+                else:
+                    await breaker.call(lambda: self.flush(db_obj), timeout)
+            except Exception as e:
+                logger.warning("Failed to record active users in stats (%s pending): %s", len(self._pending), e)
+
+
+class StatsMiddleware(BaseMiddleware):
+    """Відмічає користувача активним при першому повідомленні, натисканні кнопки або inline-запиті за день."""
+
+    def __init__(self, tracker: ActivityTracker):
+        super().__init__()
+        self._tracker = tracker
+
+    def _touch(self, user):
+        if user:
+            self._tracker.touch(user.id)
+
+    async def on_pre_process_message(self, message, data):
+        self._touch(message.from_user)
+
+    async def on_pre_process_callback_query(self, call, data):
+        self._touch(call.from_user)
+
+    async def on_pre_process_inline_query(self, query, data):
+        self._touch(query.from_user)
+
+
+async def read_report(db_obj, days: int, lifetime_days: int) -> dict:
+    """
+    Збирає звіт з готових бакетів за останні `days` днів (і за весь термін життя
+    оголошень — для кількості живих оголошень). Вартість пропорційна кількості бакетів.
+    """
+    now = datetime.utcnow()
+    since = _day(now - timedelta(days=days - 1))
+    live_since = _day(now - timedelta(days=lifetime_days))
+    first_day = min(since, live_since)
+
+    per_day = defaultdict(int)
+    per_category = defaultdict(int)
+    per_type = defaultdict(int)
+    live_posts = 0
+    deleted = 0
+    renewed = 0
+
+    async for bucket in db_obj.stats_rollups.find({'day': {'$gte': first_day}}):
+        created = bucket.get('created', 0)
+        if bucket['day'] >= live_since:
+            live_posts += (created + bucket.get('renewed_in', 0)
+                           - bucket.get('deleted', 0) - bucket.get('renewed', 0) - bucket.get('expired', 0))
+        if bucket['day'] >= since:
+            per_day[bucket['day']] += created
+            per_category[bucket['category']] += created
+            per_type[bucket['type']] += created
+            deleted += bucket.get('deleted', 0)
+            renewed += bucket.get('renewed_in', 0)
+
+    active_users = {}
+    async for daily in db_obj.stats_daily.find({'_id': {'$gte': since}}):
+        active_users[daily['_id']] = daily.get('active_users', 0)
+
+    return {
+        'days': days,
+        'since': since,
+        'live_posts': max(live_posts, 0),
+        'created': sum(per_day.values()),
+        'deleted': deleted,
+        'renewed': renewed,
+        'created_per_day': dict(sorted(per_day.items())),
+        'created_per_category': dict(sorted(per_category.items(), key=lambda kv: -kv[1])),
+        'created_per_type': dict(per_type),
+        'active_users_per_day': dict(sorted(active_users.items())),
+    }
+
+async def backfill_rollups(db_obj, batch_size: int = 1000) -> int:
+    """
+    Будує бакети з поточної колекції `posts` одним потоковим проходом.
+    `created` рахується за днем створення, як і в record_post_created: поновлення вже
+    враховані парами renewed/renewed_in, тож поновлене оголошення не рахується двічі.
+    `$max` не зменшує лічильники, які вже накопичились з інкрементальних подій.
+    Повертає кількість оброблених оголошень.
+    """
+    counts = defaultdict(int)
+    processed = 0
+    async for post in db_obj.posts.find({}, projection={'_id': 0, 'category': 1, 'type': 1, 'created_at': 1}, batch_size=batch_size):
+        counts[(_day(post['created_at']), post['category'], post['type'])] += 1
+        processed += 1
+
+    requests = [
+        UpdateOne(
+            {'_id': _bucket_id(day, category, typ)},
+            {'$max': {'created': n}, '$setOnInsert': {'day': day, 'category': category, 'type': typ}},
+            upsert=True
+        )
+        for (day, category, typ), n in counts.items()
+    ]
+    for i in range(0, len(requests), batch_size):
+        await db_obj.stats_rollups.bulk_write(requests[i:i + batch_size], ordered=False)
+    logger.info("Stats backfill: оброблено %s оголошень у %s бакетах.", processed, len(requests))
+    return processed
+
+
+if __name__ == '__main__':
+    import sys
+    import motor.motor_asyncio
+    from config import MONGO_DB_URL, MONGO_DB_NAME
+
+    if sys.argv[1:] != ['backfill']:
+        print("Використання: python stats.py backfill")
+        sys.exit(1)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    async def _backfill():
+        client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_DB_URL)
+        try:
+            db_obj = client[MONGO_DB_NAME]
+            await ensure_stats_indexes(db_obj)
+            await backfill_rollups(db_obj)
+        finally:
+            client.close()
+
+    asyncio.run(_backfill())
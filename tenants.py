@@ -0,0 +1,190 @@
+"""
+Кілька ботів (міст) в одному процесі.
+
+Кожен орендар (tenant) має власний токен, шлях вебхука, базу даних, список категорій
+і районів, FSM-сховище та стан у пам'яті (inline-індекс, лічильники переглядів,
+кеш сторінок). Клієнт MongoDB, aiohttp-застосунок і event loop спільні.
+
+Обробники реєструються декораторами на першому диспетчері (RecordingDispatcher),
+який запам'ятовує реєстрації і відтворює їх на диспетчерах решти орендарів.
+Поточний орендар оновлення встановлюється TenantMiddleware, тож обробники звертаються
+до `db`, `post_index` тощо через TenantAttribute без явної передачі орендаря.
+
+Конфігурація — JSON-файл TENANTS_FILE зі списком об'єктів:
+
+    [{"name": "kropyvnytskyi", "token": "...", "webhook_path": "/webhook/kr",
+      "db_name": "cropservice_db", "categories": [["🏗️ Будівництво", "Будівництво"], ...],
+      "districts": [["📍 Центр", "Центр"], ...]}]
+
+Без файлу працює один орендар `default` зі змінних середовища (API_TOKEN, WEBHOOK_PATH, ...).
+"""
+import json
+import logging
+from datetime import timedelta
+
+from aiogram import Bot, Dispatcher
+from aiogram.dispatcher.middlewares import BaseMiddleware
+from aiogram.utils.mixins import ContextInstanceMixin
+
+from config import (API_TOKEN, WEBHOOK_PATH, MONGO_DB_NAME, CATEGORIES, DISTRICTS,
+                    POST_LIFETIME_DAYS, PREFETCH_TTL_SECONDS, VIEW_COUNTS_TTL_SECONDS, VIEW_DEDUP_WINDOW_SECONDS,
+                    SESSION_IDLE_TIMEOUT_SECONDS, SESSION_MAX)
+from post_index import PostIndex
+from prefetch import ListingCounts, PagePrefetcher
+from session_storage import SessionStorage
+from stats import ActivityTracker
+from view_counter import ViewCounter
+from webhook_reply import ReplyingWebhookHandler
+
+logger = logging.getLogger(__name__)
+
+TENANT_BY_PATH_KEY = 'TENANT_BY_PATH'
+
+
+class Tenant(ContextInstanceMixin):
+    """Налаштування та стан одного бота (міста)."""
+
+    def __init__(self, name: str, token: str, webhook_path: str, db_name: str,
+                 categories: list = None, districts: list = None):
+        self.name = name
+        self.token = token
+        self.webhook_path = webhook_path
+        self.db_name = db_name
+        self.categories = [tuple(c) for c in (categories or CATEGORIES)]
+        self.districts = [tuple(d) for d in (districts or DISTRICTS)]
+
+        self.bot = None
+        self.dp = None
+        self.db = None
+        # Колекція оголошень для читання списків (з налаштованим read preference)
+        self.posts_listing = None
+
+        # Час останнього запису кожного користувача для read-your-writes
+        self.recent_writes = {}
+        # Індекс живих оголошень у пам'яті для inline-пошуку
+        self.post_index = PostIndex(lifetime=timedelta(days=POST_LIFETIME_DAYS))
+        # Перегляди оголошень накопичуються в пам'яті і записуються пачками
+        self.view_counter = ViewCounter(dedup_window=VIEW_DEDUP_WINDOW_SECONDS)
+        # Активні користувачі дня накопичуються в пам'яті і записуються пачками
+        self.activity = ActivityTracker()
+        # Сусідні сторінки списків, побудовані заздалегідь
+        self.page_prefetcher = PagePrefetcher(ttl_seconds=PREFETCH_TTL_SECONDS)
+        # Кількості оголошень списків перегляду (спільні для користувачів)
+        self.view_counts = ListingCounts(ttl_seconds=VIEW_COUNTS_TTL_SECONDS)
+        # FSM-сесії користувачів (сховище диспетчера)
+        self.sessions = SessionStorage(idle_timeout=SESSION_IDLE_TIMEOUT_SECONDS, max_sessions=SESSION_MAX)
+
+    def __repr__(self):
+        return f"<Tenant {self.name}>"
+
+
+def load_tenants(path: str = '') -> list:
+    """Читає список орендарів з JSON-файлу або створює одного орендаря зі змінних середовища."""
+    if not path:
+        return [Tenant('default', API_TOKEN, WEBHOOK_PATH, MONGO_DB_NAME)]
+
+    with open(path, encoding='utf-8') as f:
+        entries = json.load(f)
+
+    tenants = [
+        Tenant(e['name'], e['token'], e['webhook_path'], e['db_name'], e.get('categories'), e.get('districts'))
+        for e in entries
+    ]
+    if not tenants:
+        raise ValueError(f"{path}: список орендарів порожній")
+    for attr in ('name', 'webhook_path', 'token'):
+        values = [getattr(t, attr) for t in tenants]
+        if len(set(values)) != len(values):
+            raise ValueError(f"{path}: значення '{attr}' орендарів мають бути унікальними")
+    return tenants
+
+
+def bind_tenant(func):
+    """
+    Прив'язує функцію-корутину до поточного орендаря — для фонових задач,
+    що запускаються в порожньому контексті.
+    """
+    tenant = Tenant.get_current()
+
+    async def wrapper(*args, **kwargs):
+        Tenant.set_current(tenant)
+        return await func(*args, **kwargs)
+    return wrapper
+
+
+class TenantAttribute:
+    """
+    Посилання на атрибут поточного орендаря:
+    `db.posts` у обробнику означає `Tenant.get_current().db.posts`.
+    """
+    __slots__ = ('_name',)
+
+    def __init__(self, name: str):
+        self._name = name
+
+    def _resolve(self):
+        tenant = Tenant.get_current()
+        if tenant is None:
+            raise RuntimeError(f"'{self._name}' використано поза контекстом орендаря")
+        return getattr(tenant, self._name)
+
+    def __getattr__(self, item):
+        return getattr(self._resolve(), item)
+
+    def __repr__(self):
+        return f"<TenantAttribute {self._name}>"
+
+
+class TenantMiddleware(BaseMiddleware):
+    """Робить орендаря диспетчера поточним для всього оновлення (перша middleware диспетчера)."""
+
+    def __init__(self, tenant: Tenant):
+        super().__init__()
+        self.tenant = tenant
+
+    async def on_pre_process_update(self, update, data):
+        Tenant.set_current(self.tenant)
+
+
+class RecordingDispatcher(Dispatcher):
+    """
+    Диспетчер, що запам'ятовує реєстрації обробників, щоб відтворити їх на диспетчерах
+    інших орендарів. Скопіювати вже зареєстровані обробники не можна: фільтри
+    (зокрема фільтр стану) прив'язані до свого диспетчера.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.registrations = []
+
+    def _record(self, method: str, args: tuple, kwargs: dict):
+        self.registrations.append((method, args, kwargs))
+        return getattr(super(), method)(*args, **kwargs)
+
+    def register_message_handler(self, *args, **kwargs):
+        return self._record('register_message_handler', args, kwargs)
+
+    def register_callback_query_handler(self, *args, **kwargs):
+        return self._record('register_callback_query_handler', args, kwargs)
+
+    def register_inline_handler(self, *args, **kwargs):
+        return self._record('register_inline_handler', args, kwargs)
+
+    def register_errors_handler(self, *args, **kwargs):
+        return self._record('register_errors_handler', args, kwargs)
+
+    def replay_handlers(self, target: Dispatcher):
+        """Реєструє на `target` ті самі обробники в тому ж порядку."""
+        for method, args, kwargs in self.registrations:
+            getattr(target, method)(*args, **kwargs)
+
+
+class TenantWebhookHandler(ReplyingWebhookHandler):
+    """Обробник вебхука, що обирає диспетчер орендаря за шляхом запиту."""
+
+    def get_dispatcher(self):
+        tenant = self.request.app[TENANT_BY_PATH_KEY][self.request.match_info.route.resource.canonical]
+        Tenant.set_current(tenant)
+        Dispatcher.set_current(tenant.dp)
+        Bot.set_current(tenant.bot)
+        return tenant.dp
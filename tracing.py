@@ -0,0 +1,326 @@
+"""
+Трасування оновлень.
+
+Для кожного оновлення диспетчер відкриває кореневий span, а виклики FSM-сховища,
+команди MongoDB та запити до Bot API стають його дочірніми span-ами. Рішення, чи
+зберігати трасу, приймається після завершення оновлення (tail-based sampling):
+експортуються лише повільні або невдалі траси (плюс необов'язкова випадкова частка
+решти) у JSONL-файл у форматі OTLP/JSON та, за потреби, на OTLP/HTTP-колектор.
+"""
+import asyncio
+import json
+import logging
+import random
+import time
+from collections import deque
+from contextvars import ContextVar
+
+import aiohttp
+from aiogram import Bot
+from aiogram.dispatcher.handler import current_handler
+from aiogram.dispatcher.middlewares import BaseMiddleware
+from aiogram.dispatcher.storage import BaseStorage
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+# Захист від необмеженого росту траси (наприклад, при циклі запитів у обробнику)
+MAX_SPANS_PER_TRACE = 256
+
+_current_span = ContextVar('trace_current_span', default=None)
+
+
+class Trace:
+    __slots__ = ('trace_id', 'spans', 'error')
+
+    def __init__(self):
+        self.trace_id = f"{random.getrandbits(128):032x}"
+        self.spans = []
+        self.error = False
+
+    def new_span(self, name: str, parent_id, attributes: dict = None):
+        if len(self.spans) >= MAX_SPANS_PER_TRACE:
+            return None
+        span_obj = Span(self, name, parent_id, attributes)
+        self.spans.append(span_obj)
+        return span_obj
+
+    @property
+    def root(self):
+        return self.spans[0]
+
+
+class Span:
+    __slots__ = ('trace', 'span_id', 'parent_id', 'name', 'start_ns', 'end_ns', 'attributes', 'error')
+
+    def __init__(self, trace: Trace, name: str, parent_id, attributes: dict = None):
+        self.trace = trace
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes or {}
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+
+    def end(self, error=None):
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.error = str(error) or type(error).__name__
+            self.trace.error = True
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+
+class span:
+    """
+    Контекстний менеджер дочірнього span-а поточної траси.
+    Поза трасованим оновленням нічого не робить.
+    """
+    __slots__ = ('_name', '_attributes', '_span', '_token')
+
+    def __init__(self, name: str, attributes: dict = None):
+        self._name = name
+        self._attributes = attributes
+        self._span = None
+        self._token = None
+
+    def __enter__(self):
+        parent = _current_span.get()
+        if parent is not None:
+            self._span = parent.trace.new_span(self._name, parent.span_id, self._attributes)
+            if self._span is not None:
+                self._token = _current_span.set(self._span)
+        return self._span
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._span is not None:
+            self._span.end(exc)
+            _current_span.reset(self._token)
+        return False
+
+
+# ======== Експорт ========
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+def _otlp_span(span_obj: Span) -> dict:
+    return {
+        'traceId': span_obj.trace.trace_id,
+        'spanId': span_obj.span_id,
+        'parentSpanId': span_obj.parent_id or '',
+        'name': span_obj.name,
+        'kind': 2 if span_obj.parent_id is None else 3,  # SERVER для кореня, CLIENT для викликів
+        'startTimeUnixNano': str(span_obj.start_ns),
+        'endTimeUnixNano': str(span_obj.end_ns or span_obj.start_ns),
+        'attributes': [{'key': k, 'value': _otlp_value(v)} for k, v in span_obj.attributes.items()],
+        'status': {'code': 2, 'message': span_obj.error} if span_obj.error else {'code': 1},
+    }
+
+
+class TailSamplingExporter:
+    """
+    Приймає завершені траси та зберігає лише повільні (коренева тривалість >= slow_ms),
+    невдалі, або випадкову частку `sample_rate` решти. Запис у файл і відправка на колектор
+    виконуються пачками у фоновій задачі.
+    """
+
+    def __init__(self, path: str, otlp_url: str = '', slow_ms: float = 300, sample_rate: float = 0.0,
+                 service_name: str = 'kropservice-bot', max_pending: int = 1000):
+        self.path = path
+        self.otlp_url = otlp_url
+        self.slow_ms = slow_ms
+        self.sample_rate = sample_rate
+        self.service_name = service_name
+        self._pending = deque(maxlen=max_pending)
+        self._session = None
+        self.kept = 0
+        self.dropped = 0
+
+    def offer(self, trace: Trace):
+        if trace.error or trace.root.duration_ms >= self.slow_ms or random.random() < self.sample_rate:
+            self._pending.append(trace)
+            self.kept += 1
+        else:
+            self.dropped += 1
+
+    def _payload(self, traces: list) -> dict:
+        return {'resourceSpans': [{
+            'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': self.service_name}}]},
+            'scopeSpans': [{
+                'scope': {'name': 'kropservice.tracing'},
+                'spans': [_otlp_span(s) for trace in traces for s in list(trace.spans)],
+            }],
+        }]}
+
+    def _write_file(self, line: str):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+
+    async def flush(self):
+        if not self._pending:
+            return
+        traces = []
+        while self._pending:
+            traces.append(self._pending.popleft())
+        payload = self._payload(traces)
+
+        if self.path:
+            line = json.dumps(payload, ensure_ascii=False)
+            await asyncio.get_running_loop().run_in_executor(None, self._write_file, line)
+        if self.otlp_url:
+            if self._session is None:
+                self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=5))
+            try:
+                async with self._session.post(self.otlp_url, json=payload) as resp:
+                    if resp.status >= 400:
+                        logger.warning("OTLP collector responded with HTTP %s", resp.status)
+            except Exception as e:
+                logger.warning("Failed to export traces to %s: %s", self.otlp_url, e)
+
+    async def run(self, interval_seconds: float = 1.0):
+        """Фонова задача: періодично експортує накопичені траси."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning("Trace export failed: %s", e)
+
+    async def close(self):
+        await self.flush()
+        if self._session is not None:
+            await self._session.close()
+
+
+# ======== Інструментування ========
+class TracingMiddleware(BaseMiddleware):
+    """Відкриває кореневий span на кожне оновлення і передає завершену трасу експортеру."""
+
+    def __init__(self, exporter: TailSamplingExporter):
+        super().__init__()
+        self.exporter = exporter
+
+    async def on_pre_process_update(self, update, data):
+        trace = Trace()
+        root = trace.new_span('update', None, {'update_id': update.update_id})
+        data['_trace_token'] = _current_span.set(root)
+
+    @staticmethod
+    def _name_root(kind: str, **attributes):
+        root = _current_span.get()
+        if root is not None:
+            handler_name = getattr(current_handler.get(None), '__name__', 'unknown')
+            root.name = f"{kind} {handler_name}"
+            root.attributes['handler'] = handler_name
+            root.attributes.update(attributes)
+
+    async def on_process_message(self, message, data):
+        self._name_root('message', chat_id=message.chat.id)
+
+    async def on_process_callback_query(self, call, data):
+        self._name_root('callback_query', chat_id=call.from_user.id, callback_data=call.data)
+
+    async def on_process_inline_query(self, query, data):
+        self._name_root('inline_query', chat_id=query.from_user.id)
+
+    async def on_pre_process_error(self, update, exception, data):
+        current = _current_span.get()
+        if current is not None:
+            current.trace.root.error = str(exception) or type(exception).__name__
+            current.trace.error = True
+
+    async def on_post_process_update(self, update, results, data):
+        token = data.pop('_trace_token', None)
+        if token is None:
+            return
+        root = _current_span.get()
+        _current_span.reset(token)
+        if root is not None:
+            root.end()
+            self.exporter.offer(root.trace)
+
+
+class MongoCommandTracer(monitoring.CommandListener):
+    """
+    Створює span на кожну команду MongoDB. Motor виконує команди в пулі потоків,
+    але копіює туди contextvars, тож батьківський span визначається правильно.
+    """
+
+    def __init__(self):
+        self._spans = {}
+
+    def started(self, event):
+        parent = _current_span.get()
+        if parent is None:
+            return
+        collection = event.command.get(event.command_name)
+        attributes = {'db.system': 'mongodb', 'db.name': event.database_name, 'db.operation': event.command_name}
+        if isinstance(collection, str):
+            attributes['db.collection'] = collection
+        span_obj = parent.trace.new_span(f"mongo.{event.command_name}", parent.span_id, attributes)
+        if span_obj is not None:
+            self._spans[(event.request_id, event.connection_id)] = span_obj
+
+    def succeeded(self, event):
+        span_obj = self._spans.pop((event.request_id, event.connection_id), None)
+        if span_obj is not None:
+            span_obj.end()
+
+    def failed(self, event):
+        span_obj = self._spans.pop((event.request_id, event.connection_id), None)
+        if span_obj is not None:
+            span_obj.end(event.failure)
+
+
+class TracedBot(Bot):
+    """Bot, у якого кожен виклик Bot API стає span-ом поточної траси."""
+
+    async def request(self, method, data=None, files=None, **kwargs):
+        with span(f"telegram.{method}", {'telegram.method': method}):
+            return await super().request(method, data, files, **kwargs)
+
+
+def _traced_storage_method(name: str):
+    async def method(self, **kwargs):
+        with span(f"fsm.{name}"):
+            return await getattr(self.storage, name)(**kwargs)
+    method.__name__ = name
+    return method
+
+
+class TracedStorage(BaseStorage):
+    """Обгортка FSM-сховища, що створює span на кожне звернення до стану."""
+
+    def __init__(self, storage: BaseStorage):
+        self.storage = storage
+
+    async def close(self):
+        await self.storage.close()
+
+    async def wait_closed(self):
+        await self.storage.wait_closed()
+
+    def has_bucket(self):
+        return self.storage.has_bucket()
+
+    get_state = _traced_storage_method('get_state')
+    get_data = _traced_storage_method('get_data')
+    set_state = _traced_storage_method('set_state')
+    set_data = _traced_storage_method('set_data')
+    update_data = _traced_storage_method('update_data')
+    reset_data = _traced_storage_method('reset_data')
+    reset_state = _traced_storage_method('reset_state')
+    finish = _traced_storage_method('finish')
+    get_bucket = _traced_storage_method('get_bucket')
+    set_bucket = _traced_storage_method('set_bucket')
+    update_bucket = _traced_storage_method('update_bucket')
+    reset_bucket = _traced_storage_method('reset_bucket')
@@ -7,6 +7,9 @@ from aiogram import Bot # Імпортуємо Bot для типізації
 import motor.motor_asyncio
 from pymongo import ReturnDocument
 import logging # ДОДАНО: Імпорт модуля logging
+from config import TYPE_EMOJIS
+
+logger = logging.getLogger(__name__)
 
 # Регулярний вираз для перевірки номера телефону (приклад: +380XXXXXXXXX)
 # Це вже використовується в main.py, але залишено тут як приклад, якщо потрібно буде знову
@@ -27,6 +30,53 @@ def escape_markdown_v2(text: str) -> str:
     # Використовуємо re.sub для більш ефективного екранування
     return re.sub(f'([{re.escape(special_chars)}])', r'\\\1', text)
 
+def format_post_card(post: dict) -> str:
+    """
+    Формує блок тексту одного оголошення (MarkdownV2) — такий самий,
+    як у списках оголошень та в результатах inline-пошуку.
+    """
+    type_emoji = TYPE_EMOJIS.get(post['type'], '')
+
+    card = (f"ID: {escape_markdown_v2(post['id'])}\n"
+            f"{escape_markdown_v2(type_emoji)} **{escape_markdown_v2(post['type'].capitalize())}**\n"
+            f"🔹 {escape_markdown_v2(post['description'])}\n")
+
+    if post.get('district'):
+        card += f"📍 Район: {escape_markdown_v2(post['district'])}\n"
+
+    username = post.get('username')
+    if username:
+        if username.isdigit():
+            card += f"👤 Автор: \\_Приватний користувач\\_\n"
+        else:
+            card += f"👤 Автор: \\@{escape_markdown_v2(username)}\n"
+
+    contact_info = post.get('contacts', '')
+    if contact_info:
+        card += f"📞 Контакт: {escape_markdown_v2(contact_info)}\n"
+
+    if post.get('photos'):
+        card += f"📷 Фото: {escape_markdown_v2(len(post['photos']))}\n"
+    return card
+
+# Максимальна довжина підпису до фото в Telegram
+CAPTION_LIMIT = 1024
+
+def photo_record(sizes: list) -> dict:
+    """
+    Запис фото для оголошення з розмірів, які Telegram повернув у повідомленні користувача.
+    Зберігаємо лише file_id найбільшого розміру: надсилання за ним не завантажує файл
+    повторно, а решту розмірів Telegram віддає клієнтам сам.
+    """
+    largest = max(sizes, key=lambda s: s.width * s.height)
+    return {'file_id': largest.file_id, 'unique_id': largest.file_unique_id,
+            'width': largest.width, 'height': largest.height}
+
+def photo_caption(post: dict):
+    """Картка оголошення як підпис до фото або None, якщо вона задовга для підпису."""
+    card = format_post_card(post)
+    return card if len(card) <= CAPTION_LIMIT else None
+
 async def update_or_send_interface_message(bot_obj: Bot, chat_id: int, state: FSMContext, text: str, reply_markup=None, parse_mode='HTML', disable_web_page_preview: bool = False):
     """
     Редагує останнє повідомлення бота, якщо можливо, або надсилає нове.
@@ -36,7 +86,7 @@ async def update_or_send_interface_message(bot_obj: Bot, chat_id: int, state: FS
     last_bot_message_id = data.get('last_bot_message_id')
     
     # Логування для налагодження
-    logging.info(f"Attempting to update/send message for user {chat_id}. Last message ID: {last_bot_message_id}")
+    logger.info("Attempting to update/send message for user %s. Last message ID: %s", chat_id, last_bot_message_id)
 
     try:
         if last_bot_message_id:
@@ -64,10 +114,10 @@ async def update_or_send_interface_message(bot_obj: Bot, chat_id: int, state: FS
         await state.update_data(last_bot_message_id=message.message_id)
 
     except MessageNotModified:
-        logging.info(f"Message for user {chat_id} was not modified. Skipping update.")
+        logger.info("Message for user %s was not modified. Skipping update.", chat_id)
         pass # Нічого не робимо, якщо повідомлення не змінилося
     except MessageToDeleteNotFound:
-        logging.warning(f"Message to delete not found for user {chat_id}. Sending new message.")
+        logger.warning("Message to delete not found for user %s. Sending new message.", chat_id)
         message = await bot_obj.send_message( # Використовуємо переданий bot_obj
             chat_id=chat_id,
             text=text,
@@ -78,7 +128,7 @@ async def update_or_send_interface_message(bot_obj: Bot, chat_id: int, state: FS
         await state.update_data(last_bot_message_id=message.message_id)
     except BadRequest as e:
         # Обробка інших BadRequest помилок, наприклад, "Message can't be edited"
-        logging.error(f"BadRequest when updating message for user {chat_id}: {e}")
+        logger.error("BadRequest when updating message for user %s: %s", chat_id, e)
         message = await bot_obj.send_message( # Використовуємо переданий bot_obj
             chat_id=chat_id,
             text=text,
@@ -88,7 +138,7 @@ async def update_or_send_interface_message(bot_obj: Bot, chat_id: int, state: FS
         )
         await state.update_data(last_bot_message_id=message.message_id)
     except Exception as e:
-        logging.critical(f"Unexpected error in update_or_send_interface_message for user {chat_id}: {e}", exc_info=True)
+        logger.critical("Unexpected error in update_or_send_interface_message for user %s: %s", chat_id, e, exc_info=True)
         # У випадку будь-якої іншої непередбаченої помилки, спробуйте надіслати нове повідомлення як останній варіант
         message = await bot_obj.send_message( # Використовуємо переданий bot_obj
             chat_id=chat_id,
@@ -101,7 +151,7 @@ async def update_or_send_interface_message(bot_obj: Bot, chat_id: int, state: FS
         # logging.info(f"Sent new interface message (after unexpected error) for user {chat_id}. Message ID: {new_msg.message_id}")
 
 def can_edit(post: dict) -> bool:
-    """Перевіряє, чи можна редагувати оголошення (протягом 15 хвилин після створення)."""
+    """Перевіряє, чи можна редагувати оголошення (протягом 15 хвилин після створення; поновлення не рахується)."""
     # MongoDB зберігає datetime об'єкти, тому прямо порівнюємо
     return datetime.utcnow() - post['created_at'] < timedelta(minutes=15)
 
@@ -0,0 +1,93 @@
+"""
+Лічильники переглядів оголошень.
+
+Перегляди накопичуються в пам'яті (ID оголошення -> кількість) і періодично
+записуються в MongoDB одним невпорядкованим bulk_write з `$inc` на кожне оголошення,
+тож рендер сторінки списку не додає жодного запису. При аварійному завершенні
+втрачаються щонайбільше перегляди за останній інтервал скидання.
+
+Повторні покази того самого оголошення тому самому користувачу (перемикання фільтрів,
+повернення на сторінку, перемальовування після видалення) рахуються одним переглядом
+протягом вікна dedup_window.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+
+class ViewCounter:
+    def __init__(self, max_pending: int = 10000, dedup_window: float = 3600, max_seen: int = 200000):
+        self.max_pending = max_pending
+        self.dedup_window = dedup_window
+        self.max_seen = max_seen
+        self._pending = {}
+        self._seen = OrderedDict()  # (viewer_id, ID оголошення) -> час врахованого перегляду, від найстаріших
+        self._flush_requested = asyncio.Event()
+        self.flushed = 0
+
+    def record(self, posts: list, viewer_id: int):
+        """Рахує перегляд кожного оголошення сторінки (крім власних оголошень автора і повторних у межах вікна)."""
+        now = time.monotonic()
+        self._forget_seen(now)
+        for post in posts:
+            if post.get('user_id') == viewer_id:
+                continue
+            pid = post['id']
+            key = (viewer_id, pid)
+            if key in self._seen:
+                continue
+            self._seen[key] = now
+            self._pending[pid] = self._pending.get(pid, 0) + 1
+        while len(self._seen) > self.max_seen:
+            self._seen.popitem(last=False)
+        if len(self._pending) >= self.max_pending:
+            self._flush_requested.set()
+
+    def _forget_seen(self, now: float):
+        deadline = now - self.dedup_window
+        while self._seen:
+            key, seen_at = next(iter(self._seen.items()))
+            if seen_at > deadline:
+                break
+            del self._seen[key]
+
+    def pending(self, pid: int) -> int:
+        """Ще не записані перегляди оголошення."""
+        return self._pending.get(pid, 0)
+
+    async def flush(self, db_obj) -> int:
+        """Записує накопичені перегляди; у разі помилки повертає їх до черги."""
+        if not self._pending:
+            return 0
+        batch, self._pending = self._pending, {}
+        try:
+            await db_obj.posts.bulk_write(
+                [UpdateOne({'id': pid}, {'$inc': {'views': n}}) for pid, n in batch.items()],
+                ordered=False
+            )
+        except Exception:
+            for pid, n in batch.items():
+                self._pending[pid] = self._pending.get(pid, 0) + n
+            raise
+        self.flushed += len(batch)
+        return len(batch)
+
+    async def run(self, db_obj, interval_seconds: float):
+        """Фонова задача: скидає перегляди раз на інтервал або раніше, якщо черга переповнена."""
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), timeout=interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            try:
+                written = await self.flush(db_obj)
+                if written:
+                    logger.debug("Views: записано лічильники %s оголошень.", written)
+            except Exception as e:
+                logger.warning("Failed to flush view counters (%s posts pending): %s", len(self._pending), e)
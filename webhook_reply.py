@@ -0,0 +1,105 @@
+"""
+Відповідь на callback-запити у відповіді на сам вебхук.
+
+Telegram дозволяє у HTTP-відповіді на оновлення вебхука передати один виклик Bot API.
+Обробники відповідають на callback через `answer_callback(call)`. Відкладена відповідь
+доходить до Telegram лише разом із відповіддю на вебхук, тобто після завершення
+обробника, і весь цей час у користувача крутиться індикатор на кнопці. Тому
+відкладається лише остання дія обробника — `answer_callback(call, ..., final=True)`,
+після якої він уже нічого не чекає (ні MongoDB, ні Bot API): така відповідь не
+надсилається окремим запитом, а повертається у відповіді на вебхук — мінус один
+вихідний запит. Без `final`, поза вебхуком (long polling, навантажувальний тест)
+або якщо слот уже зайнято, `answer_callback` одразу викликає `call.answer()`.
+
+Кожен шлях обробника має відповідати на callback рівно один раз.
+
+Результат виклику з відповіді вебхука недоступний, тому так передається лише
+answerCallbackQuery, результат якого обробникам не потрібен.
+
+Тіло вебхука розбирається і відповідь серіалізується через orjson (якщо встановлений).
+"""
+import asyncio
+import logging
+from contextvars import ContextVar
+
+from aiohttp import web
+from aiogram import types
+from aiogram.dispatcher.webhook import WebhookRequestHandler, AnswerCallbackQuery
+
+try:
+    import orjson
+
+    json_loads = orjson.loads
+
+    def json_dumps(data) -> bytes:
+        return orjson.dumps(data)
+except ImportError:
+    import json
+
+    json_loads = json.loads
+
+    def json_dumps(data) -> bytes:
+        return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+logger = logging.getLogger(__name__)
+
+# Слот відповіді поточного оновлення: {'response': BaseResponse або None, 'closed': bool}
+_reply_slot = ContextVar('webhook_reply_slot', default=None)
+
+
+async def answer_callback(call: types.CallbackQuery, text: str = None, show_alert: bool = None, final: bool = False):
+    """
+    Відповідає на callback-запит окремим запитом одразу, а з `final=True`
+    (після відповіді обробник вже нічого не чекає) — у відповіді вебхука, якщо це можливо.
+    """
+    slot = _reply_slot.get()
+    if final and slot is not None and not slot['closed'] and slot['response'] is None:
+        slot['response'] = AnswerCallbackQuery(call.id, text=text, show_alert=show_alert)
+        return True
+    return await call.answer(text, show_alert=show_alert)
+
+
+class ReplyingWebhookHandler(WebhookRequestHandler):
+    """Обробник вебхука, що повертає відкладену відповідь обробника в тілі HTTP-відповіді."""
+
+    # Вмикається в застосунку: app[WEBHOOK_REPLY_KEY] = True
+    WEBHOOK_REPLY_KEY = 'WEBHOOK_REPLY'
+
+    async def parse_update(self, bot):
+        return types.Update(**json_loads(await self.request.read()))
+
+    async def post(self):
+        self.validate_ip()
+        dispatcher = self.get_dispatcher()
+        update = await self.parse_update(dispatcher.bot)
+
+        if self.request.app.get(self.WEBHOOK_REPLY_KEY):
+            # Задача обробки копіює контекст, тож бачить той самий слот
+            _reply_slot.set({'response': None, 'closed': False})
+        results = await self.process_update(update)
+        response = self.get_response(results)
+
+        if response:
+            web_response = web.Response(body=json_dumps(response.get_response()), content_type='application/json')
+        else:
+            web_response = web.Response(text='ok')
+
+        if self.request.app.get('RETRY_AFTER', None):
+            web_response.headers['Retry-After'] = str(self.request.app['RETRY_AFTER'])
+        return web_response
+
+    def get_response(self, results):
+        response = super().get_response(results)
+        slot = _reply_slot.get()
+        if slot is None:
+            return response
+        # Після формування відповіді слот закривається: пізніші відповіді йдуть окремими запитами
+        slot['closed'] = True
+        deferred, slot['response'] = slot['response'], None
+        if response is None:
+            return deferred
+        if deferred is not None:
+            # Відповідь вебхука вже зайнята обробником — відкладену відповідь надсилаємо окремо
+            logger.debug("Webhook response already used; sending deferred %s separately.", deferred.method)
+            asyncio.get_event_loop().create_task(deferred.execute_response(self.get_dispatcher().bot))
+        return response